@@ -41,6 +41,7 @@
 
 #include "Quantization.hpp"
 #include <cstdint>
+#include <vector>
 
 namespace DlQuantization
 {
@@ -60,6 +61,24 @@ public:
      * quantization errors.
      */
     virtual TfEncoding computeEncoding(uint8_t bw, bool useSymmetricEncodings) const = 0;
+
+    /**
+     * @brief Returns the stats collected so far as a flat vector. The layout is specific to the analyzer, and is only
+     * meant to be passed back to setStats() or mergeStats() of an analyzer of the same type.
+     * An empty vector is returned if no stats have been collected.
+     */
+    virtual std::vector<double> getStats() const = 0;
+
+    /**
+     * @brief Replaces the collected stats with stats returned by getStats()
+     */
+    virtual void setStats(const std::vector<double>& stats) = 0;
+
+    /**
+     * @brief Merges stats returned by getStats() of another analyzer into the collected stats, so that they cover the
+     * tensors seen by both analyzers.
+     */
+    virtual void mergeStats(const std::vector<double>& stats) = 0;
 };
 
 
@@ -37,6 +37,7 @@
 //==============================================================================
 
 #include <cstddef>
+#include <stdexcept>
 #include <vector>
 
 #include "DlQuantization/Quantization.hpp"
@@ -116,6 +117,44 @@ TfEncoding TfEncodingAnalyzer<DTYPE>::computeEncoding(uint8_t bw, bool useSymmet
     return encoding;
 }
 
+template <typename DTYPE>
+std::vector<double> TfEncodingAnalyzer<DTYPE>::getStats() const
+{
+    // No stats collected yet
+    if (_accumulatedStats.min > _accumulatedStats.max)
+    {
+        return std::vector<double>();
+    }
+
+    return std::vector<double> {_accumulatedStats.min, _accumulatedStats.max};
+}
+
+template <typename DTYPE>
+void TfEncodingAnalyzer<DTYPE>::setStats(const std::vector<double>& stats)
+{
+    _accumulatedStats.min = std::numeric_limits<double>::max();
+    _accumulatedStats.max = -std::numeric_limits<double>::max();
+
+    mergeStats(stats);
+}
+
+template <typename DTYPE>
+void TfEncodingAnalyzer<DTYPE>::mergeStats(const std::vector<double>& stats)
+{
+    if (stats.empty())
+    {
+        return;
+    }
+
+    if (stats.size() != 2)
+    {
+        throw std::runtime_error("Invalid stats for TF encoding analyzer");
+    }
+
+    _accumulatedStats.min = std::min(_accumulatedStats.min, stats[0]);
+    _accumulatedStats.max = std::max(_accumulatedStats.max, stats[1]);
+}
+
 
 // Explicit instantiations
 template class TfEncodingAnalyzer<double>;
@@ -64,6 +64,15 @@ public:
      */
     TfEncoding computeEncoding(uint8_t bw, bool useSymmetricEncodings) const override;
 
+    /**
+     * Returns the accumulated stats as {min, max}
+     */
+    std::vector<double> getStats() const override;
+
+    void setStats(const std::vector<double>& stats) override;
+
+    void mergeStats(const std::vector<double>& stats) override;
+
     // Minimum range of quantization
     static constexpr double MIN_RANGE = 0.01;
 
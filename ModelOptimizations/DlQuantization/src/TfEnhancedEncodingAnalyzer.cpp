@@ -37,7 +37,9 @@
 //==============================================================================
 
 #include <cassert>
+#include <cmath>
 #include <cstddef>
+#include <stdexcept>
 #include <vector>
 
 #include "DlQuantization/Quantization.hpp"
@@ -55,6 +57,93 @@ void TfEnhancedEncodingAnalyzer<DTYPE>::updateStats(const DTYPE* tensor, const s
 }
 
 
+template <typename DTYPE>
+std::vector<double> TfEnhancedEncodingAnalyzer<DTYPE>::getStats() const
+{
+    std::vector<double> stats;
+
+    // No stats collected yet
+    if (_stats.x_left.empty())
+    {
+        return stats;
+    }
+
+    stats.reserve(1 + 2 * PDF_SIZE);
+    stats.push_back(_stats.iterations);
+    stats.insert(stats.end(), _stats.x_left.begin(), _stats.x_left.end());
+    stats.insert(stats.end(), _stats.pdf.begin(), _stats.pdf.end());
+
+    return stats;
+}
+
+template <typename DTYPE>
+void TfEnhancedEncodingAnalyzer<DTYPE>::setStats(const std::vector<double>& stats)
+{
+    _stats.x_left.clear();
+    _stats.pdf.clear();
+    _stats.iterations = 0;
+
+    if (stats.empty())
+    {
+        return;
+    }
+
+    if (stats.size() != 1 + 2 * PDF_SIZE)
+    {
+        throw std::runtime_error("Invalid stats for TF enhanced encoding analyzer");
+    }
+
+    _stats.iterations = (int) stats[0];
+    _stats.x_left.assign(stats.begin() + 1, stats.begin() + 1 + PDF_SIZE);
+    _stats.pdf.assign(stats.begin() + 1 + PDF_SIZE, stats.end());
+}
+
+template <typename DTYPE>
+void TfEnhancedEncodingAnalyzer<DTYPE>::mergeStats(const std::vector<double>& stats)
+{
+    if (stats.empty())
+    {
+        return;
+    }
+
+    // Nothing to merge into, so simply take over the other stats
+    if (_stats.x_left.empty())
+    {
+        setStats(stats);
+        return;
+    }
+
+    if (stats.size() != 1 + 2 * PDF_SIZE)
+    {
+        throw std::runtime_error("Invalid stats for TF enhanced encoding analyzer");
+    }
+
+    int other_iterations = (int) stats[0];
+    auto other_x_left    = stats.begin() + 1;
+    auto other_pdf       = stats.begin() + 1 + PDF_SIZE;
+
+    // Map the buckets of the other PDF to our buckets, the same way updateStats() maps values to buckets
+    double bucket_size = _stats.x_left[1] - _stats.x_left[0];
+    double pdf_offset  = _stats.x_left[0] / bucket_size;
+    std::vector<double> rebinned_pdf(PDF_SIZE, 0);
+    for (int i = 0; i < PDF_SIZE; ++i)
+    {
+        int index = round(other_x_left[i] / bucket_size - pdf_offset);
+        if (index >= 0 && index < PDF_SIZE)
+        {
+            rebinned_pdf[index] += other_pdf[i];
+        }
+    }
+
+    // Average the two PDFs, weighted by the number of iterations each of them holds
+    int total_iterations = _stats.iterations + other_iterations;
+    for (int i = 0; i < PDF_SIZE; ++i)
+    {
+        _stats.pdf[i] = (_stats.pdf[i] * _stats.iterations + rebinned_pdf[i] * other_iterations) / total_iterations;
+    }
+    _stats.iterations = total_iterations;
+}
+
 template <typename DTYPE>
 TfEncoding TfEnhancedEncodingAnalyzer<DTYPE>::computeEncoding(uint8_t bw, bool useSymmetricEncodings) const
 {
@@ -104,6 +193,11 @@ TfEnhancedEncodingAnalyzer<DTYPE>::_findBestCandidate(uint8_t bw,
 
     DTYPE best_cost = std::numeric_limits<float>::max();
 
+    // Precompute prefix sums over the PDF, so each candidate can be evaluated in constant time
+    PdfPrefixSums pdf_prefix_sums = _computePdfPrefixSums(_stats);
+    std::vector<double> quant_cost_prefix_sums;
+    DTYPE quant_cost_delta = -1;
+
     for (auto candidate: test_candidates)
     {
         DTYPE test_delta;
@@ -111,7 +205,14 @@ TfEnhancedEncodingAnalyzer<DTYPE>::_findBestCandidate(uint8_t bw,
 
         std::tie(test_delta, test_offset) = candidate;
 
-        DTYPE cost = _quantAndSatCost(_stats, bw, test_delta, test_offset);
+        // Candidates are grouped by delta, so quantization cost prefix sums only need to be computed once per delta
+        if (test_delta != quant_cost_delta)
+        {
+            _computeQuantCostPrefixSums(_stats, test_delta, quant_cost_prefix_sums);
+            quant_cost_delta = test_delta;
+        }
+
+        DTYPE cost = _quantAndSatCost(_stats, bw, test_delta, test_offset, pdf_prefix_sums, quant_cost_prefix_sums);
         // Remember the best encoding.
         if (cost < best_cost)
         {
@@ -215,7 +316,52 @@ std::tuple<DTYPE, DTYPE> TfEnhancedEncodingAnalyzer<DTYPE>::_findRangeOfAggregat
 }
 
 template <typename DTYPE>
-DTYPE TfEnhancedEncodingAnalyzer<DTYPE>::_quantAndSatCost(const PDF& pdf, int bw, DTYPE delta, int offset) const
+typename TfEnhancedEncodingAnalyzer<DTYPE>::PdfPrefixSums
+TfEnhancedEncodingAnalyzer<DTYPE>::_computePdfPrefixSums(const PDF& pdf)
+{
+    PdfPrefixSums prefix_sums;
+    prefix_sums.probability.assign(PDF_SIZE + 1, 0);
+    prefix_sums.firstMoment.assign(PDF_SIZE + 1, 0);
+    prefix_sums.secondMoment.assign(PDF_SIZE + 1, 0);
+
+    double pdf_start = pdf.x_left[0];
+    double pdf_step  = pdf.x_left[1] - pdf.x_left[0];
+    for (int i = 0; i < PDF_SIZE; ++i)
+    {
+        // Calculate the midpoint of this bin.
+        double mid_val = pdf_start + i * pdf_step + pdf_step / 2;
+
+        prefix_sums.probability[i + 1]  = prefix_sums.probability[i] + pdf.pdf[i];
+        prefix_sums.firstMoment[i + 1]  = prefix_sums.firstMoment[i] + pdf.pdf[i] * mid_val;
+        prefix_sums.secondMoment[i + 1] = prefix_sums.secondMoment[i] + pdf.pdf[i] * mid_val * mid_val;
+    }
+
+    return prefix_sums;
+}
+
+template <typename DTYPE>
+void TfEnhancedEncodingAnalyzer<DTYPE>::_computeQuantCostPrefixSums(const PDF& pdf, DTYPE delta,
+                                                                    std::vector<double>& quantCostPrefixSums)
+{
+    quantCostPrefixSums.assign(PDF_SIZE + 1, 0);
+
+    DTYPE pdf_start = pdf.x_left[0];
+    DTYPE pdf_step  = pdf.x_left[1] - pdf.x_left[0];
+    for (int i = 0; i < PDF_SIZE; ++i)
+    {
+        // The floating point value in the middle of this bucket.
+        DTYPE float_val = pdf_start + i * pdf_step + pdf_step / 2;
+        // The de-quantized value: this is 'float_val' plus the quantization error.
+        DTYPE dequantized = delta * round(float_val / delta);
+        // The quantization cost is the MSE.
+        quantCostPrefixSums[i + 1] = quantCostPrefixSums[i] + pdf.pdf[i] * pow(float_val - dequantized, 2);
+    }
+}
+
+template <typename DTYPE>
+DTYPE TfEnhancedEncodingAnalyzer<DTYPE>::_quantAndSatCost(const PDF& pdf, int bw, DTYPE delta, int offset,
+                                                          const PdfPrefixSums& pdfPrefixSums,
+                                                          const std::vector<double>& quantCostPrefixSums) const
 {
     // Given the TensorFlow fixed point format (delta and offset), we calculate
     // the smallest and biggest floating point values we can represent.
@@ -230,48 +376,27 @@ DTYPE TfEnhancedEncodingAnalyzer<DTYPE>::_quantAndSatCost(const PDF& pdf, int bw
     int maxInd      = (int) std::floor((max_val - pdf_start) / pdf_step);
     maxInd          = std::min(std::max(0, maxInd), PDF_SIZE - 1);
 
-    // Calculate the saturation cost of the bottom part of the PDF.
-    DTYPE sat_cost_bottom = 0;
-    // Calculate the smallest value we can represent (middle of respective
-    // bucket).
-    DTYPE min_val_middle_of_bucket = pdf_start + (min_ind * pdf_step) + pdf_step / 2;
-    // Go through all buckets which go into saturation.
-    for (int i = 0; i < min_ind; ++i)
-    {
-        // Calculate the midpoint of this bin.
-        DTYPE mid_val = pdf_start + i * pdf_step + pdf_step / 2;
-        // The saturation cost is the MSE.
-        sat_cost_bottom += pdf.pdf[i] * pow(mid_val - min_val_middle_of_bucket, 2);
-    }
-
-    // Calculate the saturation cost of the top part of the PDF.
-    DTYPE sat_cost_top = 0;
-    // Calculate the largest value we can represent (middle of respective
-    // bucket).
-    DTYPE max_val_middle_of_bucket = pdf_start + (maxInd * pdf_step) + pdf_step / 2;
-    // Go through all buckets which go into saturation.
-    for (int i = maxInd; i < PDF_SIZE; ++i)
-    {
-        // Calculate the midpoint of this bin.
-        DTYPE mid_val = pdf_start + i * pdf_step + pdf_step / 2;
-        // The saturation cost is the MSE.
-        sat_cost_top += pdf.pdf[i] * pow(mid_val - max_val_middle_of_bucket, 2);
-    }
-
-    // Calculate the quantization cost in the middle part of the PDF.
-    DTYPE quant_cost = 0;
-    // Go through all buckets which lie in the range we can represent.
-    for (int i = min_ind; i < maxInd; ++i)
-    {
-        // The floating point value in the middle of this bucket.
-        DTYPE float_val = pdf_start + i * pdf_step + pdf_step / 2;
-        // The quantized equivalent.
-        int quantized = (int) round(float_val / delta - offset);
-        // The de-quantized value: this is 'float_val' plus the quantization error.
-        DTYPE dequantized = delta * (quantized + offset);
-        // The quantization cost is the MSE.
-        quant_cost += pdf.pdf[i] * pow(float_val - dequantized, 2);
-    }
+    const std::vector<double>& probability   = pdfPrefixSums.probability;
+    const std::vector<double>& first_moment  = pdfPrefixSums.firstMoment;
+    const std::vector<double>& second_moment = pdfPrefixSums.secondMoment;
+
+    // Calculate the saturation cost of the bottom part of the PDF. This is the MSE of all buckets which go into
+    // saturation against the smallest value we can represent (middle of respective bucket), i.e.
+    // sum(p * (m - c)^2) = sum(p * m^2) - 2 * c * sum(p * m) + c^2 * sum(p)
+    double min_val_middle_of_bucket = pdf_start + (min_ind * pdf_step) + pdf_step / 2;
+    double sat_cost_bottom          = second_moment[min_ind] - 2 * min_val_middle_of_bucket * first_moment[min_ind] +
+                             min_val_middle_of_bucket * min_val_middle_of_bucket * probability[min_ind];
+
+    // Calculate the saturation cost of the top part of the PDF, against the largest value we can represent.
+    double max_val_middle_of_bucket = pdf_start + (maxInd * pdf_step) + pdf_step / 2;
+    double sat_cost_top = (second_moment[PDF_SIZE] - second_moment[maxInd]) -
+                          2 * max_val_middle_of_bucket * (first_moment[PDF_SIZE] - first_moment[maxInd]) +
+                          max_val_middle_of_bucket * max_val_middle_of_bucket *
+                              (probability[PDF_SIZE] - probability[maxInd]);
+
+    // Calculate the quantization cost in the middle part of the PDF, of all buckets which lie in the range we can
+    // represent.
+    double quant_cost = quantCostPrefixSums[maxInd] - quantCostPrefixSums[min_ind];
 
     // Calculate the total cost as the sum of quantization and saturation cost.
     DTYPE sqnr = GAMMA * (sat_cost_bottom + sat_cost_top) + quant_cost;
@@ -72,6 +72,21 @@ public:
      */
     TfEncoding computeEncoding(uint8_t bw, bool useSymmetricEncodings) const override;
 
+    /**
+     * Returns the PDF stats as {iterations, x_left[0..PDF_SIZE-1], pdf[0..PDF_SIZE-1]}
+     */
+    std::vector<double> getStats() const override;
+
+    void setStats(const std::vector<double>& stats) override;
+
+    /**
+     * Merges PDF stats from another analyzer. Buckets of the other PDF are re-binned into the buckets of this PDF,
+     * and the two PDFs are averaged weighted by their number of iterations. Note that the buckets of a PDF are fixed
+     * by the first tensor it saw, so any part of the other PDF outside of this range is dropped, just like values of
+     * a tensor outside of this range are dropped in updateStats().
+     */
+    void mergeStats(const std::vector<double>& stats) override;
+
 
 private:
     PDF _stats;
@@ -83,6 +98,31 @@ private:
     // Minimum range of quantization
     static constexpr double MIN_RANGE = 0.01;
 
+    /**
+     * Prefix sums over the PDF, with m[i] being the midpoint of bucket i:
+     * probability[i] = sum(pdf[0..i-1]), firstMoment[i] = sum(pdf[0..i-1] * m[0..i-1]) and
+     * secondMoment[i] = sum(pdf[0..i-1] * m[0..i-1]^2).
+     * These allow computing the saturation cost of any range of buckets in constant time.
+     */
+    struct PdfPrefixSums
+    {
+        std::vector<double> probability;
+        std::vector<double> firstMoment;
+        std::vector<double> secondMoment;
+    };
+
+    /**
+     * Compute prefix sums over the given PDF
+     */
+    static PdfPrefixSums _computePdfPrefixSums(const PDF& pdf);
+
+    /**
+     * Compute prefix sums of the quantization cost of each bucket of the PDF for a given delta. The quantization cost
+     * of a bucket only depends on delta (the integer offset shifts the quantization grid by whole steps), so these can
+     * be shared by all candidates with the same delta.
+     */
+    static void _computeQuantCostPrefixSums(const PDF& pdf, DTYPE delta, std::vector<double>& quantCostPrefixSums);
+
     /**
      * @brief Given a probability density and a fixed point encoding, compute the
      * quantization and saturation error of this number distribution.
@@ -91,8 +131,12 @@ private:
      * The cost is defined as "quantization cost" + GAMMA * "saturation cost".
      * For GAMMA==1, this function computes the means square error introduced
      * by this specific fixed point encoding.
+     *
+     * Cost is computed in constant time from the given prefix sums. quantCostPrefixSums need to have been computed for
+     * the same delta.
      */
-    DTYPE _quantAndSatCost(const PDF& pdf, int bw, DTYPE delta, int offset) const;
+    DTYPE _quantAndSatCost(const PDF& pdf, int bw, DTYPE delta, int offset, const PdfPrefixSums& pdfPrefixSums,
+                           const std::vector<double>& quantCostPrefixSums) const;
 
     /**
      * Find range (min, max) of the aggregated stats
@@ -119,32 +119,40 @@ void QuantizeToFxp(const DTYPE* in, int cnt, const TfEncoding& encoding, DTYPE*
 template <typename DTYPE>
 void QuantizeToFxp_CPU(const DTYPE* in, int cnt, const TfEncoding& encoding, DTYPE* out, RoundingMode rounding_mode)
 {
-    for (int i = 0; i < cnt; ++i)
+    // The rounding mode is resolved once for the whole tensor, which leaves tight loops for the compiler to vectorize
+    switch (rounding_mode)
     {
-        // Saturate
-        out[i] = (DTYPE) max(min((double) in[i], encoding.max), encoding.min);
-        // Scale and add offset to get something in the range [0,2^bw-1]
-        out[i] = round(out[i] / encoding.delta) - encoding.offset;
-
-        switch (rounding_mode)
+        case ROUND_NEAREST:
         {
-            case ROUND_NEAREST:
+            for (int i = 0; i < cnt; ++i)
             {
-                break;
+                // Saturate
+                DTYPE saturated = (DTYPE) max(min((double) in[i], encoding.max), encoding.min);
+                // Scale and add offset to get something in the range [0,2^bw-1]
+                DTYPE quantized = round(saturated / encoding.delta) - encoding.offset;
+                // De-quantize
+                out[i] = encoding.delta * (quantized + encoding.offset);
             }
-            case ROUND_STOCHASTIC:
+            break;
+        }
+        case ROUND_STOCHASTIC:
+        {
+            for (int i = 0; i < cnt; ++i)
             {
+                // Saturate
+                out[i] = (DTYPE) max(min((double) in[i], encoding.max), encoding.min);
+                // Scale and add offset to get something in the range [0,2^bw-1]
+                out[i] = round(out[i] / encoding.delta) - encoding.offset;
                 out[i] = floor(out[i] + RandUniform_cpu());
-                break;
-            }
-            default:
-            {
-                throw runtime_error("Unknown rounding mode.");
+                // De-quantize
+                out[i] = encoding.delta * (out[i] + encoding.offset);
             }
+            break;
+        }
+        default:
+        {
+            throw runtime_error("Unknown rounding mode.");
         }
-
-        // De-quantize
-        out[i] = encoding.delta * (out[i] + encoding.offset);
     }
 }
 
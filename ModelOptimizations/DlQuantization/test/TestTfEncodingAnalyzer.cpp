@@ -140,3 +140,34 @@ TYPED_TEST(TestTfEncodingAnalyzer, SanityTestSymmetric)
     EXPECT_NEAR(encoding.offset, -128, 1);
     EXPECT_EQ(encoding.bw, 8);
 }
+
+TYPED_TEST(TestTfEncodingAnalyzer, MergeStats)
+{
+    typedef typename TypeParam::dataType dataType;
+
+    DlQuantization::TfEncodingAnalyzer<dataType> analyzer;
+    DlQuantization::TfEncodingAnalyzer<dataType> otherAnalyzer;
+
+    // No stats collected yet
+    EXPECT_TRUE(analyzer.getStats().empty());
+
+    std::vector<dataType> tensor {-1, 0, 2};
+    Blob<TypeParam> tensorBlob(tensor.data(), tensor.size());
+    analyzer.updateStats(tensorBlob.getDataPtrOnDevice(), tensor.size(), TypeParam::modeCpuGpu);
+
+    std::vector<dataType> otherTensor {-3, 1};
+    Blob<TypeParam> otherTensorBlob(otherTensor.data(), otherTensor.size());
+    otherAnalyzer.updateStats(otherTensorBlob.getDataPtrOnDevice(), otherTensor.size(), TypeParam::modeCpuGpu);
+
+    analyzer.mergeStats(otherAnalyzer.getStats());
+    std::vector<double> stats = analyzer.getStats();
+    EXPECT_EQ(stats.size(), 2u);
+    EXPECT_FLOAT_EQ(stats[0], -3);
+    EXPECT_FLOAT_EQ(stats[1], 2);
+
+    // Restoring stats in a new analyzer results in the same encoding
+    DlQuantization::TfEncodingAnalyzer<dataType> restoredAnalyzer;
+    restoredAnalyzer.setStats(stats);
+    EXPECT_FLOAT_EQ(restoredAnalyzer.computeEncoding(8, false).min, analyzer.computeEncoding(8, false).min);
+    EXPECT_FLOAT_EQ(restoredAnalyzer.computeEncoding(8, false).max, analyzer.computeEncoding(8, false).max);
+}
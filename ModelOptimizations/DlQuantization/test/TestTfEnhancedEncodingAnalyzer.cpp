@@ -174,6 +174,54 @@ TYPED_TEST(TestTfEnhancedEncodingAnalyzer, SanityTestSymmetric)
     EXPECT_EQ(encoding.bw, 8);
 }
 
+TYPED_TEST(TestTfEnhancedEncodingAnalyzer, MergeStats)
+{
+    typedef typename TypeParam::dataType dataType;
+
+    DlQuantization::TfEnhancedEncodingAnalyzer<dataType> analyzer;
+    DlQuantization::TfEnhancedEncodingAnalyzer<dataType> shardAnalyzer;
+    DlQuantization::TfEnhancedEncodingAnalyzer<dataType> otherShardAnalyzer;
+
+    // No stats collected yet
+    EXPECT_TRUE(analyzer.getStats().empty());
+
+    std::normal_distribution<dataType> distribution(1, 2);
+    std::mt19937 generator(1);
+
+    unsigned int tensorCount = 6000;
+    std::vector<dataType> tensor(tensorCount);
+    for (unsigned int i = 0; i < tensorCount; i++)
+    {
+        tensor[i] = distribution(generator);
+    }
+    Blob<TypeParam> tensorBlob(tensor.data(), tensorCount);
+
+    // Analyzer sees the same tensor twice, each shard sees it once
+    analyzer.updateStats(tensorBlob.getDataPtrOnDevice(), tensorCount, TypeParam::modeCpuGpu);
+    analyzer.updateStats(tensorBlob.getDataPtrOnDevice(), tensorCount, TypeParam::modeCpuGpu);
+    shardAnalyzer.updateStats(tensorBlob.getDataPtrOnDevice(), tensorCount, TypeParam::modeCpuGpu);
+    otherShardAnalyzer.updateStats(tensorBlob.getDataPtrOnDevice(), tensorCount, TypeParam::modeCpuGpu);
+
+    // Merging into an analyzer without stats takes over the stats
+    DlQuantization::TfEnhancedEncodingAnalyzer<dataType> mergedAnalyzer;
+    mergedAnalyzer.mergeStats(shardAnalyzer.getStats());
+    EXPECT_EQ(mergedAnalyzer.getStats(), shardAnalyzer.getStats());
+
+    mergedAnalyzer.mergeStats(otherShardAnalyzer.getStats());
+    std::vector<double> mergedStats = mergedAnalyzer.getStats();
+    std::vector<double> expectedStats = analyzer.getStats();
+    ASSERT_EQ(mergedStats.size(), expectedStats.size());
+    for (unsigned int i = 0; i < mergedStats.size(); i++)
+    {
+        EXPECT_NEAR(mergedStats[i], expectedStats[i], 1e-6);
+    }
+
+    DlQuantization::TfEncoding encoding         = mergedAnalyzer.computeEncoding(8, false);
+    DlQuantization::TfEncoding expectedEncoding = analyzer.computeEncoding(8, false);
+    EXPECT_FLOAT_EQ(encoding.min, expectedEncoding.min);
+    EXPECT_FLOAT_EQ(encoding.max, expectedEncoding.max);
+}
+
 int main(int argc, char** argv)
 {
     ::testing::InitGoogleTest(&argc, argv);
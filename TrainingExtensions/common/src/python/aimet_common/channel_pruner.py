@@ -38,7 +38,11 @@
 
 """ Channel Pruning functions that are common to both PyTorch and TensorFlow """
 
+from typing import Iterable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import collections
 import numpy as np
+import scipy.linalg
 
 
 def select_channels_to_prune(weight_data: np.array
@@ -71,3 +75,146 @@ def select_channels_to_prune(weight_data: np.array
     # get input channel indices to prune
     prune_indices = list(set(all_indices) - set(keep_indices))
     return prune_indices
+
+
+class NormalEquationsRegression:
+    """
+    Least squares linear regression y = W * x + b, solved with the normal equations. The centered X^T X and X^T y
+    statistics are accumulated batch by batch, so memory does not depend on the number of samples
+    """
+
+    chunk_size = 8192
+
+    # relative size below which a direction of X^T X is considered degenerate
+    rcond = 1e-10
+
+    def __init__(self, bias: bool):
+        """
+        :param bias: whether to calculate the intercept b
+        """
+        self._bias = bias
+        self._num_samples = 0
+        self._input_mean = None
+        self._output_mean = None
+        self._xtx = None
+        self._xty = None
+
+    def add_data(self, input_data: np.ndarray, output_data: np.ndarray):
+        """
+        Accumulate a batch of samples
+
+        :param input_data: input_data, in the shape of [n_samples, n_features]
+        :param output_data: output_data, in the shape of [n_samples, n_targets]
+        """
+        assert len(input_data.shape) == 2
+        assert len(output_data.shape) == 2
+        assert input_data.shape[0] == output_data.shape[0]
+
+        # large, possibly memory mapped, data is accumulated in chunks to bound the size of float64 temporaries
+        for start in range(0, input_data.shape[0], self.chunk_size):
+            self._add_chunk(input_data[start:start + self.chunk_size], output_data[start:start + self.chunk_size])
+
+    def add_batches(self, batches: Iterable[Tuple[np.ndarray, np.ndarray]], pipeline_depth: int = 0):
+        """
+        Accumulate batches of samples. With a pipeline depth, batches are accumulated in order by a worker thread while
+        the following batches are being produced, e.g. captured from a model. numpy releases the GIL in the matrix
+        products, so producing and accumulating overlap
+
+        :param batches: (input_data, output_data) of each batch, in the shapes of [n_samples, n_features] and
+         [n_samples, n_targets]
+        :param pipeline_depth: maximum number of produced batches waiting to be accumulated, 0 to accumulate the
+         batches in the calling thread
+        """
+        if pipeline_depth == 0:
+            for input_data, output_data in batches:
+                self.add_data(input_data, output_data)
+            return
+
+        pending = collections.deque()
+
+        # a single worker accumulates the batches in the order they are produced
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            try:
+                for input_data, output_data in batches:
+                    pending.append(executor.submit(self.add_data, input_data, output_data))
+                    if len(pending) > pipeline_depth:
+                        pending.popleft().result()
+
+                while pending:
+                    pending.popleft().result()
+
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _add_chunk(self, input_data: np.ndarray, output_data: np.ndarray):
+        """
+        Accumulate a chunk of samples
+
+        :param input_data: input_data, in the shape of [n_samples, n_features]
+        :param output_data: output_data, in the shape of [n_samples, n_targets]
+        """
+        num_samples = input_data.shape[0]
+
+        input_data = np.asarray(input_data, dtype=np.float64)
+        output_data = np.asarray(output_data, dtype=np.float64)
+
+        if self._bias:
+            input_mean = input_data.mean(axis=0)
+            output_mean = output_data.mean(axis=0)
+            input_data = input_data - input_mean
+            output_data = output_data - output_mean
+        else:
+            input_mean = np.zeros(input_data.shape[1])
+            output_mean = np.zeros(output_data.shape[1])
+
+        xtx = input_data.T @ input_data
+        xty = input_data.T @ output_data
+
+        if self._num_samples == 0:
+            self._input_mean, self._output_mean, self._xtx, self._xty = input_mean, output_mean, xtx, xty
+            self._num_samples = num_samples
+            return
+
+        # merge the co-moments of the batch with the accumulated ones, around the combined means
+        total_num_samples = self._num_samples + num_samples
+        input_mean_delta = input_mean - self._input_mean
+        output_mean_delta = output_mean - self._output_mean
+        scale = self._num_samples * num_samples / total_num_samples
+
+        self._xtx += xtx + scale * np.outer(input_mean_delta, input_mean_delta)
+        self._xty += xty + scale * np.outer(input_mean_delta, output_mean_delta)
+        self._input_mean += input_mean_delta * num_samples / total_num_samples
+        self._output_mean += output_mean_delta * num_samples / total_num_samples
+        self._num_samples = total_num_samples
+
+    def solve(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Solve the normal equations with a Cholesky factorization. If X^T X is singular or ill-conditioned, e.g. for
+        collinear inputs, the minimum norm solution ignoring its degenerate directions is returned instead
+
+        :return: (new weight [n_targets, n_features], new bias [n_targets] or None)
+        """
+        if self._num_samples == 0:
+            raise ValueError("No data was added to the regression!")
+
+        weight = None
+        try:
+            cho_factor = scipy.linalg.cho_factor(self._xtx)
+
+            # The squared Cholesky pivots are the variances of the inputs left unexplained by the preceding inputs. A
+            # pivot close to 0 reveals (near) collinear inputs, for which the factorization succeeds but the solution
+            # is dominated by rounding errors
+            if np.min(np.diag(cho_factor[0])) ** 2 > self.rcond * np.max(np.diag(self._xtx)):
+                weight = scipy.linalg.cho_solve(cho_factor, self._xty)
+
+        except np.linalg.LinAlgError:
+            pass
+
+        if weight is None:
+            weight, _, _, _ = scipy.linalg.lstsq(self._xtx, self._xty, cond=self.rcond)
+
+        new_weight = weight.T
+        new_bias = self._output_mean - self._input_mean @ weight if self._bias else None
+
+        return new_weight, new_bias
@@ -39,19 +39,24 @@
 """ Implements different compression-ratio selection algorithms and a common interface to them """
 
 import abc
+import collections.abc
+import itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from decimal import Decimal
 from typing import Dict, List, Tuple, Any, Optional
 import math
 import pickle
 import statistics
 import os
+import multiprocessing
+import numpy as np
 import libpymo as pymo
 
 from aimet_torch import pymo_utils
 from aimet_common.bokeh_plots import DataTable
 from aimet_common.bokeh_plots import LinePlot
 from aimet_common.bokeh_plots import ProgressBar
-from aimet_common.utils import AimetLogger
+from aimet_common.utils import AimetLogger, ordered_parallel_map
 from aimet_common.curve_fit import MonotonicIncreasingCurveFit
 from aimet_common.defs import CostMetric, LayerCompRatioPair, GreedyCompressionRatioSelectionStats, \
     TarCompressionRatioSelectionStats, LayerCompRatioEvalScore, EvalFunction
@@ -59,10 +64,26 @@ from aimet_common.pruner import Pruner
 from aimet_common import cost_calculator as cc
 from aimet_common.layer_database import Layer, LayerDatabase
 from aimet_common.comp_ratio_rounder import CompRatioRounder
+from aimet_common.eval_score_cache import EvalScoreCache
 
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.CompRatioSelect)
 
+# Greedy selection algo instance shared with forked eval-score worker processes
+_worker_greedy_algo = None
+
+
+def _compute_eval_score_in_worker(layer_name: str, comp_ratio: Decimal) -> Tuple[float, bool]:
+    """
+    Computes a single eval score inside a forked worker process. The greedy algo instance is inherited from the
+    parent process, so neither the model nor the eval function need to be pickled.
+    :param layer_name: Name of the layer to prune
+    :param comp_ratio: Compression-ratio candidate
+    :return: Tuple of (eval score, True if the eval exited early)
+    """
+    layer = _worker_greedy_algo._layer_db.find_layer_by_name(layer_name)    # pylint: disable=protected-access
+    return _worker_greedy_algo._compute_eval_score(layer, comp_ratio)       # pylint: disable=protected-access
+
 
 class CompRatioSelectAlgo(metaclass=abc.ABCMeta):
     """
@@ -91,6 +112,98 @@ class CompRatioSelectAlgo(metaclass=abc.ABCMeta):
         """
 
 
+class EvalScoreTable:
+    """
+    Array representation of a greedy eval scores dictionary, along with the compressed cost of every selected layer at
+    each of its compression-ratio candidates. Finds per-layer compression-ratios and the resulting model
+    compression-ratio for many eval scores at once, using vectorized array operations. Only valid for cost
+    calculators where layer costs are independent of each other
+    """
+
+    def __init__(self, layer_db: LayerDatabase, eval_scores_dict: Dict[str, Dict[Decimal, float]],
+                 cost_calculator: cc.CostCalculator, cost_metric: CostMetric):
+        """
+        Constructor
+        :param layer_db: Layer database
+        :param eval_scores_dict: Dictionary of {layer_name: {compression_ratio: eval_score}} for all selected layers
+        :param cost_calculator: Cost calculator
+        :param cost_metric: Cost metric
+        """
+        assert cost_calculator.HAS_INDEPENDENT_LAYER_COSTS
+
+        def get_cost(cost):
+            return cost.memory if cost_metric == CostMetric.memory else cost.mac
+
+        self._layers = layer_db.get_selected_layers()
+
+        # Comp-ratios of each layer sorted by increasing order of compression
+        self._comp_ratios = [sorted(eval_scores_dict[layer.name].keys(), reverse=True) for layer in self._layers]
+
+        # Eval scores are padded with +inf, which is never exceeded, to the max number of comp-ratios (at least 2)
+        num_layers = len(self._layers)
+        max_num_comp_ratios = max([2] + [len(comp_ratios) for comp_ratios in self._comp_ratios])
+        self._eval_scores = np.full((num_layers, max_num_comp_ratios), np.inf)
+        self._last_index = np.array([len(comp_ratios) - 1 for comp_ratios in self._comp_ratios], dtype=np.int64)
+
+        # Column 0 holds the uncompressed layer cost, column i + 1 the compressed cost for the i-th comp-ratio
+        self._layer_costs = np.zeros((num_layers, max_num_comp_ratios + 1), dtype=np.int64)
+
+        for layer_index, layer in enumerate(self._layers):
+            self._layer_costs[layer_index, 0] = get_cost(cost_calculator.compute_layer_cost(layer))
+            for index, comp_ratio in enumerate(self._comp_ratios[layer_index]):
+                self._eval_scores[layer_index, index] = eval_scores_dict[layer.name][comp_ratio]
+                self._layer_costs[layer_index, index + 1] = \
+                    get_cost(cost_calculator.calculate_per_layer_compressed_cost(layer, comp_ratio, cost_metric))
+
+        self._unselected_layers_cost = sum(get_cost(cost_calculator.compute_layer_cost(layer))
+                                           for layer in layer_db if layer not in self._layers)
+        self._original_model_cost = get_cost(cost_calculator.compute_model_cost(layer_db))
+
+    def find_comp_ratio_indices(self, eval_scores) -> np.ndarray:
+        """
+        Vectorized equivalent of GreedyCompRatioSelectAlgo._find_layer_comp_ratio_given_eval_score() for all
+        selected layers and all given eval scores
+        :param eval_scores: Array of eval scores
+        :return: Array of shape (num eval scores, num layers) with the index of the selected comp-ratio of each layer
+                 in order of increasing compression, or -1 for no compression
+        """
+        eval_scores = np.asarray(eval_scores, dtype=np.float64).reshape(-1, 1)
+        layer_indices = np.arange(len(self._layers))
+
+        # Select the comp-ratio preceding the first one with an eval score below the given eval score
+        is_below = eval_scores[:, :, np.newaxis] > self._eval_scores[np.newaxis, :, 1:]
+        indices = np.where(is_below.any(axis=2), is_below.argmax(axis=2), -1)
+
+        # Eval score lower than even the most aggressive comp-ratio: most aggressive comp-ratio
+        indices = np.where(eval_scores < self._eval_scores[layer_indices, self._last_index], self._last_index, indices)
+
+        # Eval score higher than even the most conservative comp-ratio: no compression
+        indices = np.where(eval_scores > self._eval_scores[:, 0], -1, indices)
+
+        return indices
+
+    def calculate_model_comp_ratios(self, eval_scores) -> np.ndarray:
+        """
+        Calculates the model compression-ratio resulting from each given eval score
+        :param eval_scores: Array of eval scores
+        :return: Array of model compression-ratios
+        """
+        indices = self.find_comp_ratio_indices(eval_scores)
+        layer_costs = self._layer_costs[np.arange(len(self._layers)), indices + 1]
+
+        return (layer_costs.sum(axis=1) + self._unselected_layers_cost) / self._original_model_cost
+
+    def get_layer_comp_ratio_pairs(self, eval_score: float) -> List[LayerCompRatioPair]:
+        """
+        Finds the compression-ratio of each selected layer for given eval score
+        :param eval_score: Eval score
+        :return: List of layer and compression-ratio pairs
+        """
+        indices = self.find_comp_ratio_indices([eval_score])[0]
+        return [LayerCompRatioPair(layer, None if index < 0 else comp_ratios[index])
+                for layer, comp_ratios, index in zip(self._layers, self._comp_ratios, indices)]
+
+
 class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
     """
     Implements the greedy compression-ratio select algorithm
@@ -98,15 +211,47 @@ class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
 
     PICKLE_FILE_EVAL_DICT = './data/greedy_selection_eval_scores_dict.pkl'
 
+    # Progressive evals exit early only after this many batches, and once the running score is more than this many
+    # standard errors below the early exit threshold
+    EARLY_EXIT_MIN_BATCHES = 3
+    EARLY_EXIT_NUM_STD_ERRORS = 3.0
+
     # pylint: disable=too-many-locals
     def __init__(self, layer_db: LayerDatabase, pruner: Pruner, cost_calculator: cc.CostCalculator,
                  eval_func: EvalFunction, eval_iterations, cost_metric: CostMetric, target_comp_ratio: float,
                  num_candidates: int, use_monotonic_fit: bool, saved_eval_scores_dict: Optional[str],
-                 comp_ratio_rounding_algo: CompRatioRounder, use_cuda: bool, bokeh_session):
+                 comp_ratio_rounding_algo: CompRatioRounder, use_cuda: bool, bokeh_session,
+                 num_workers: int = 1, use_processes: bool = False, eval_scores_cache_path: Optional[str] = None,
+                 adaptive_sampling_tolerance: Optional[float] = None,
+                 early_exit_score_threshold: Optional[float] = None):
+        """
+        Constructor
+        :param num_workers: Number of workers used to compute the eval scores table. With a value of 1 all
+               (layer, comp-ratio) candidates are evaluated serially. Worker threads are not used with a pruner that
+               is not thread-safe
+        :param use_processes: If True, workers are forked processes instead of threads. Processes are not affected
+               by the GIL or by non-thread-safe pruners, but CUDA must not have been initialized in the parent
+        :param eval_scores_cache_path: Path to a persistent eval score cache. Cached scores are reused, and every newly
+               computed score is added to the cache right away
+        :param adaptive_sampling_tolerance: If given, each layer is first evaluated at a few compression-ratio
+               candidates only. More candidates are evaluated where the eval score changes by more than this
+               tolerance, until linear interpolation is within tolerance. The remaining candidates are interpolated
+        :param early_exit_score_threshold: Used with a progressive eval function, which yields the running eval score
+               after each batch instead of returning the final score. A candidate is not evaluated any further once
+               its score is confidently below this threshold, and its running score is used instead
+        """
 
         # pylint: disable=too-many-arguments
         CompRatioSelectAlgo.__init__(self, layer_db, cost_calculator, cost_metric, comp_ratio_rounding_algo)
 
+        if num_workers < 1:
+            raise ValueError("Error: num_workers={}. Need at least one worker".format(num_workers))
+
+        if num_workers > 1 and not use_processes and not pruner.IS_THREAD_SAFE:
+            logger.warning("%s is not thread-safe, eval scores are computed serially. Use worker processes instead",
+                           type(pruner).__name__)
+            num_workers = 1
+
         self._eval_func = eval_func
         self.bokeh_session = bokeh_session
         self._eval_iter = eval_iterations
@@ -115,6 +260,12 @@ class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
         self._saved_eval_scores_dict = saved_eval_scores_dict
         self._target_comp_ratio = target_comp_ratio
         self._use_monotonic_fit = use_monotonic_fit
+        self._num_workers = num_workers
+        self._use_processes = use_processes
+        self._eval_scores_cache_path = eval_scores_cache_path
+        self._eval_scores_cache = None
+        self._adaptive_sampling_tolerance = adaptive_sampling_tolerance
+        self._early_exit_score_threshold = early_exit_score_threshold
 
         if saved_eval_scores_dict:
             self._comp_ratio_candidates = 0
@@ -219,6 +370,16 @@ class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
 
     def select_per_layer_comp_ratios(self):
 
+        return self.select_per_layer_comp_ratios_for_targets([self._target_comp_ratio])[0]
+
+    def select_per_layer_comp_ratios_for_targets(self, target_comp_ratios: List[float]) -> \
+            List[Tuple[List[LayerCompRatioPair], GreedyCompressionRatioSelectionStats]]:
+        """
+        Runs the greedy compression-ratio selection for several target compression-ratios. The eval scores dictionary
+        is only computed once and shared by all targets
+        :param target_comp_ratios: List of target compression-ratios
+        :return: For each target compression-ratio, the list of layer and compression ratio pairs, and stats
+        """
         # Compute eval scores for each candidate comp-ratio in each layer
         eval_scores_dict = self._construct_eval_dict()
 
@@ -229,23 +390,50 @@ class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
         updated_eval_scores_dict = self._update_eval_dict_with_rounding(eval_scores_dict, self._rounding_algo,
                                                                         self._cost_metric)
 
+        # Base cost
+        original_model_cost = self._cost_calculator.compute_model_cost(self._layer_db)
+        logger.info("Greedy selection: Original model cost=%s", original_model_cost)
+
+        # Precompute per-layer costs for all comp-ratios, if layers can be costed independently
+        eval_score_table = None
+        if self._cost_calculator.HAS_INDEPENDENT_LAYER_COSTS:
+            eval_score_table = EvalScoreTable(self._layer_db, updated_eval_scores_dict, self._cost_calculator,
+                                              self._cost_metric)
+
+        selections = []
+        for target_comp_ratio in target_comp_ratios:
+            layer_ratio_list = self._select_comp_ratios_for_target(target_comp_ratio, updated_eval_scores_dict,
+                                                                   original_model_cost, eval_score_table)
+            selections.append((layer_ratio_list, GreedyCompressionRatioSelectionStats(updated_eval_scores_dict)))
+
+        return selections
+
+    def _select_comp_ratios_for_target(self, target_comp_ratio: float,
+                                       updated_eval_scores_dict: Dict[str, Dict[Decimal, float]],
+                                       original_model_cost, eval_score_table: Optional[EvalScoreTable]) -> \
+            List[LayerCompRatioPair]:
+        """
+        Binary searches the eval score for which the per-layer compression ratios achieve the target compression-ratio
+        :param target_comp_ratio: Target compression-ratio
+        :param updated_eval_scores_dict: Eval scores dictionary with rounded compression-ratios
+        :param original_model_cost: Cost of the original model
+        :param eval_score_table: Precomputed EvalScoreTable, or None
+        :return: List of layer and compression ratio pairs
+        """
         # Get the overall min and max scores
         current_min_score, current_max_score = self._find_min_max_eval_scores(updated_eval_scores_dict)
         exit_threshold = (current_max_score - current_min_score) * 0.0001
         logger.info("Greedy selection: overall_min_score=%f, overall_max_score=%f",
                     current_min_score, current_max_score)
 
-        # Base cost
-        original_model_cost = self._cost_calculator.compute_model_cost(self._layer_db)
-        logger.info("Greedy selection: Original model cost=%s", original_model_cost)
-
         while True:
 
             # Current mid-point score
             current_mid_score = statistics.mean([current_max_score, current_min_score])
             current_comp_ratio = self._calculate_model_comp_ratio_for_given_eval_score(current_mid_score,
                                                                                        updated_eval_scores_dict,
-                                                                                       original_model_cost)
+                                                                                       original_model_cost,
+                                                                                       eval_score_table)
 
             logger.debug("Greedy selection: current candidate - comp_ratio=%f, score=%f, search-window=[%f:%f]",
                          current_comp_ratio, current_mid_score, current_min_score, current_max_score)
@@ -253,12 +441,12 @@ class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
             # Exit condition: is the binary search window too small to continue?
             should_exit, selected_score = self._evaluate_exit_condition(current_min_score, current_max_score,
                                                                         exit_threshold,
-                                                                        current_comp_ratio, self._target_comp_ratio)
+                                                                        current_comp_ratio, target_comp_ratio)
 
             if should_exit:
                 break
 
-            if current_comp_ratio > self._target_comp_ratio:
+            if current_comp_ratio > target_comp_ratio:
                 # Not enough compression: Binary search the lower half of the scores
                 current_max_score = current_mid_score
             else:
@@ -270,12 +458,13 @@ class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
         layer_ratio_list = self._find_all_comp_ratios_given_eval_score(selected_score, updated_eval_scores_dict)
         selected_comp_ratio = self._calculate_model_comp_ratio_for_given_eval_score(selected_score,
                                                                                     updated_eval_scores_dict,
-                                                                                    original_model_cost)
+                                                                                    original_model_cost,
+                                                                                    eval_score_table)
 
         logger.info("Greedy selection: final choice - comp_ratio=%f, score=%f",
                     selected_comp_ratio, selected_score)
 
-        return layer_ratio_list, GreedyCompressionRatioSelectionStats(updated_eval_scores_dict)
+        return layer_ratio_list
 
     @staticmethod
     def _evaluate_exit_condition(min_score, max_score, exit_threshold, current_comp_ratio, target_comp_ratio):
@@ -289,7 +478,11 @@ class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
         return False, None
 
     def _calculate_model_comp_ratio_for_given_eval_score(self, eval_score, eval_scores_dict,
-                                                         original_model_cost):
+                                                         original_model_cost,
+                                                         eval_score_table: Optional[EvalScoreTable] = None):
+
+        if eval_score_table is not None:
+            return Decimal(eval_score_table.calculate_model_comp_ratios([eval_score])[0])
 
         # Calculate the compression ratios for each layer based on this score
         layer_ratio_list = self._find_all_comp_ratios_given_eval_score(eval_score, eval_scores_dict)
@@ -393,57 +586,415 @@ class GreedyCompRatioSelectAlgo(CompRatioSelectAlgo):
             data_table = None
             progress_bar = None
 
+        if self._eval_scores_cache_path:
+            self._eval_scores_cache = EvalScoreCache(self._eval_scores_cache_path, self._layer_db, self._pruner,
+                                                     self._eval_func, self._eval_iter, self._cost_metric)
+        try:
+            if self._adaptive_sampling_tolerance is not None:
+                return self._compute_eval_scores_adaptively(data_table, progress_bar, selected_layers)
+
+            if self._num_workers > 1:
+                return self._compute_eval_scores_in_parallel(data_table, progress_bar, selected_layers)
+
+            eval_scores_dict = {}
+            for layer in selected_layers:
+
+                layer_wise_eval_scores = self._compute_layerwise_eval_score_per_comp_ratio_candidate(data_table,
+                                                                                                     progress_bar,
+                                                                                                     layer)
+                eval_scores_dict[layer.name] = layer_wise_eval_scores
+
+            return eval_scores_dict
+
+        finally:
+            if self._eval_scores_cache:
+                self._eval_scores_cache.close()
+                self._eval_scores_cache = None
+
+    def _get_cached_eval_score(self, layer: Layer, comp_ratio: Decimal) -> Optional[float]:
+        """
+        Looks up the eval score of a candidate in the persistent eval score cache
+        :return: Eval score, or None if no cache is used or the candidate was not evaluated before
+        """
+        if not self._eval_scores_cache:
+            return None
+
+        eval_score = self._eval_scores_cache.get(layer.name, comp_ratio)
+        if eval_score is not None:
+            logger.info("Layer %s, comp_ratio %f ==> eval_score=%f (cached)", layer.name, comp_ratio, eval_score)
+        return eval_score
+
+    def _cache_eval_score(self, layer: Layer, comp_ratio: Decimal, eval_score: float, exited_early: bool):
+        """
+        Adds a newly computed eval score to the persistent eval score cache, if one is used. Scores of evals that
+        exited early are only partial estimates, so they are not cached
+        """
+        if self._eval_scores_cache and not exited_early:
+            self._eval_scores_cache.put(layer.name, comp_ratio, eval_score)
+
+    def _create_executor(self):
+        """
+        Creates the pool of workers used to compute eval scores in parallel
+        :return: Executor with self._num_workers workers
+        """
+        if self._use_processes:
+            # Workers inherit the greedy algo instance by forking
+            global _worker_greedy_algo      # pylint: disable=global-statement
+            _worker_greedy_algo = self
+            return ProcessPoolExecutor(max_workers=self._num_workers, mp_context=multiprocessing.get_context('fork'))
+
+        return ThreadPoolExecutor(max_workers=self._num_workers)
+
+    def _compute_eval_scores_in_parallel(self, tabular_progress_object, progress_bar,
+                                         selected_layers: List[Layer]) -> Dict[str, Dict[Decimal, float]]:
+        """
+        Computes eval scores for all (layer, compression-ratio) candidates using a pool of workers. Results are
+        consumed in submission order, so the returned dictionary and the bokeh plots are identical to the serial case
+        :param tabular_progress_object: Bokeh data table to update, or None
+        :param progress_bar: Bokeh progress bar to update, or None
+        :param selected_layers: Layers for which to calculate eval scores
+        :return: Dictionary of {layer_name: {compression_ratio: eval_score}}
+        """
+        global _worker_greedy_algo      # pylint: disable=global-statement
+
+        eval_scores_dict = {}
+        try:
+            with self._create_executor() as executor:
+                # Only candidates missing from the eval score cache are submitted
+                futures = {}
+                for layer in selected_layers:
+                    for comp_ratio in self._comp_ratio_candidates:
+                        if self._get_cached_eval_score(layer, comp_ratio) is not None:
+                            continue
+                        if self._use_processes:
+                            future = executor.submit(_compute_eval_score_in_worker, layer.name, comp_ratio)
+                        else:
+                            future = executor.submit(self._compute_eval_score, layer, comp_ratio)
+                        futures[(layer.name, comp_ratio)] = future
+
+                for layer in selected_layers:
+                    layer_wise_eval_scores_plot = self._create_layer_wise_eval_scores_plot(layer)
+                    layer_wise_eval_scores_dict = {}
+
+                    for comp_ratio in self._comp_ratio_candidates:
+                        future = futures.get((layer.name, comp_ratio))
+                        if future is None:
+                            eval_score = self._get_cached_eval_score(layer, comp_ratio)
+                        else:
+                            eval_score, exited_early = future.result()
+                            self._cache_eval_score(layer, comp_ratio, eval_score, exited_early)
+                        layer_wise_eval_scores_dict[comp_ratio] = eval_score
+                        self._publish_eval_score(tabular_progress_object, progress_bar, layer_wise_eval_scores_plot,
+                                                 layer, comp_ratio, eval_score)
+
+                    if layer_wise_eval_scores_plot:
+                        layer_wise_eval_scores_plot.remove_plot()
+
+                    eval_scores_dict[layer.name] = layer_wise_eval_scores_dict
+        finally:
+            _worker_greedy_algo = None
+
+        return eval_scores_dict
+
+    def _compute_eval_scores_adaptively(self, tabular_progress_object, progress_bar,
+                                        selected_layers: List[Layer]) -> Dict[str, Dict[Decimal, float]]:
+        """
+        Computes eval scores for all (layer, compression-ratio) candidates, evaluating only as many candidates per
+        layer as needed to interpolate the others within self._adaptive_sampling_tolerance
+        :param tabular_progress_object: Bokeh data table to update, or None
+        :param progress_bar: Bokeh progress bar to update, or None
+        :param selected_layers: Layers for which to calculate eval scores
+        :return: Dictionary of {layer_name: {compression_ratio: eval_score}}
+        """
+        global _worker_greedy_algo      # pylint: disable=global-statement
+
+        last_index = len(self._comp_ratio_candidates) - 1
+
+        # Per layer, eval scores by candidate index and the index ranges known to be within tolerance
+        evaluated = {layer.name: {} for layer in selected_layers}
+        converged_ranges = {layer.name: set() for layer in selected_layers}
+
+        # Start with the least and most compressed candidates and the one in the middle
+        pending = [(layer, index) for layer in selected_layers for index in sorted({0, last_index // 2, last_index})]
+        num_evals = 0
+
+        executor = self._create_executor() if self._num_workers > 1 else None
+        try:
+            while pending:
+                eval_scores = self._evaluate_candidates(executor, [(layer, self._comp_ratio_candidates[index])
+                                                                   for layer, index in pending])
+                num_evals += len(pending)
+
+                for (layer, index), eval_score in zip(pending, eval_scores):
+                    evaluated[layer.name][index] = eval_score
+
+                for layer, index in pending:
+                    self._update_converged_ranges(evaluated[layer.name], converged_ranges[layer.name], index)
+
+                pending = [(layer, index) for layer in selected_layers
+                           for index in self._find_candidates_to_refine(evaluated[layer.name],
+                                                                        converged_ranges[layer.name])]
+        finally:
+            if executor:
+                executor.shutdown()
+            _worker_greedy_algo = None
+
+        logger.info("Greedy selection: Adaptive sampling evaluated %d of %d candidates", num_evals,
+                    len(selected_layers) * len(self._comp_ratio_candidates))
+
         eval_scores_dict = {}
         for layer in selected_layers:
+            layer_wise_eval_scores_plot = self._create_layer_wise_eval_scores_plot(layer)
+            layer_wise_eval_scores_dict = {}
+
+            for index, comp_ratio in enumerate(self._comp_ratio_candidates):
+                eval_score = self._interpolate_eval_score(evaluated[layer.name], index)
+                layer_wise_eval_scores_dict[comp_ratio] = eval_score
+                self._publish_eval_score(tabular_progress_object, progress_bar, layer_wise_eval_scores_plot,
+                                         layer, comp_ratio, eval_score)
+
+            if layer_wise_eval_scores_plot:
+                layer_wise_eval_scores_plot.remove_plot()
 
-            layer_wise_eval_scores = self._compute_layerwise_eval_score_per_comp_ratio_candidate(data_table,
-                                                                                                 progress_bar, layer)
-            eval_scores_dict[layer.name] = layer_wise_eval_scores
+            eval_scores_dict[layer.name] = layer_wise_eval_scores_dict
 
         return eval_scores_dict
 
-    def _compute_layerwise_eval_score_per_comp_ratio_candidate(self, tabular_progress_object, progress_bar,
-                                                               layer: Layer) -> Dict[Decimal, float]:
+    @staticmethod
+    def _interpolate_eval_score(layer_eval_scores: Dict[int, float], index: int) -> float:
         """
-        Computes eval scores for each compression-ratio candidate for a given layer
-        :param layer: Layer for which to calculate eval scores
-        :return: Dictionary of {compression_ratio: eval_score} for each compression-ratio candidate
+        Linearly interpolates the eval score of a candidate from the closest evaluated candidates on either side
+        :param layer_eval_scores: Eval scores of a layer by candidate index. Must include the first and last candidate
+        :param index: Candidate index
+        :return: Eval score
         """
+        if index in layer_eval_scores:
+            return layer_eval_scores[index]
 
-        layer_wise_eval_scores_dict = {}
+        start = max(i for i in layer_eval_scores if i < index)
+        end = min(i for i in layer_eval_scores if i > index)
 
-        # Only publish plots to a document if a bokeh server session exists
-        if self.bokeh_session:
+        return layer_eval_scores[start] + (layer_eval_scores[end] - layer_eval_scores[start]) * \
+            (index - start) / (end - start)
 
-            # plot to visualize the evaluation scores as they update for each layer
-            layer_wise_eval_scores_plot = LinePlot(x_axis_label="Compression Ratios", y_axis_label="Eval Scores",
-                                                   title=layer.name, bokeh_session=self.bokeh_session)
-        # Loop over each candidate
-        for comp_ratio in self._comp_ratio_candidates:
-            logger.info("Analyzing compression ratio: %s =====================>", comp_ratio)
+    def _update_converged_ranges(self, layer_eval_scores: Dict[int, float], converged_ranges: set, index: int):
+        """
+        Checks if a newly evaluated candidate matches the interpolation between its evaluated neighbours. If so,
+        linear interpolation is considered within tolerance on both sides of it
+        :param layer_eval_scores: Eval scores of a layer by candidate index
+        :param converged_ranges: Set of (start index, end index) ranges that need no more refinement, updated
+        :param index: Index of the newly evaluated candidate
+        """
+        lower = [i for i in layer_eval_scores if i < index]
+        upper = [i for i in layer_eval_scores if i > index]
+        if not lower or not upper:
+            return
+
+        start, end = max(lower), min(upper)
+        if (start, end) in converged_ranges:
+            return
+
+        neighbour_eval_scores = {start: layer_eval_scores[start], end: layer_eval_scores[end]}
+        interpolated_score = self._interpolate_eval_score(neighbour_eval_scores, index)
+
+        if abs(interpolated_score - layer_eval_scores[index]) <= self._adaptive_sampling_tolerance:
+            converged_ranges.add((start, index))
+            converged_ranges.add((index, end))
+
+    def _find_candidates_to_refine(self, layer_eval_scores: Dict[int, float], converged_ranges: set) -> List[int]:
+        """
+        Finds the candidates to evaluate next for a layer: the middle candidate of each range between evaluated
+        candidates where the eval score changes by more than the tolerance, unless the range has already converged
+        :param layer_eval_scores: Eval scores of a layer by candidate index
+        :param converged_ranges: Set of (start index, end index) ranges that need no more refinement
+        :return: Candidate indices to evaluate
+        """
+        evaluated_indices = sorted(layer_eval_scores.keys())
+        indices_to_refine = []
 
-            # Prune layer given this comp ratio
+        for start, end in zip(evaluated_indices[:-1], evaluated_indices[1:]):
+            if end - start < 2 or (start, end) in converged_ranges:
+                continue
+
+            # For a monotonic curve, the interpolation error within a range is bounded by the change in eval score
+            if abs(layer_eval_scores[end] - layer_eval_scores[start]) > self._adaptive_sampling_tolerance:
+                indices_to_refine.append((start + end) // 2)
+
+        return indices_to_refine
+
+    def _evaluate_candidates(self, executor, candidates: List[Tuple[Layer, Decimal]]) -> List[float]:
+        """
+        Computes eval scores for a batch of (layer, compression-ratio) candidates, using the eval score cache
+        :param executor: Pool of workers to use, or None to evaluate serially
+        :param candidates: List of (layer, compression-ratio) candidates
+        :return: Eval scores in the order of candidates
+        """
+        eval_scores = [self._get_cached_eval_score(layer, comp_ratio) for layer, comp_ratio in candidates]
+
+        futures = {}
+        for index, (layer, comp_ratio) in enumerate(candidates):
+            if eval_scores[index] is not None:
+                continue
+            if executor is None:
+                eval_scores[index], exited_early = self._compute_eval_score(layer, comp_ratio)
+                self._cache_eval_score(layer, comp_ratio, eval_scores[index], exited_early)
+            elif self._use_processes:
+                futures[index] = executor.submit(_compute_eval_score_in_worker, layer.name, comp_ratio)
+            else:
+                futures[index] = executor.submit(self._compute_eval_score, layer, comp_ratio)
+
+        for index, future in futures.items():
+            layer, comp_ratio = candidates[index]
+            eval_scores[index], exited_early = future.result()
+            self._cache_eval_score(layer, comp_ratio, eval_scores[index], exited_early)
+
+        return eval_scores
+
+    def _compute_eval_score(self, layer: Layer, comp_ratio: Decimal) -> Tuple[float, bool]:
+        """
+        Prunes a single layer using the given compression-ratio and evaluates the resulting model
+        :param layer: Layer to prune
+        :param comp_ratio: Compression-ratio candidate
+        :return: Tuple of (eval score of the pruned model, True if the eval exited early)
+        """
+        logger.info("Analyzing compression ratio: %s =====================>", comp_ratio)
+
+        if self._num_workers > 1 and not self._use_processes:
+            # Worker threads share the model, so each of them needs its own pruned copy
             pruned_layer_db = self._pruner.prune_model(self._layer_db,
                                                        [LayerCompRatioPair(layer, comp_ratio)],
                                                        self._cost_metric,
                                                        trainer=None)
 
-            eval_score = self._eval_func(pruned_layer_db.model, self._eval_iter, use_cuda=self._is_cuda)
-            layer_wise_eval_scores_dict[comp_ratio] = eval_score
+            eval_score, exited_early = self._evaluate_model(pruned_layer_db.model)
 
             # destroy the layer database
             pruned_layer_db.destroy()
             pruned_layer_db = None
 
-            logger.info("Layer %s, comp_ratio %f ==> eval_score=%f", layer.name, comp_ratio,
-                        eval_score)
+        else:
+            # Prune layer given this comp ratio by patching it into the model
+            with self._pruner.patch_model(self._layer_db, layer, comp_ratio, self._cost_metric) as pruned_model:
+                eval_score, exited_early = self._evaluate_model(pruned_model)
+
+        logger.info("Layer %s, comp_ratio %f ==> eval_score=%f", layer.name, comp_ratio,
+                    eval_score)
+
+        return eval_score, exited_early
+
+    def _evaluate_model(self, model) -> Tuple[float, bool]:
+        """
+        Evaluates a model using the eval function. For a progressive eval function, the running scores are consumed
+        until the eval finishes or the score is confidently below the early exit threshold
+        :param model: Model to evaluate
+        :return: Tuple of (eval score, True if the eval exited early and the score is only a partial estimate)
+        """
+        eval_result = self._eval_func(model, self._eval_iter, use_cuda=self._is_cuda)
+        if not isinstance(eval_result, collections.abc.Iterator):
+            return eval_result, False
+
+        eval_score = None
+        num_batches = 0
+        batch_scores_sum = 0.0
+        batch_scores_sum_of_squares = 0.0
+
+        for num_batches, eval_score in enumerate(eval_result, start=1):
+            if self._early_exit_score_threshold is None:
+                continue
+
+            # Recover the score of the latest batch from the running average
+            batch_score = eval_score * num_batches - batch_scores_sum
+            batch_scores_sum += batch_score
+            batch_scores_sum_of_squares += batch_score ** 2
+
+            if num_batches < self.EARLY_EXIT_MIN_BATCHES:
+                continue
+
+            variance = max(batch_scores_sum_of_squares - batch_scores_sum ** 2 / num_batches, 0) / (num_batches - 1)
+            std_error = math.sqrt(variance / num_batches)
+
+            if eval_score + self.EARLY_EXIT_NUM_STD_ERRORS * std_error < self._early_exit_score_threshold:
+                logger.info("Eval exited early after %d batches, eval_score=%f", num_batches, eval_score)
+                eval_result.close()
+                return eval_score, True
+
+        return eval_score, False
 
-            if self.bokeh_session:
-                layer_wise_eval_scores_plot.update(new_x_coordinate=comp_ratio, new_y_coordinate=eval_score)
-                # Update the data table by adding the computed eval score
-                tabular_progress_object.update_table(str(comp_ratio), layer.name, eval_score)
-                # Update the progress bar
-                progress_bar.update()
+    def compute_proxy_eval_scores(self, num_batches: int = 1) -> Dict[str, Dict[Decimal, float]]:
+        """
+        Computes cheap proxy eval scores for all (layer, compression-ratio) candidates, using only the first batches
+        of a progressive eval function. Useful to rank candidates, or to choose the early exit threshold, before any
+        full evals are run
+        :param num_batches: Number of batches to evaluate per candidate
+        :return: Dictionary of {layer_name: {compression_ratio: proxy_eval_score}}
+        """
+        proxy_eval_scores_dict = {}
+
+        for layer in self._layer_db.get_selected_layers():
+            layer_wise_proxy_eval_scores = {}
+
+            for comp_ratio in self._comp_ratio_candidates:
+                with self._pruner.patch_model(self._layer_db, layer, comp_ratio, self._cost_metric) as pruned_model:
+                    eval_result = self._eval_func(pruned_model, self._eval_iter, use_cuda=self._is_cuda)
+                    if not isinstance(eval_result, collections.abc.Iterator):
+                        raise ValueError("Proxy eval scores need an eval function that yields running eval scores")
+
+                    running_eval_scores = list(itertools.islice(eval_result, num_batches))
+                    eval_result.close()
+
+                layer_wise_proxy_eval_scores[comp_ratio] = running_eval_scores[-1]
+
+            proxy_eval_scores_dict[layer.name] = layer_wise_proxy_eval_scores
+
+        return proxy_eval_scores_dict
+
+    def _create_layer_wise_eval_scores_plot(self, layer: Layer) -> Optional[LinePlot]:
+        """
+        Creates a plot to visualize the evaluation scores as they update for the given layer
+        :param layer: Layer being analyzed
+        :return: Line plot, or None if no bokeh server session exists
+        """
+        # Only publish plots to a document if a bokeh server session exists
+        if not self.bokeh_session:
+            return None
+
+        return LinePlot(x_axis_label="Compression Ratios", y_axis_label="Eval Scores",
+                        title=layer.name, bokeh_session=self.bokeh_session)
+
+    def _publish_eval_score(self, tabular_progress_object, progress_bar, layer_wise_eval_scores_plot,
+                            layer: Layer, comp_ratio: Decimal, eval_score: float):
+        """
+        Updates the bokeh plot, data table and progress bar with a newly computed eval score
+        """
+        # pylint: disable=too-many-arguments
+        if self.bokeh_session:
+            layer_wise_eval_scores_plot.update(new_x_coordinate=comp_ratio, new_y_coordinate=eval_score)
+            # Update the data table by adding the computed eval score
+            tabular_progress_object.update_table(str(comp_ratio), layer.name, eval_score)
+            # Update the progress bar
+            progress_bar.update()
+
+    def _compute_layerwise_eval_score_per_comp_ratio_candidate(self, tabular_progress_object, progress_bar,
+                                                               layer: Layer) -> Dict[Decimal, float]:
+        """
+        Computes eval scores for each compression-ratio candidate for a given layer
+        :param layer: Layer for which to calculate eval scores
+        :return: Dictionary of {compression_ratio: eval_score} for each compression-ratio candidate
+        """
+
+        layer_wise_eval_scores_dict = {}
+        layer_wise_eval_scores_plot = self._create_layer_wise_eval_scores_plot(layer)
+
+        # Loop over each candidate
+        for comp_ratio in self._comp_ratio_candidates:
+            eval_score = self._get_cached_eval_score(layer, comp_ratio)
+            if eval_score is None:
+                eval_score, exited_early = self._compute_eval_score(layer, comp_ratio)
+                self._cache_eval_score(layer, comp_ratio, eval_score, exited_early)
+
+            layer_wise_eval_scores_dict[comp_ratio] = eval_score
+            self._publish_eval_score(tabular_progress_object, progress_bar, layer_wise_eval_scores_plot,
+                                     layer, comp_ratio, eval_score)
 
         # remove plot so that we have a fresh figure to visualize for the next layer.
         if self.bokeh_session:
@@ -481,17 +1032,21 @@ class TarRankSelectAlgo(CompRatioSelectAlgo):
 
     def __init__(self, layer_db: LayerDatabase, pruner: Pruner, cost_calculator: cc.CostCalculator,
                  eval_func: EvalFunction, eval_iterations, cost_metric: CostMetric,
-                 num_rank_indices: int, use_cuda: bool):
+                 num_rank_indices: int, use_cuda: bool, num_workers: int = 1):
 
         # pylint: disable=too-many-arguments
         CompRatioSelectAlgo.__init__(self, layer_db, cost_calculator, cost_metric,
                                      comp_ratio_rounding_algo=None)
 
+        if num_workers < 1:
+            raise ValueError("Error: num_workers={}. Need at least one worker".format(num_workers))
+
         self._eval_func = eval_func
         self._eval_iter = eval_iterations
         self._is_cuda = use_cuda
         self._pruner = pruner
         self._num_rank_indices = num_rank_indices
+        self._num_workers = num_workers
         self._svd_lib_ref = pymo.GetSVDInstance()
 
     def _compute_compressed_model_cost(self, layer_ratio_list, original_model_cost):
@@ -518,10 +1073,9 @@ class TarRankSelectAlgo(CompRatioSelectAlgo):
 
         return model_compression_ratio
 
-    def _compute_comp_ratios_and_eval_scores(self, rank_index):
+    def _compute_comp_ratios_and_eval_scores(self, layer_rank_dict: Dict[Layer, int]):
         """
-        :param rank_index: Rank index for which the comp ratio and
-                           eval score need to be computed across layers
+        :param layer_rank_dict: Candidate rank of each selected layer for a rank index
         :return: layers<->comp_ratio<->eval_score
                  associations for input rank index
         """
@@ -529,31 +1083,63 @@ class TarRankSelectAlgo(CompRatioSelectAlgo):
         comp_ratio_eval_score_across_layers = []
         layer_ratio_list = []
 
-        for layer in self._layer_db.get_selected_layers():
-            # Get the candidate rank for given rank index and layer
-            rank = self._svd_lib_ref.GetCandidateRanks(str(layer.name), rank_index)
+        for layer, rank in layer_rank_dict.items():
 
             # Get compression ratio for this layer ad rank index
-            comp_ratio = self._cost_calculator.calculate_comp_ratio_given_rank(layer, rank[0], self._cost_metric)
+            comp_ratio = self._cost_calculator.calculate_comp_ratio_given_rank(layer, rank, self._cost_metric)
 
             # Eval_score for this comp_ratio
-            pruned_layer_db = self._pruner.prune_model(self._layer_db,
-                                                       [LayerCompRatioPair(layer=layer,
-                                                                           comp_ratio=comp_ratio)],
-                                                       self._cost_metric,
-                                                       None)
+            if self._num_workers > 1:
+                # Worker threads share the model, so each of them needs its own pruned copy
+                pruned_layer_db = self._pruner.prune_model(self._layer_db, [LayerCompRatioPair(layer, comp_ratio)],
+                                                           self._cost_metric, trainer=None)
+                eval_score = self._eval_func(pruned_layer_db.model, self._eval_iter, use_cuda=self._is_cuda)
+                pruned_layer_db.destroy()
 
-            eval_score = self._eval_func(pruned_layer_db.model, self._eval_iter, use_cuda=self._is_cuda)
-
-            # destroy the layer database
-            pruned_layer_db.destroy()
-            pruned_layer_db = None
+            else:
+                with self._pruner.patch_model(self._layer_db, layer, comp_ratio, self._cost_metric) as pruned_model:
+                    eval_score = self._eval_func(pruned_model, self._eval_iter, use_cuda=self._is_cuda)
 
             comp_ratio_eval_score_across_layers.append(LayerCompRatioEvalScore(layer, comp_ratio, eval_score))
             layer_ratio_list.append(LayerCompRatioPair(layer=layer, comp_ratio=comp_ratio))
 
         return layer_ratio_list, comp_ratio_eval_score_across_layers
 
+    def _compute_rank_index_objective_score(self, layer_rank_dict: Dict[Layer, int], original_model_cost) -> \
+            Tuple[List[LayerCompRatioEvalScore], float]:
+        """
+        Evaluates the layers pruned individually, and the model compressed with all layers pruned, for a rank index
+        :param layer_rank_dict: Candidate rank of each selected layer for the rank index
+        :param original_model_cost: Cost of the original model
+        :return: layers<->comp_ratio<->eval_score associations, and the objective score of the rank index
+        """
+        # per rank index, store :
+        # layer<->comp_ratio<->eval_score associations
+        # layer_ratio_list needed to compute compressed model cost
+        layer_ratio_list, comp_ratio_eval_score_across_layers = \
+            self._compute_comp_ratios_and_eval_scores(layer_rank_dict)
+
+        # --- Begin ---
+        # Logic to pick a rank_index which maximizes both compression achieved and performance of the model.
+
+        # Compress the model given a rank index with all the ratio(s) across layers
+        pruned_layer_db = self._pruner.prune_model(self._layer_db,
+                                                   comp_ratio_eval_score_across_layers,
+                                                   self._cost_metric,
+                                                   trainer=None)
+
+        # Get accuracy and comp ratio of compressed model
+        model_accuracy = self._eval_func(pruned_layer_db.model, self._eval_iter, use_cuda=self._is_cuda)
+
+        # destroy the layer database
+        pruned_layer_db.destroy()
+        pruned_layer_db = None
+
+        model_compression_ratio = self._compute_compressed_model_cost(layer_ratio_list, original_model_cost)
+        objective_score = float(1 - model_accuracy) + float(1 - model_compression_ratio)
+
+        return comp_ratio_eval_score_across_layers, objective_score
+
     def select_per_layer_comp_ratios(self):
         """
         :return: per layer compression ratio list
@@ -570,35 +1156,23 @@ class TarRankSelectAlgo(CompRatioSelectAlgo):
         # compute original model cost before compression
         original_model_cost = self._cost_calculator.compute_model_cost(self._layer_db)
 
+        # Get the candidate rank of each layer for all rank indices upfront, in this thread. The workers split layers
+        # using the SVD factorizations cached by the pruner, and do not call into pymo
+        layer_rank_dicts = [{layer: self._svd_lib_ref.GetCandidateRanks(str(layer.name), rank_index)[0]
+                             for layer in self._layer_db.get_selected_layers()}
+                            for rank_index in range(num_rank_indices)]
+
         comp_ratio_eval_score_across_layers = {}
         rank_index_objective_score_map = {}
 
-        # compute objective score per rank index
-        for rank_index in range(num_rank_indices):
-            # per rank index, store :
-            # layer<->comp_ratio<->eval_score associations
-            # layer_ratio_list needed to compute compressed model cost
-            layer_ratio_list, comp_ratio_eval_score_across_layers[rank_index] = \
-                self._compute_comp_ratios_and_eval_scores(rank_index)
-
-            # --- Begin ---
-            # Logic to pick a rank_index which maximizes both compression achieved and performance of the model.
-
-            # Compress the model given a rank index with all the ratio(s) across layers
-            pruned_layer_db = self._pruner.prune_model(self._layer_db,
-                                                       comp_ratio_eval_score_across_layers[rank_index],
-                                                       self._cost_metric,
-                                                       trainer=None)
-
-            # Get accuracy and comp ratio of compressed model
-            model_accuracy = self._eval_func(pruned_layer_db.model, self._eval_iter, use_cuda=self._is_cuda)
-
-            # destroy the layer database
-            pruned_layer_db.destroy()
-            pruned_layer_db = None
+        # compute objective score per rank index, with up to self._num_workers rank indices in flight
+        results = ordered_parallel_map(
+            lambda layer_rank_dict: self._compute_rank_index_objective_score(layer_rank_dict, original_model_cost),
+            layer_rank_dicts, self._num_workers)
 
-            model_compression_ratio = self._compute_compressed_model_cost(layer_ratio_list, original_model_cost)
-            rank_index_objective_score_map[rank_index] = (float(1 - model_accuracy) + float(1 - model_compression_ratio))
+        for rank_index, (comp_ratio_eval_scores, objective_score) in enumerate(results):
+            comp_ratio_eval_score_across_layers[rank_index] = comp_ratio_eval_scores
+            rank_index_objective_score_map[rank_index] = objective_score
 
         # pick the index that achieves optimal compression and accuracy = index with minimum objectvie score
         best_rank_index = min(rank_index_objective_score_map.keys(), key=(lambda k: rank_index_objective_score_map[k]))
@@ -38,13 +38,17 @@
 
 """ Abstract aimet Compression Algorithm """
 
+import collections
+import collections.abc
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 import pickle
 import os
 import torch
 from aimet_common.comp_ratio_select import GreedyCompRatioSelectAlgo
-from aimet_common.defs import CostMetric, LayerCompRatioPair, EvalFunction, CompressionStats
+from aimet_common.defs import CostMetric, LayerCompRatioPair, EvalFunction, CompressionStats, \
+    CompressionSweepResult
 from aimet_common import cost_calculator as cc
 from aimet_common.pruner import Pruner
 from aimet_common.comp_ratio_select import CompRatioSelectAlgo
@@ -105,22 +109,93 @@ class CompressionAlgo:
 
         return compressed_layer_db, stats
 
+    def compress_model_for_targets(self, cost_metric: CostMetric, target_comp_ratios: List[float], trainer=None,
+                                   create_models: bool = False, num_workers: int = 1) -> List[CompressionSweepResult]:
+        """
+        Selects per-layer compression-ratios for several target compression-ratios, e.g. to trace the trade-off
+        between compression and accuracy. The eval scores dictionary is computed only once for all targets
+        :param cost_metric: Cost metric to use compression (mac or memory)
+        :param target_comp_ratios: List of target compression-ratios
+        :param trainer: Training function, used only if create_models is True
+        :param create_models: If True, a compressed model is created and evaluated for each target
+        :param num_workers: Number of threads used to create and evaluate the compressed models. Models are created
+         one at a time if the pruner is not thread-safe
+        :return: List of results, one per target compression-ratio
+        """
+        # pylint: disable=too-many-arguments, too-many-locals
+        if not isinstance(self._comp_ratio_select_algo, GreedyCompRatioSelectAlgo):
+            raise ValueError("Compressing for several target compression-ratios needs the greedy (auto mode) "
+                             "compression-ratio selection")
+
+        # Select layers
+        self._layer_selector.select(self._layer_db, self._modules_to_ignore)
+        unselected_layer_comp_ratio_list = [LayerCompRatioPair(layer, None) for layer in self._layer_db
+                                            if layer not in self._layer_db.get_selected_layers()]
+
+        # Find compression ratios for each layer and each target, from a single eval scores dictionary
+        selections = self._comp_ratio_select_algo.select_per_layer_comp_ratios_for_targets(target_comp_ratios)
+
+        original_model_cost = self._cost_calculator.compute_model_cost(self._layer_db)
+        results = []
+        for target_comp_ratio, (layer_comp_ratio_list, _) in zip(target_comp_ratios, selections):
+            compressed_model_cost = self._cost_calculator.calculate_compressed_cost(
+                self._layer_db, layer_comp_ratio_list + unselected_layer_comp_ratio_list, cost_metric)
+            results.append(CompressionSweepResult(target_comp_ratio, layer_comp_ratio_list,
+                                                  Decimal(compressed_model_cost.memory / original_model_cost.memory),
+                                                  Decimal(compressed_model_cost.mac / original_model_cost.mac)))
+
+        if create_models:
+            baseline_accuracy = self._evaluate_model(self._layer_db.model)
+
+            def create_and_evaluate_model(selection):
+                layer_comp_ratio_list, comp_ratio_select_stats = selection
+                compressed_layer_db = self._pruner.prune_model(self._layer_db, layer_comp_ratio_list, cost_metric,
+                                                               trainer)
+                compressed_model_cost = self._cost_calculator.compute_model_cost(compressed_layer_db)
+                stats = self._compile_stats(compressed_layer_db, compressed_model_cost, layer_comp_ratio_list,
+                                            comp_ratio_select_stats, baseline_accuracy)
+                return compressed_layer_db, stats
+
+            if not self._pruner.IS_THREAD_SAFE:
+                num_workers = 1
+
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                for result, (compressed_layer_db, stats) in zip(results, executor.map(create_and_evaluate_model,
+                                                                                       selections)):
+                    result.compressed_layer_db = compressed_layer_db
+                    result.compression_stats = stats
+
+        return results
+
+    def _evaluate_model(self, model) -> float:
+        """
+        Evaluates a model on the full eval dataset
+        :param model: Model to evaluate
+        :return: Eval score. For a progressive eval function this is the last running eval score
+        """
+        eval_result = self._eval_func(model, None, self._use_cuda)
+        if isinstance(eval_result, collections.abc.Iterator):
+            eval_result = collections.deque(eval_result, maxlen=1)[0]
+        return eval_result
+
     def _compile_stats(self, compressed_layer_db: LayerDatabase,
                        compressed_model_cost: cc.Cost,
                        layer_comp_ratio_list: List[LayerCompRatioPair],
-                       compression_ratio_select_stats) -> CompressionStats:
+                       compression_ratio_select_stats, baseline_accuracy: Optional[float] = None) -> CompressionStats:
         """
         Compile compression statistics
         :param compressed_layer_db: LayerDatabase for the compressed model
         :param layer_comp_ratio_list: List of per-layer compression ratios
+        :param baseline_accuracy: Accuracy of the original model, evaluated if not given
         :return: CompressionStats instance
         """
 
         # Baseline accuracy
-        baseline_accuracy = self._eval_func(self._layer_db.model, None, self._use_cuda)
+        if baseline_accuracy is None:
+            baseline_accuracy = self._evaluate_model(self._layer_db.model)
 
         # Compressed accuracy
-        compressed_accuracy = self._eval_func(compressed_layer_db.model, None, self._use_cuda)
+        compressed_accuracy = self._evaluate_model(compressed_layer_db.model)
 
         # Compression-ratios
         original_model_cost = cc.CostCalculator.compute_model_cost(self._layer_db)
@@ -37,9 +37,12 @@
 # =============================================================================
 
 """Network and per layer cost calculator"""
-from typing import List
+import bisect
+import weakref
+from typing import List, Dict
 from decimal import Decimal
 from functools import reduce
+import numpy as np
 from aimet_common.layer_database import Layer, Conv2dTypeSpecificParams, LayerDatabase
 from aimet_common.utils import AimetLogger
 from aimet_common.defs import CostMetric, LayerCompRatioPair
@@ -68,10 +71,58 @@ class Cost:
                     self.mac - another_cost.mac)
 
 
+class RankCostTable:
+    """
+    Compressed costs of a layer for every candidate rank from 0 to the max rank of the layer
+    """
+
+    def __init__(self, memory_costs: List[int], mac_costs: List[int]):
+        """
+        :param memory_costs: Compressed memory cost of the layer, indexed by rank
+        :param mac_costs: Compressed mac cost of the layer, indexed by rank
+        """
+        self._memory_costs = memory_costs
+        self._mac_costs = mac_costs
+
+    @property
+    def max_rank(self) -> int:
+        """ Returns the max rank of the layer """
+        return len(self._mac_costs) - 1
+
+    def get_cost(self, rank: int) -> Cost:
+        """
+        Returns the compressed cost of the layer for a given rank
+        :param rank: Rank to split the layer with
+        :return: Compressed cost
+        """
+        return Cost(self._memory_costs[rank], self._mac_costs[rank])
+
+    def find_rank(self, target_cost, cost_metric: CostMetric) -> int:
+        """
+        Finds the highest rank whose compressed cost does not exceed the target cost. Costs are non-decreasing in
+        rank, so this is a binary search
+        :param target_cost: Target compressed cost
+        :param cost_metric: Cost metric (mac or memory)
+        :return: Rank, or 0 if even rank 1 exceeds the target cost
+        """
+        costs = self._memory_costs if cost_metric == CostMetric.memory else self._mac_costs
+        return max(bisect.bisect_right(costs, target_cost) - 1, 0)
+
+
+# Rank-cost tables, keyed by layer and then by cost calculator class. Tables are shared by every user of a cost
+# calculator (e.g. comp-ratio rounders and the greedy comp-ratio selection) and are dropped along with their layer
+_rank_cost_tables: Dict[Layer, Dict[type, RankCostTable]] = weakref.WeakKeyDictionary()
+
+
 class CostCalculator:
     """
     Utility for calculating per layer cost and network cost
     """
+
+    # True if the compressed cost of a model is the sum of the compressed costs of its layers, each computed using
+    # calculate_per_layer_compressed_cost(), i.e. compressing a layer does not change the cost of other layers
+    HAS_INDEPENDENT_LAYER_COSTS = True
+
     @classmethod
     def get_compressed_model_cost(cls, layer_db, layer_ratio_list, original_model_cost, cost_metric):
         """
@@ -148,6 +199,26 @@ class CostCalculator:
 
         return Cost(network_cost_memory, network_cost_mac)
 
+    @classmethod
+    def get_rank_cost_table(cls, layer: Layer) -> RankCostTable:
+        """
+        Returns the memoized table of compressed costs of a layer for all candidate ranks
+        :param layer: Layer
+        :return: Rank-cost table
+        """
+        tables = _rank_cost_tables.setdefault(layer, {})
+        table = tables.get(cls)
+
+        if table is None:
+            # Compressed costs are computed for all ranks at once, calculate_cost_given_rank() being element-wise
+            ranks = np.arange(cls.calculate_max_rank(layer) + 1, dtype=np.int64)
+            cost = cls.calculate_cost_given_rank(layer, ranks)
+            table = RankCostTable(np.broadcast_to(cost.memory, ranks.shape).tolist(),
+                                  np.broadcast_to(cost.mac, ranks.shape).tolist())
+            tables[cls] = table
+
+        return table
+
     @classmethod
     def calculate_comp_ratio_given_rank(cls, layer: Layer, rank: int, cost_metric: CostMetric):
         """
@@ -159,12 +230,11 @@ class CostCalculator:
         """
 
         original_cost = CostCalculator.compute_layer_cost(layer)
+        compressed_cost = cls.get_rank_cost_table(layer).get_cost(rank)
         if cost_metric == CostMetric.memory:
-            compressed_cost = cls.calculate_cost_given_rank(layer, rank).memory
-            updated_comp_ratio = Decimal(compressed_cost)/Decimal(original_cost.memory)
+            updated_comp_ratio = Decimal(compressed_cost.memory)/Decimal(original_cost.memory)
         else:
-            compressed_cost = cls.calculate_cost_given_rank(layer, rank).mac
-            updated_comp_ratio = Decimal(compressed_cost)/Decimal(original_cost.mac)
+            updated_comp_ratio = Decimal(compressed_cost.mac)/Decimal(original_cost.mac)
         return updated_comp_ratio
 
     @classmethod
@@ -184,30 +254,10 @@ class CostCalculator:
         else:
             target_cost = orig_cost.memory * comp_ratio
 
-        # Invoke via use of strategy pattern
-        current_rank_candidate = cls.calculate_max_rank(layer)
-
-        if cost_metric == CostMetric.memory:
-            running_cost = cls.calculate_cost_given_rank(layer, current_rank_candidate).memory
-        else:
-            running_cost = cls.calculate_cost_given_rank(layer, current_rank_candidate).mac
-
-        while (running_cost > target_cost) and (current_rank_candidate > 0):
-
-            current_rank_candidate -= 1
-
-            # Invoke via use of strategy pattern
-            cost = cls.calculate_cost_given_rank(layer, current_rank_candidate)
-
-            if cost_metric == CostMetric.memory:
-                running_cost = cost.memory
-            else:
-                running_cost = cost.mac
-
-        if current_rank_candidate <= 0:
-            current_rank_candidate = 1
+        # Highest rank whose cost does not exceed the target cost
+        rank = cls.get_rank_cost_table(layer).find_rank(target_cost, cost_metric)
 
-        return current_rank_candidate
+        return max(rank, 1)
 
     @classmethod
     def calculate_per_layer_compressed_cost(cls, layer: Layer, comp_ratio: float, cost_metric: CostMetric) -> Cost:
@@ -221,7 +271,7 @@ class CostCalculator:
 
         # Invoke using the strategy pattern
         rank = cls.calculate_rank_given_comp_ratio(layer, comp_ratio, cost_metric)
-        cost = cls.calculate_cost_given_rank(layer, rank)
+        cost = cls.get_rank_cost_table(layer).get_cost(rank)
 
         return cost
 
@@ -39,7 +39,7 @@
 """ Common type definitions that are used across aimet """
 import io
 from enum import Enum
-from typing import Union, Callable, Any, Optional, Dict, List
+from typing import Union, Callable, Any, Optional, Dict, List, Iterator
 from decimal import Decimal
 
 from aimet_common.layer_database import Layer
@@ -168,20 +168,29 @@ class TarRankSelectionParameters:
     Configuration parameters for the TAR compression-ratio selection algorithm
 
     :ivar num_rank_indices: Number of rank indices for ratio selection.
+    :ivar num_workers: Number of worker threads used to evaluate rank indices concurrently. Default value=1, which
+            evaluates rank indices serially.
 
     """
-    def __init__(self, num_rank_indices: int):
+    def __init__(self, num_rank_indices: int, num_workers: int = 1):
 
         # Sanity check
         if num_rank_indices < 2:
             raise ValueError("Error: num_rank_indices={}. Need at least 2 candidates for "
                              "TAR based compression-ratio selection".format(num_rank_indices))
 
+        if num_workers < 1:
+            raise ValueError("Error: num_workers={}. Need at least one worker".format(num_workers))
+
         self.num_rank_indices = num_rank_indices
+        self.num_workers = num_workers
 
 
 EvalFunction = Callable[[Any, Optional[int], bool], float]
 
+# Eval function that yields the running eval score (average over the batches seen so far) after each batch
+ProgressiveEvalFunction = Callable[[Any, Optional[int], bool], Iterator[float]]
+
 
 class GreedySelectionParameters:
     """
@@ -200,13 +209,33 @@ class GreedySelectionParameters:
             different target compression-ratios for example. aimet will save eval_scores
             dictionary pickle file automatically in a ./data directory relative to the
             current path. num_comp_ratio_candidates parameter will be ignored when this option is used.
+    :ivar num_workers: Number of workers used to compute the eval scores dictionary. Each (layer, comp-ratio)
+            candidate is an independent prune-and-eval job. Default value=1, which evaluates candidates serially.
+    :ivar use_processes: If True, the workers are forked processes instead of threads. Use this when the pruner or
+            eval function is not thread-safe. CUDA must not be initialized before forking.
+    :ivar eval_scores_cache_path: Path to a persistent eval scores cache file. Eval scores are looked up in and
+            written to this cache after every evaluation, keyed on the model structure, layer, comp-ratio, cost
+            metric, pruner and eval function. An interrupted or re-tuned run never repeats an eval. By default no
+            cache is used.
+    :ivar adaptive_sampling_tolerance: If set, each layer is first evaluated at only a few comp-ratio candidates.
+            Further candidates are evaluated only where the eval score changes by more than this tolerance (in
+            eval score units), until linear interpolation is within tolerance. Eval scores of the remaining
+            candidates are interpolated. By default all candidates are evaluated.
+    :ivar early_exit_score_threshold: Only used with a progressive eval function, which yields the running eval score
+            after each batch. Evaluation of a candidate stops as soon as its eval score is confidently below this
+            threshold. Set this below the lowest eval score you would accept for the compressed model.
     """
 
     def __init__(self,
                  target_comp_ratio: float,
                  num_comp_ratio_candidates: int = 10,
                  use_monotonic_fit: bool = False,
-                 saved_eval_scores_dict: Optional[str] = None):
+                 saved_eval_scores_dict: Optional[str] = None,
+                 num_workers: int = 1,
+                 use_processes: bool = False,
+                 eval_scores_cache_path: Optional[str] = None,
+                 adaptive_sampling_tolerance: Optional[float] = None,
+                 early_exit_score_threshold: Optional[float] = None):
 
         self.target_comp_ratio = target_comp_ratio
 
@@ -219,6 +248,15 @@ class GreedySelectionParameters:
         self.use_monotonic_fit = use_monotonic_fit
         self.saved_eval_scores_dict = saved_eval_scores_dict
 
+        if num_workers < 1:
+            raise ValueError("Error: num_workers={}. Need at least one worker".format(num_workers))
+
+        self.num_workers = num_workers
+        self.use_processes = use_processes
+        self.eval_scores_cache_path = eval_scores_cache_path
+        self.adaptive_sampling_tolerance = adaptive_sampling_tolerance
+        self.early_exit_score_threshold = early_exit_score_threshold
+
 
 class GreedyCompressionRatioSelectionStats:
     """ Statistics for the greedy compression-ratio selection algorithm """
@@ -310,3 +348,27 @@ class CompressionStats:
         stream.write('**********************************************************************************************\n')
 
         return stream.getvalue()
+
+
+class CompressionSweepResult:
+    """ Result of a compression sweep for one target compression-ratio """
+
+    def __init__(self, target_comp_ratio: float, layer_comp_ratio_list: List[LayerCompRatioPair],
+                 mem_comp_ratio: Decimal, mac_comp_ratio: Decimal, compressed_layer_db=None,
+                 compression_stats: Optional[CompressionStats] = None):
+        """
+        Constructor
+        :param target_comp_ratio: Target compression-ratio
+        :param layer_comp_ratio_list: Selected per-layer compression-ratios
+        :param mem_comp_ratio: Memory compression-ratio of the compressed model
+        :param mac_comp_ratio: MAC compression-ratio of the compressed model
+        :param compressed_layer_db: Layer database of the compressed model, if it was created
+        :param compression_stats: Statistics of the compressed model, if it was created and evaluated
+        """
+        # pylint: disable=too-many-arguments
+        self.target_comp_ratio = target_comp_ratio
+        self.layer_comp_ratio_list = layer_comp_ratio_list
+        self.memory_compression_ratio = mem_comp_ratio
+        self.mac_compression_ratio = mac_comp_ratio
+        self.compressed_layer_db = compressed_layer_db
+        self.compression_stats = compression_stats
@@ -0,0 +1,208 @@
+# /usr/bin/env python3.5
+# -*- mode: python -*-
+# =============================================================================
+#  @@-COPYRIGHT-START-@@
+#
+#  Copyright (c) 2020, Qualcomm Innovation Center, Inc. All rights reserved.
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+#
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#  3. Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#
+#  @@-COPYRIGHT-END-@@
+
+""" Persistent cache of eval scores computed during compression-ratio selection """
+
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+from decimal import Decimal
+from typing import Optional
+import numpy as np
+
+from aimet_common.defs import CostMetric
+from aimet_common.layer_database import LayerDatabase
+from aimet_common.utils import AimetLogger
+
+logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.CompRatioSelect)
+
+
+class EvalScoreCache:
+    """
+    Disk-backed cache of eval scores for (layer, compression-ratio) candidates. Entries are content-addressed: the key
+    is a hash of the model structure and weights, layer name, compression-ratio, cost metric, pruner type and eval
+    function identity, so scores computed for a different model or setup are never reused. All parameters and buffers
+    of a torch model (e.g. biases and batchnorm statistics) and all variables of a TensorFlow session are hashed. Each
+    score is committed as soon as it is stored, so an interrupted run resumes without repeating any eval
+    """
+
+    def __init__(self, cache_path: str, layer_db: LayerDatabase, pruner, eval_func, eval_iterations,
+                 cost_metric: CostMetric):
+        """
+        Constructor
+        :param cache_path: Path to the cache file. Created if it does not exist
+        :param layer_db: Layer database of the model being compressed
+        :param pruner: Pruner used to prune candidate layers
+        :param eval_func: Eval function used to score candidates
+        :param eval_iterations: Iterations passed to the eval function
+        :param cost_metric: Cost metric
+        """
+        # pylint: disable=too-many-arguments
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self._connection = sqlite3.connect(cache_path)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS eval_scores '
+                                 '(key TEXT PRIMARY KEY, layer_name TEXT, comp_ratio TEXT, eval_score REAL)')
+        self._connection.commit()
+
+        self._context_key = self._compute_context_key(layer_db, pruner, eval_func, eval_iterations, cost_metric)
+
+        logger.info("Eval score cache: Using %s", cache_path)
+
+    @staticmethod
+    def _get_value_digest(value) -> str:
+        """
+        Returns a digest of a value, e.g. an argument bound to the eval function
+        :param value: Value to hash
+        :return: Hex digest of the pickled value. Values that cannot be pickled are hashed by their repr, which for most
+                 objects includes their address, so scores depending on them are not reused across runs
+        """
+        try:
+            data = pickle.dumps(value, protocol=4)
+        except Exception:   # pylint: disable=broad-except
+            data = repr(value).encode()
+        return hashlib.sha256(data).hexdigest()
+
+    @classmethod
+    def _get_identity(cls, obj) -> str:
+        """
+        Returns a name identifying a callable or object across runs. Arguments bound with functools.partial, the
+        instance of a bound method and the code, closure and default arguments of a function are part of the
+        identity, so e.g. two lambdas or two partials of the same function with different arguments do not collide
+        :param obj: Function, method or object
+        :return: Identity string
+        """
+        if isinstance(obj, functools.partial):
+            return '{}({}, {})'.format(cls._get_identity(obj.func),
+                                       cls._get_value_digest(obj.args),
+                                       cls._get_value_digest(sorted(obj.keywords.items())))
+
+        if hasattr(obj, '__self__') and hasattr(obj, '__func__'):
+            return '{}[{}]'.format(cls._get_identity(obj.__func__), cls._get_value_digest(obj.__self__))
+
+        if not hasattr(obj, '__qualname__'):
+            obj = type(obj)
+        identity = '{}.{}'.format(getattr(obj, '__module__', ''), obj.__qualname__)
+
+        code = getattr(obj, '__code__', None)
+        if code is not None:
+            closure = [cell.cell_contents for cell in obj.__closure__ or ()]
+            identity += '[{}]'.format(cls._get_value_digest((code.co_code, repr(code.co_consts), closure,
+                                                             obj.__defaults__, obj.__kwdefaults__)))
+
+        return identity
+
+    @staticmethod
+    def _get_weight_digest(layer_db: LayerDatabase) -> str:
+        """
+        Returns a digest of the state of the model: the state_dict() of a torch model (parameters and buffers) or the
+        global variables of a TensorFlow session
+        :param layer_db: Layer database
+        :return: Hex digest
+        """
+        model = layer_db.model
+        if hasattr(model, 'state_dict'):
+            state = [(name, value.detach().cpu().numpy()) for name, value in model.state_dict().items()]
+        else:
+            variables = model.graph.get_collection('variables')
+            state = zip([variable.name for variable in variables], model.run(variables))
+
+        hasher = hashlib.sha256()
+        for name, value in state:
+            value = np.ascontiguousarray(value)
+            hasher.update(repr((name, str(value.dtype), value.shape)).encode())
+            hasher.update(value.tobytes())
+        return hasher.hexdigest()
+
+    @classmethod
+    def _compute_context_key(cls, layer_db: LayerDatabase, pruner, eval_func, eval_iterations,
+                             cost_metric: CostMetric) -> str:
+        """
+        Hashes everything except the layer and compression-ratio that an eval score depends on
+        :return: Hex digest
+        """
+        # pylint: disable=too-many-arguments
+        hasher = hashlib.sha256()
+
+        # Model structure as captured by the layer database
+        for layer in layer_db:
+            hasher.update(repr((layer.name, type(layer.module).__name__, tuple(layer.weight_shape),
+                                tuple(layer.output_shape))).encode())
+
+        hasher.update(cls._get_weight_digest(layer_db).encode())
+
+        hasher.update(repr((cls._get_identity(pruner), cls._get_identity(eval_func), eval_iterations,
+                            str(cost_metric))).encode())
+        return hasher.hexdigest()
+
+    def _get_key(self, layer_name: str, comp_ratio: Decimal) -> str:
+        hasher = hashlib.sha256(self._context_key.encode())
+        hasher.update(repr((layer_name, str(comp_ratio))).encode())
+        return hasher.hexdigest()
+
+    def get(self, layer_name: str, comp_ratio: Decimal) -> Optional[float]:
+        """
+        Looks up the eval score of a candidate
+        :param layer_name: Name of the pruned layer
+        :param comp_ratio: Compression-ratio
+        :return: Cached eval score, or None if the candidate has not been evaluated before
+        """
+        row = self._connection.execute('SELECT eval_score FROM eval_scores WHERE key = ?',
+                                       (self._get_key(layer_name, comp_ratio),)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, layer_name: str, comp_ratio: Decimal, eval_score: float):
+        """
+        Stores the eval score of a candidate and commits it to disk
+        :param layer_name: Name of the pruned layer
+        :param comp_ratio: Compression-ratio
+        :param eval_score: Eval score
+        """
+        self._connection.execute('INSERT OR REPLACE INTO eval_scores VALUES (?, ?, ?, ?)',
+                                 (self._get_key(layer_name, comp_ratio), layer_name, str(comp_ratio),
+                                  float(eval_score)))
+        self._connection.commit()
+
+    def close(self):
+        """
+        Closes the cache file
+        """
+        self._connection.close()
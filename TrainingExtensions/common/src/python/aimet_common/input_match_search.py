@@ -42,6 +42,8 @@
 
 """ Sub-sample data for weight reconstruction for channel pruning feature """
 
+import tempfile
+from typing import Optional
 import numpy as np
 
 from aimet_common.utils import AimetLogger
@@ -49,6 +51,79 @@ from aimet_common.utils import AimetLogger
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.Test)
 
 
+class SubSampledDataBuffer:
+    """
+    Buffer that sub sampled data of many batches is written into in place. The buffer is allocated once for the
+    expected number of batches, in memory or, when it would not fit in the memory budget, in a np.memmap spill file
+    """
+
+    def __init__(self, num_of_batches: int, memory_budget: Optional[int] = None, spill_dir: Optional[str] = None):
+        """
+        :param num_of_batches: expected number of batches, each batch being the size of the first one
+        :param memory_budget: maximum size in bytes of the buffer in memory, None for no limit
+        :param spill_dir: directory for the spill file, None for the default temporary directory
+        """
+        self._num_of_batches = num_of_batches
+        self._memory_budget = memory_budget
+        self._spill_dir = spill_dir
+        self._data = None
+        self._num_samples = 0
+
+    @property
+    def is_spilled(self) -> bool:
+        """ True if the buffer is in a spill file """
+        return isinstance(self._data, np.memmap)
+
+    def _allocate(self, num_samples: int, sample_shape: tuple, dtype: np.dtype) -> np.ndarray:
+        """
+        Allocate a buffer in memory or, if it exceeds the memory budget, in a spill file
+
+        :param num_samples: number of samples
+        :param sample_shape: shape of a sample
+        :param dtype: data type
+        :return: buffer of shape (num_samples, *sample_shape)
+        """
+        shape = (num_samples,) + sample_shape
+        num_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+        if self._memory_budget is None or num_bytes <= self._memory_budget:
+            return np.empty(shape, dtype=dtype)
+
+        logger.info("Sub sampled data of %s bytes exceeds the memory budget, spilling to disk", num_bytes)
+
+        # the spill file is removed when closed, its storage is kept by the memory map until it is released
+        with tempfile.TemporaryFile(dir=self._spill_dir) as spill_file:
+            return np.memmap(spill_file, dtype=dtype, mode='w+', shape=shape)
+
+    def append(self, data: np.ndarray):
+        """
+        Write the sub sampled data of a batch into the buffer
+
+        :param data: sub sampled data of shape (samples, ...)
+        """
+        if self._data is None:
+            self._data = self._allocate(self._num_of_batches * len(data), data.shape[1:], data.dtype)
+
+        elif self._num_samples + len(data) > len(self._data):
+            # a batch larger than the first one, grow the buffer
+            data_buffer = self._allocate(max(2 * len(self._data), self._num_samples + len(data)),
+                                         self._data.shape[1:], self._data.dtype)
+            data_buffer[:self._num_samples] = self._data[:self._num_samples]
+            self._data = data_buffer
+
+        self._data[self._num_samples:self._num_samples + len(data)] = data
+        self._num_samples += len(data)
+
+    def get_data(self) -> np.ndarray:
+        """
+        :return: sub sampled data of all the batches written into the buffer
+        """
+        if self._data is None:
+            raise ValueError("No sub sampled data was written into the buffer!")
+
+        return self._data[:self._num_samples]
+
+
 class InputMatchSearch:
     """ Utilities to find a set of input pixels corresponding to an output pixel for weight reconstruction """
 
@@ -247,6 +322,48 @@ class InputMatchSearch:
 
         return input_match
 
+    @staticmethod
+    def _find_input_matches_for_output_pixels(input_data: np.ndarray, layer_attributes: tuple,
+                                              image_indices: np.ndarray, heights: np.ndarray,
+                                              widths: np.ndarray) -> np.ndarray:
+        """
+        Vectorized version of _find_input_match_for_output_pixel() for many output pixels. The input matches of all
+        output pixels are gathered with a single fancy-indexing operation. Input pixels that fall in the padding
+        are gathered from the clipped border and then zeroed, so the input data is never copied or padded as a whole
+
+        :param input_data: input data (Ns, Nic, act_h, act_w)
+        :param layer_attributes: (kernel_size, stride, padding)
+        :param image_indices: image index of each output pixel
+        :param heights: height index of each output pixel
+        :param widths: width index of each output pixel
+        :return: input matches of size (number of output pixels, Cin, k_h, k_w)
+        """
+        kernel_size, stride, padding = layer_attributes
+        input_height, input_width = input_data.shape[2:]
+
+        # check if there exist a match for given pixels (height, width)
+        output_height = (input_height - kernel_size[0] + 2 * padding[0]) / stride[0] + 1
+        output_width = (input_width - kernel_size[1] + 2 * padding[1]) / stride[1] + 1
+
+        if np.any((heights < 0) | (heights > output_height) | (widths < 0) | (widths > output_width)):
+            raise ValueError("input match can not exist for given height and width indices!")
+
+        # input data rows (num pixels, k_h) and columns (num pixels, k_w) of each input match
+        rows = (stride[0] * heights - padding[0])[:, np.newaxis] + np.arange(kernel_size[0])
+        columns = (stride[1] * widths - padding[1])[:, np.newaxis] + np.arange(kernel_size[1])
+
+        # (num pixels, k_h, k_w, Cin), the advanced indices being separated by the channels slice
+        input_matches = input_data[image_indices[:, np.newaxis, np.newaxis], :,
+                                   np.clip(rows, 0, input_height - 1)[:, :, np.newaxis],
+                                   np.clip(columns, 0, input_width - 1)[:, np.newaxis, :]]
+        input_matches = np.moveaxis(input_matches, 3, 1)
+
+        # zero out the input pixels that are in the padding
+        in_input_data = (((rows >= 0) & (rows < input_height))[:, np.newaxis, :, np.newaxis] &
+                         ((columns >= 0) & (columns < input_width))[:, np.newaxis, np.newaxis, :])
+
+        return np.where(in_input_data, input_matches, np.zeros((), dtype=input_data.dtype))
+
     @classmethod
     def _determine_output_pixel_height_width_range_for_random_selection(cls, layer_attributes: tuple, out_shape: tuple)\
             -> (tuple, tuple):
@@ -282,6 +399,61 @@ class InputMatchSearch:
 
         return height_range, width_range
 
+    @classmethod
+    def select_output_pixels(cls, layer_attributes: tuple, output_shape: tuple,
+                             samples_per_image: int) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Randomly select the output pixels to sub sample, samples_per_image of them in each image
+
+        :param layer_attributes: (kernel_size, stride, padding)
+        :param output_shape: shape of the output data (Ns, Noc, act_h, act_w)
+        :param samples_per_image: number of samples per image (default : 10)
+        :return: image indices, height indices and width indices of the Nb * Ns selected output pixels
+        """
+        batch_size = output_shape[0]
+
+        height_range, width_range = cls._determine_output_pixel_height_width_range_for_random_selection(
+            layer_attributes=layer_attributes, out_shape=output_shape)
+
+        # randomly pick samples per image for height and width dimension
+        heights = []
+        widths = []
+        for _ in range(batch_size):
+            heights.append(np.random.choice(range(*height_range), size=[samples_per_image], replace=True))
+            widths.append(np.random.choice(range(*width_range), size=[samples_per_image], replace=True))
+
+        image_indices = np.repeat(np.arange(batch_size), samples_per_image)
+        heights = np.concatenate(heights).astype(np.int64)
+        widths = np.concatenate(widths).astype(np.int64)
+
+        return image_indices, heights, widths
+
+    @staticmethod
+    def subsample_output_data(output_data: np.ndarray, output_pixels: tuple) -> np.ndarray:
+        """
+        Sub sample the output data at the given output pixels
+
+        :param output_data: output data (Ns, Noc, act_h, act_w)
+        :param output_pixels: (image indices, height indices, width indices) from select_output_pixels()
+        :return: sampled output (Nb * Ns, Noc)
+        """
+        image_indices, heights, widths = output_pixels
+        return output_data[image_indices, :, heights, widths]
+
+    @classmethod
+    def subsample_input_data(cls, layer_attributes: tuple, input_data: np.ndarray,
+                             output_pixels: tuple) -> np.ndarray:
+        """
+        Sub sample the input matches of the given output pixels from the input data
+
+        :param layer_attributes: (kernel_size, stride, padding)
+        :param input_data: input data (Ns, Nic, act_h, act_w)
+        :param output_pixels: (image indices, height indices, width indices) from select_output_pixels()
+        :return: sampled input (Nb * Ns, Nic, kh, kw)
+        """
+        image_indices, heights, widths = output_pixels
+        return cls._find_input_matches_for_output_pixels(input_data, layer_attributes, image_indices, heights, widths)
+
     @classmethod
     def subsample_data(cls, layer_attributes: tuple, input_data: np.ndarray, output_data: np.ndarray,
                        samples_per_image: int) -> (np.ndarray, np.ndarray):
@@ -309,39 +481,10 @@ class InputMatchSearch:
 
         assert input_data.shape[0] == output_data.shape[0]
 
-        batch_size = output_data.shape[0]
-
-        sampled_input = []
-        sampled_output = []
-
-        height_range, width_range = cls._determine_output_pixel_height_width_range_for_random_selection(
-            layer_attributes=layer_attributes, out_shape=output_data.shape)
-
-        # TODO: The PyLint RecursionError that needs to be investigated occurs from this code onwards
-        # iterate over all images in one batch
-        for image_index in range(batch_size):
-
-            # randomly pick samples per image for height and width dimension
-            heights = np.random.choice(range(*height_range), size=[samples_per_image], replace=True)
-            widths = np.random.choice(range(*width_range), size=[samples_per_image], replace=True)
-
-            # iterate over all samples
-            for sample in range(samples_per_image):
-
-                # output pixel
-                output_pixel = (heights[sample], widths[sample])
-
-                # find input match for given output pixel
-                input_match = cls._find_input_match_for_output_pixel(input_data[image_index], layer_attributes,
-                                                                     output_pixel)
-                # find output match for given output pixel
-                output_match = output_data[image_index, :, heights[sample], widths[sample]]
-
-                sampled_input.append(input_match)
-                sampled_output.append(output_match)
+        output_pixels = cls.select_output_pixels(layer_attributes, output_data.shape, samples_per_image)
 
-        sampled_input = np.array(sampled_input)
-        sampled_output = np.vstack(sampled_output)
+        sampled_input = cls.subsample_input_data(layer_attributes, input_data, output_pixels)
+        sampled_output = cls.subsample_output_data(output_data, output_pixels)
 
         # shape of sampled input should be [Nb * Ns, Nic, kh, kw]
         assert len(sampled_input.shape) == 4
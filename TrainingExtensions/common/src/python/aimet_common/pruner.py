@@ -39,6 +39,7 @@
 """ Creates a compressed model by calling modules to split layers """
 from decimal import Decimal
 import abc
+import contextlib
 from typing import List
 import copy
 
@@ -52,8 +53,11 @@ class Pruner(abc.ABC):
     Models a ML Model Pruner
     """
 
+    # True if prune_model() can run concurrently in several threads, for the same original model
+    IS_THREAD_SAFE = True
+
     def prune_model(self, layer_db: LayerDatabase, layer_comp_ratio_list: List[LayerCompRatioPair],
-                    cost_metric: CostMetric, trainer) -> LayerDatabase:
+                    cost_metric: CostMetric, trainer, **prune_layer_kwargs) -> LayerDatabase:
         """
         Prune a model given a list of layer-comp_ratio pairs
 
@@ -61,6 +65,8 @@ class Pruner(abc.ABC):
         :param layer_db: Layer database of the model to prune
         :param layer_comp_ratio_list: List of layer-comp_ratio pairs
         :param trainer: Used for
+        :param prune_layer_kwargs: Additional keyword arguments passed to _prune_layer(), e.g. state a pruner
+         prepares once per call for all the layers
         :return: Compressed copy of the LayerDatabase
         """
 
@@ -72,7 +78,7 @@ class Pruner(abc.ABC):
             comp_ratio = layer_comp_ratio.comp_ratio
 
             if comp_ratio is not None and comp_ratio < 1.0:
-                self._prune_layer(layer_db, comp_layer_db, layer, comp_ratio, cost_metric)
+                self._prune_layer(layer_db, comp_layer_db, layer, comp_ratio, cost_metric, **prune_layer_kwargs)
 
             # fine-tuning the layer while creating the final model
             if trainer is not None:
@@ -80,6 +86,26 @@ class Pruner(abc.ABC):
 
         return comp_layer_db
 
+    @contextlib.contextmanager
+    def patch_model(self, layer_db: LayerDatabase, layer: Layer, comp_ratio: Decimal, cost_metric: CostMetric):
+        """
+        Context manager that makes a model with a single pruned layer available, e.g. to evaluate a
+        compression-ratio candidate. Pruners that can swap the pruned layer into the model of layer_db (and restore the
+        original layer on exit) override this. By default a pruned copy of the LayerDatabase is created
+
+        :param layer_db: Layer database of the model to prune
+        :param layer: Layer to prune
+        :param comp_ratio: Compression-ratio
+        :param cost_metric: Cost metric
+        :return: Model with the pruned layer, only valid inside the context
+        """
+        pruned_layer_db = self.prune_model(layer_db, [LayerCompRatioPair(layer, comp_ratio)], cost_metric,
+                                           trainer=None)
+        try:
+            yield pruned_layer_db.model
+        finally:
+            pruned_layer_db.destroy()
+
     @abc.abstractmethod
     def _prune_layer(self, orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase, layer: Layer,
                      comp_ratio: Decimal, cost_metric: CostMetric):
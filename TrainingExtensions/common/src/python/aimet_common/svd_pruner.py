@@ -39,7 +39,9 @@
 """ Prunes layers using Spatial SVD or Weight SVD schemes """
 
 import abc
-from typing import Tuple
+import hashlib
+import threading
+from typing import Tuple, Optional
 
 import numpy as np
 
@@ -52,11 +54,92 @@ from aimet_common.layer_database import LayerDatabase, Layer
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.Svd)
 
 
+class SvdFactorizationCache:
+    """
+    Caches the SVD factorizations of weight matrices, so that splitting a layer with any rank only truncates the
+    cached factors. Entries are keyed on the contents of the weight matrix: pruned copies of a layer database share the
+    entries of the original layers, and a layer whose weights were modified gets a new entry
+    """
+
+    def __init__(self):
+        self._factorizations = {}
+        self._lock = threading.Lock()
+
+    def get_factorization(self, weight_matrix: np.array) -> Tuple[np.array, np.array, np.array]:
+        """
+        Returns the SVD factorization of a weight matrix, computing it on the first request
+        :param weight_matrix: 2D weight matrix
+        :return: Tuple of u, s and vh as returned by np.linalg.svd(weight_matrix, full_matrices=False)
+        """
+        weight_matrix = np.ascontiguousarray(weight_matrix)
+        key = (weight_matrix.shape, weight_matrix.dtype.str, hashlib.sha256(weight_matrix.tobytes()).hexdigest())
+
+        with self._lock:
+            factorization = self._factorizations.get(key)
+
+        if factorization is None:
+            factorization = np.linalg.svd(weight_matrix, full_matrices=False)
+            with self._lock:
+                self._factorizations[key] = factorization
+
+        return factorization
+
+    def clear(self):
+        """ Drops all cached factorizations """
+        with self._lock:
+            self._factorizations.clear()
+
+
+def _compute_svd(weight_matrix: np.array, svd_cache: Optional[SvdFactorizationCache]) -> \
+        Tuple[np.array, np.array, np.array]:
+    """
+    Computes the SVD factorization of a weight matrix, using the given cache if any
+    :param weight_matrix: 2D weight matrix
+    :param svd_cache: Cache of SVD factorizations, or None
+    :return: Tuple of u, s and vh
+    """
+    if svd_cache is not None:
+        return svd_cache.get_factorization(weight_matrix)
+
+    return np.linalg.svd(weight_matrix, full_matrices=False)
+
+
+def lingalg_weight_svd(weight_tensor: np.array, rank: int,
+                       svd_cache: Optional[SvdFactorizationCache] = None) -> Tuple[np.array, np.array]:
+    """
+    Splits a weight tensor using weight svd
+    :param weight_tensor: Weight tensor in numpy format (shape: out_chan, in_chan, height, width)
+    :param rank: Rank to use for svd split
+    :param svd_cache: Cache of SVD factorizations. If None, the SVD is computed for this split only
+    :return: Tuple of split tensors in numpy format (shapes: rank, in_chan, 1, 1 and out_chan, rank, height, width)
+    """
+    out_channels, in_channels, height, width = weight_tensor.shape
+
+    # in_channels x (out_channels height width)
+    weight_matrix = np.transpose(weight_tensor, [1, 0, 2, 3]).reshape(in_channels, out_channels * height * width)
+    assert rank <= min(weight_matrix.shape)
+
+    u, s, vh = _compute_svd(weight_matrix, svd_cache)
+
+    # First layer projects onto the leading singular vectors, second layer holds the scaled rest of the factorization.
+    # Copy, so that the split weights never alias the cached factors
+    weight_a = np.transpose(u[:, :rank]).copy().reshape(rank, in_channels, 1, 1)
+    weight_b = (s[:rank].reshape(rank, 1) * vh[:rank, :]).reshape(rank, out_channels, height, width)
+    weight_b = np.transpose(weight_b, [1, 0, 2, 3])
+
+    return weight_a, weight_b
+
+
 class SpatialSvdPruner(Pruner):
     """
     Pruner for Spatial-SVD method
     """
 
+    def __init__(self):
+        # Factorizations are shared by all the splits done by this pruner, e.g. for all comp-ratio candidates of a
+        # layer and for the final compressed model
+        self._svd_cache = SvdFactorizationCache()
+
     def _prune_layer(self, orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase, layer: Layer,
                      comp_ratio: float, cost_metric: CostMetric):
 
@@ -86,7 +169,8 @@ class SpatialSvdPruner(Pruner):
 
     @staticmethod
     def lingalg_spatial_svd(weight_tensor: np.array, rank: int,
-                            in_channels: int, out_channels: int, height: int, width: int) -> Tuple[np.array, np.array]:
+                            in_channels: int, out_channels: int, height: int, width: int,
+                            svd_cache: Optional[SvdFactorizationCache] = None) -> Tuple[np.array, np.array]:
         """
         Splits a weight tensor using spatial svd
         :param weight_tensor: Weight tensor in numpy format (shape: out_chan, in_chan, height, width)
@@ -95,6 +179,7 @@ class SpatialSvdPruner(Pruner):
         :param out_channels: Number of out-channels
         :param height: Kernel height
         :param width: Kernel width
+        :param svd_cache: Cache of SVD factorizations. If None, the SVD is computed for this split only
         :return: Tuple of split tensors in numpy format (shape: out_chan, in_chan, height, width)
         """
         assert rank <= in_channels * height
@@ -103,7 +188,7 @@ class SpatialSvdPruner(Pruner):
         weight_tensor = np.transpose(weight_tensor, [1, 2, 0, 3])  # in_channels height out_channels width
         weight_tensor = weight_tensor.reshape(in_channels * height, out_channels * width)
 
-        v, s, h = np.linalg.svd(weight_tensor, full_matrices=False)
+        v, s, h = _compute_svd(weight_tensor, svd_cache)
 
         v = v[:, :rank]
         s = s[:rank]
@@ -48,7 +48,10 @@ import signal
 import socket
 import subprocess
 import time
+import collections
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from typing import Callable, Iterable, Iterator
 
 try:
     # The build system updates Product, Version and Feature set information in the package_info file.
@@ -190,6 +193,40 @@ def round_down_to_multiplicity(multiplicity: int, num: int):
     return int(lower_multiple)
 
 
+def ordered_parallel_map(func: Callable, items: Iterable, num_workers: int) -> Iterator:
+    """
+    Lazily maps a function over items using a pool of worker threads. At most num_workers items are in flight, and
+    results are yielded in the order of the items. When the consumer stops iterating early, items that have not
+    started yet are cancelled. With a single worker, the items are mapped in the calling thread, so that thread-local
+    state of the caller (e.g. the torch grad mode) applies; worker threads do not inherit it
+    :param func: Function to apply to each item
+    :param items: Items to map over
+    :param num_workers: Number of worker threads
+    :return: Iterator over the results
+    """
+    if num_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    items = iter(items)
+    in_flight = collections.deque()
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        try:
+            for item in items:
+                in_flight.append(executor.submit(func, item))
+                if len(in_flight) == num_workers:
+                    yield in_flight.popleft().result()
+
+            while in_flight:
+                yield in_flight.popleft().result()
+
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
 # Depending on pytorch or tensorflow, the ordering of dimensions in tensor/product shapes will be different.
 # In pytorch, the number of channels is always index 1
 # In tensorflow, the number of channels is always the last dimension in the shape
@@ -38,7 +38,7 @@
 
 """ Prunes layers using Channel Pruning scheme """
 
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 
 import copy
 import tensorflow as tf
@@ -57,7 +57,7 @@ from aimet_tensorflow.utils.common import is_op_compressible, get_ordered_ops
 from aimet_tensorflow.layer_database import Layer, LayerDatabase
 from aimet_tensorflow.utils.op.conv import WeightTensorUtils
 from aimet_tensorflow.winnow import winnow
-from aimet_tensorflow.channel_pruning.data_subsampler import DataSubSampler
+from aimet_tensorflow.channel_pruning.data_subsampler import DataSubSampler, ReconstructionDataCache
 from aimet_tensorflow.channel_pruning.weight_reconstruction import WeightReconstructor
 from aimet_tensorflow.common.graph_eval import initialize_uninitialized_vars
 
@@ -69,8 +69,12 @@ class InputChannelPruner(Pruner):
     Pruner for Channel Pruning method
     """
 
+    # The winnowed graph is saved to and reloaded from a fixed path
+    IS_THREAD_SAFE = False
+
     def __init__(self, input_op_names: List[str], output_op_names: List[str], data_set: tf.data.Dataset,
-                 batch_size: int, num_reconstruction_samples: int, allow_custom_downsample_ops: bool):
+                 batch_size: int, num_reconstruction_samples: int, allow_custom_downsample_ops: bool,
+                 reconstruction_memory_budget: Optional[int] = None):
         """
         Input Channel Pruner with given dataset, input shape, number of batches and samples per image.
 
@@ -81,13 +85,17 @@ class InputChannelPruner(Pruner):
         :param batch_size: batch size
         :param num_reconstruction_samples: number of reconstruction samples
         :param allow_custom_downsample_ops: allow downsample/upsample ops to be inserted
+        :param reconstruction_memory_budget: maximum size in bytes of the batches cached in memory for reconstruction,
+         None for no limit
         """
+        # pylint: disable=too-many-arguments
         self._input_op_names = input_op_names
         self._output_op_names = output_op_names
         self._data_set = data_set
         self._batch_size = batch_size
         self._num_reconstruction_samples = num_reconstruction_samples
         self._allow_custom_downsample_ops = allow_custom_downsample_ops
+        self._reconstruction_memory_budget = reconstruction_memory_budget
 
     @staticmethod
     def _select_inp_channels(layer: Layer, comp_ratio: float) -> list:
@@ -116,7 +124,8 @@ class InputChannelPruner(Pruner):
         return prune_indices
 
     def _data_subsample_and_reconstruction(self, orig_layer: Layer, pruned_layer: Layer, output_mask: List[int],
-                                           orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase):
+                                           orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase,
+                                           data_cache: Optional[ReconstructionDataCache] = None):
         """
         Collect and sub sampled output data from original layer and input data from pruned layer and set
         reconstructed weight and bias to pruned layer in compressed model database
@@ -126,19 +135,22 @@ class InputChannelPruner(Pruner):
         :param output_mask  : output mask that specifies certain output channels to remove
         :param orig_layer_db: original Layer database without any compression
         :param comp_layer_db: compressed Layer database
+        :param data_cache: original model output data collected for all the layers to reconstruct, or None
         :return:
         """
 
-        sub_sampled_inp, sub_sampled_out = DataSubSampler.get_sub_sampled_data(orig_layer, pruned_layer,
+        # the sub sampled data is streamed batch by batch into the reconstruction, which accumulates a batch in a worker
+        # thread while the next one is being captured
+        sub_sampled_data_batches = DataSubSampler.get_sub_sampled_data_batches(orig_layer, pruned_layer,
                                                                                self._input_op_names, orig_layer_db,
                                                                                comp_layer_db, self._data_set,
                                                                                self._batch_size,
-                                                                               self._num_reconstruction_samples)
-
-        logger.debug("Input Data size: %s, Output data size: %s", len(sub_sampled_inp), len(sub_sampled_out))
+                                                                               self._num_reconstruction_samples,
+                                                                               data_cache)
 
         # update the weight and bias (if any) using sub sampled input and output data
-        WeightReconstructor.reconstruct_params_for_conv2d(pruned_layer, sub_sampled_inp, sub_sampled_out, output_mask)
+        WeightReconstructor.reconstruct_params_for_conv2d_from_batches(pruned_layer, sub_sampled_data_batches,
+                                                                       output_mask)
 
     def _sort_on_occurrence(self, sess: tf.Session, layer_comp_ratio_list: List[LayerCompRatioPair]) -> \
             List[LayerCompRatioPair]:
@@ -340,6 +352,16 @@ class InputChannelPruner(Pruner):
         :param layer_db: Original layer database
         :param comp_layer_db: Compressed layer database
         """
+        if not layers_to_reconstruct:
+            return
+
+        # collect the original model's output data of all the layers in a single pass over the dataset, it is reused
+        # for the reconstruction of each of them. The cache is local to this call, so concurrent calls do not share it
+        data_cache = DataSubSampler.collect_orig_layers_output_data(layers_to_reconstruct, self._input_op_names,
+                                                                    layer_db, self._data_set, self._batch_size,
+                                                                    self._num_reconstruction_samples,
+                                                                    self._reconstruction_memory_budget)
+
         for layer in layers_to_reconstruct:
             # Get output mask of layer, that contains information about all channels winnowed since the start
             pruned_layer_name, output_mask = \
@@ -347,12 +369,16 @@ class InputChannelPruner(Pruner):
             assert pruned_layer_name is not None
 
             pruned_layer = comp_layer_db.find_layer_by_name(pruned_layer_name)
-            self._data_subsample_and_reconstruction(layer, pruned_layer, output_mask, layer_db, comp_layer_db)
+            self._data_subsample_and_reconstruction(layer, pruned_layer, output_mask, layer_db, comp_layer_db,
+                                                    data_cache)
 
 
 class ChannelPruningCostCalculator(CostCalculator):
     """ Cost calculation utilities for Channel Pruning """
 
+    # Pruning input channels of a layer also winnows the output channels of the layers feeding it
+    HAS_INDEPENDENT_LAYER_COSTS = False
+
     def __init__(self, pruner: InputChannelPruner):
         self._pruner = pruner
 
@@ -38,7 +38,7 @@
 
 """ Sub-sample data for weight reconstruction for channel pruning feature """
 
-from typing import List
+from typing import List, Dict, Optional, Iterator, Tuple
 import math
 import numpy as np
 import tensorflow as tf
@@ -49,38 +49,81 @@ import aimet_tensorflow.utils.op.conv
 from aimet_tensorflow.layer_database import Layer, LayerDatabase
 
 from aimet_common.utils import AimetLogger
-from aimet_common.input_match_search import InputMatchSearch
+from aimet_common.input_match_search import InputMatchSearch, SubSampledDataBuffer
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.ChannelPruning)
 
 
+class ReconstructionDataCache:
+    """
+    Batches of a dataset and the sub sampled output data of the original model's layers for these batches. The
+    original model is not modified while its layers are reconstructed one after another, so its output data is
+    collected once for all the layers to reconstruct. Only the sampled output pixels are kept, and the batches are
+    written into a buffer that is spilled to disk beyond the memory budget
+    """
+    def __init__(self, num_of_batches: int, memory_budget: Optional[int] = None):
+        """
+        :param num_of_batches: expected number of batches
+        :param memory_budget: maximum size in bytes of the batches in memory, beyond which they are written to a spill
+         file. None for no limit
+        """
+        self._batch_buffer = SubSampledDataBuffer(num_of_batches, memory_budget)
+        self._batch_sizes = list()
+        # batches that are not a single array are kept as they are
+        self._batches = list()
+        # dictionary mapping original layer names to their (sub sampled output data, sampled output pixels), one entry
+        # per batch
+        self.layers_output_data = dict()
+
+    def add_batch(self, batch_data):
+        """
+        Add the data of the next batch
+        :param batch_data: batch data
+        """
+        if isinstance(batch_data, np.ndarray):
+            self._batch_buffer.append(batch_data)
+            self._batch_sizes.append(len(batch_data))
+        else:
+            self._batches.append(batch_data)
+
+    @property
+    def batches(self) -> List:
+        """ batch data, in dataset order """
+        if not self._batch_sizes:
+            return self._batches
+
+        batch_data = self._batch_buffer.get_data()
+        batch_offsets = np.cumsum([0] + self._batch_sizes)
+
+        return [batch_data[start:end] for start, end in zip(batch_offsets[:-1], batch_offsets[1:])]
+
+
 class DataSubSampler:
 
     """
     Utilities to sub-sample data for weight reconstruction
     """
 
-    @classmethod
-    def get_sub_sampled_data(cls, orig_layer: Layer, pruned_layer: Layer, inp_op_names: List,
-                             orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase, data_set: tf.data.Dataset,
-                             batch_size: int, num_reconstruction_samples: int) -> (np.ndarray, np.ndarray):
+    @staticmethod
+    def _get_number_of_batches(batch_size: int, num_reconstruction_samples: int, samples_per_image: int) -> int:
+        """
+        :param batch_size: batch size
+        :param num_reconstruction_samples: The number of reconstruction samples
+        :param samples_per_image: samples per image
+        :return: number of batches
+        """
+        total_num_of_images = int(num_reconstruction_samples / samples_per_image)
 
-        # pylint: disable=too-many-arguments
-        # pylint: disable=too-many-locals
+        # number of possible batches - round up
+        return math.ceil(total_num_of_images / batch_size)
 
+    @staticmethod
+    def _open_data_set(data_set: tf.data.Dataset) -> Tuple[tf.Session, tf.Tensor]:
         """
-        Get all the input data from pruned model and output data from original model
+        Create a session and an iterator to read the batches of the dataset
 
-        :param orig_layer: layer in original model database
-        :param pruned_layer: layer in pruned model database
-        :param inp_op_names : input Op names, should be same in both models
-        :param orig_layer_db: original model database, un-pruned, used to provide the actual outputs
-        :param comp_layer_db: comp. model database, this is potentially already pruned in the upstreams layers of given
-         layer name
         :param data_set: tf.data.Dataset object
-        :param batch_size : batch size
-        :param num_reconstruction_samples: The number of reconstruction samples
-        :return: input_data, output_data
+        :return: session, to be closed by the caller, and the op getting the next batch
         """
 
         # Grow GPU memory as needed at the cost of fragmentation.
@@ -97,61 +140,245 @@ class DataSubSampler:
             iterator = data_set.make_one_shot_iterator()
             next_element = iterator.get_next()
 
+        return sess, next_element
+
+    @staticmethod
+    def _get_next_batch(sess: tf.Session, next_element: tf.Tensor):
+        """
+        Get the next batch of the dataset
+
+        :param sess: session from _open_data_set()
+        :param next_element: op getting the next batch, from _open_data_set()
+        :return: batch data
+        """
+        try:
+            # get the data
+            return sess.run(next_element)
+
+        except tf.errors.OutOfRangeError:
+
+            raise StopIteration("There are insufficient batches of data in the provided dataset for the purpose of"
+                                " weight reconstruction! Either reduce number of reconstruction samples or increase"
+                                " data in dataset")
+
+    @staticmethod
+    def _get_batches(data_set: tf.data.Dataset, num_of_batches: int) -> List:
+        """
+        Get the first batches of the dataset
+
+        :param data_set: tf.data.Dataset object
+        :param num_of_batches: number of batches
+        :return: list of batch data
+        """
+        sess, next_element = DataSubSampler._open_data_set(data_set)
+
+        batches = list()
+        try:
+            for _ in range(num_of_batches):
+                batches.append(DataSubSampler._get_next_batch(sess, next_element))
+
+        finally:
+            # close the session
+            sess.close()
+
+        return batches
+
+    @staticmethod
+    def _get_layer_attributes(layer: Layer, layer_db: LayerDatabase) -> tuple:
+        """
+        :param layer: layer in model database
+        :param layer_db: model database
+        :return: layer attributes (kernel_size, stride, padding)
+        """
+        return aimet_tensorflow.utils.op.conv.get_layer_attributes(sess=layer_db.model, op=layer.module,
+                                                                   input_op_names=layer_db.starting_ops,
+                                                                   input_shape=layer_db.input_shape)
+
+    @classmethod
+    def collect_orig_layers_output_data(cls, orig_layers: List[Layer], inp_op_names: List,
+                                        orig_layer_db: LayerDatabase, data_set: tf.data.Dataset, batch_size: int,
+                                        num_reconstruction_samples: int,
+                                        memory_budget: Optional[int] = None) -> ReconstructionDataCache:
+        # pylint: disable=too-many-locals
+        """
+        Collect the sub sampled output data of many layers of the original model, running the original model once per
+        batch. The output pixels to sample are selected while collecting, so only the sampled output data is kept
+
+        :param orig_layers: layers in original model database
+        :param inp_op_names : input Op names
+        :param orig_layer_db: original model database, un-pruned, used to provide the actual outputs
+        :param data_set: tf.data.Dataset object
+        :param batch_size : batch size
+        :param num_reconstruction_samples: The number of reconstruction samples
+        :param memory_budget: maximum size in bytes of the cached batches in memory, beyond which they are written to
+         a spill file. None for no limit
+        :return: cache with the batches and the sub sampled output data of the layers, to pass to
+         get_sub_sampled_data()
+        """
         # hard coded value
         samples_per_image = 10
 
-        total_num_of_images = int(num_reconstruction_samples / samples_per_image)
+        num_of_batches = cls._get_number_of_batches(batch_size, num_reconstruction_samples, samples_per_image)
 
-        # number of possible batches - round up
-        num_of_batches = math.ceil(total_num_of_images / batch_size)
+        data_cache = ReconstructionDataCache(num_of_batches, memory_budget)
+        data_cache.layers_output_data = {orig_layer.name: list() for orig_layer in orig_layers}
+
+        layers_attributes = [cls._get_layer_attributes(orig_layer, orig_layer_db) for orig_layer in orig_layers]
+        output_tensors = [orig_layer.module.outputs[0] for orig_layer in orig_layers]
+
+        # batches are read one at a time and written into the cache right away, so that only the cache holds them
+        sess, next_element = cls._open_data_set(data_set)
+        try:
+            for _ in range(num_of_batches):
+                batch_data = cls._get_next_batch(sess, next_element)
 
-        all_sub_sampled_inp_data = list()
-        all_sub_sampled_out_data = list()
+                feed_dict = aimet_tensorflow.utils.common.create_input_feed_dict(orig_layer_db.model.graph,
+                                                                                 inp_op_names, batch_data)
+                all_output_data = orig_layer_db.model.run(output_tensors, feed_dict=feed_dict)
+
+                data_cache.add_batch(batch_data)
+                for orig_layer, layer_attributes, output_data in zip(orig_layers, layers_attributes, all_output_data):
+                    # channels_last (NHWC) to channels_first data format (NCHW - Common format)
+                    output_data = np.transpose(output_data, (0, 3, 1, 2))
+
+                    output_pixels = InputMatchSearch.select_output_pixels(layer_attributes, output_data.shape,
+                                                                          samples_per_image)
+                    data_cache.layers_output_data[orig_layer.name].append(
+                        (InputMatchSearch.subsample_output_data(output_data, output_pixels), output_pixels))
+
+        finally:
+            sess.close()
+
+        return data_cache
+
+    @classmethod
+    def get_sub_sampled_data_batches(cls, orig_layer: Layer, pruned_layer: Layer, inp_op_names: List,
+                                     orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase,
+                                     data_set: tf.data.Dataset, batch_size: int, num_reconstruction_samples: int,
+                                     data_cache: ReconstructionDataCache = None) -> \
+            Iterator[Tuple[np.ndarray, np.ndarray]]:
+        # pylint: disable=too-many-arguments
+        """
+        Get the input data from pruned model and output data from original model, sub sampled batch by batch. The data
+        of a batch is collected only when the previous one has been consumed
+
+        :param orig_layer: layer in original model database
+        :param pruned_layer: layer in pruned model database
+        :param inp_op_names : input Op names, should be same in both models
+        :param orig_layer_db: original model database, un-pruned, used to provide the actual outputs
+        :param comp_layer_db: comp. model database, this is potentially already pruned in the upstreams layers of given
+         layer name
+        :param data_set: tf.data.Dataset object
+        :param batch_size : batch size
+        :param num_reconstruction_samples: The number of reconstruction samples
+        :param data_cache: batches and sub sampled original layer output data from
+         collect_orig_layers_output_data(). If given, only the compressed model is run, on the cached batches
+        :return: iterator over (sub sampled input data, sub sampled output data) of each batch
+        """
+
+        # hard coded value
+        samples_per_image = 10
 
-        for _ in range(num_of_batches):
+        num_of_batches = cls._get_number_of_batches(batch_size, num_reconstruction_samples, samples_per_image)
 
-            try:
-                # get the data
-                batch_data = sess.run(next_element)
+        if data_cache is None:
+            batches = cls._get_batches(data_set, num_of_batches)
+        else:
+            batches = data_cache.batches[:num_of_batches]
+
+        return cls._sub_sample_batches(orig_layer, pruned_layer, inp_op_names, orig_layer_db, comp_layer_db, batches,
+                                       samples_per_image, data_cache)
+
+    @staticmethod
+    def _sub_sample_batches(orig_layer: Layer, pruned_layer: Layer, inp_op_names: List, orig_layer_db: LayerDatabase,
+                            comp_layer_db: LayerDatabase, batches: List, samples_per_image: int,
+                            data_cache: Optional[ReconstructionDataCache]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        # pylint: disable=too-many-arguments
+        """
+        Generator behind get_sub_sampled_data_batches()
+
+        :param orig_layer: layer in original model database
+        :param pruned_layer: layer in pruned model database
+        :param inp_op_names : input Op names
+        :param orig_layer_db: original model database
+        :param comp_layer_db: comp. model database
+        :param batches: batch data
+        :param samples_per_image: samples per image
+        :param data_cache: batches and sub sampled original layer output data, or None
+        :return: iterator over (sub sampled input data, sub sampled output data) of each batch
+        """
 
+        # get the layer attributes (kernel_size, stride, padding)
+        layer_attributes = DataSubSampler._get_layer_attributes(orig_layer, orig_layer_db)
+
+        for batch_index, batch_data in enumerate(batches):
+
+            if data_cache is None:
                 # output data from original model
                 feed_dict = aimet_tensorflow.utils.common.create_input_feed_dict(orig_layer_db.model.graph,
                                                                                  inp_op_names, batch_data)
                 output_data = orig_layer_db.model.run(orig_layer.module.outputs[0], feed_dict=feed_dict)
 
-                # input data from compressed model
-                feed_dict = aimet_tensorflow.utils.common.create_input_feed_dict(comp_layer_db.model.graph,
-                                                                                 inp_op_names, batch_data)
-                input_data = comp_layer_db.model.run(pruned_layer.module.inputs[0], feed_dict=feed_dict)
-
-                # get the layer attributes (kernel_size, stride, padding)
-                layer_attributes = aimet_tensorflow.utils.op.conv.get_layer_attributes(sess=orig_layer_db.model,
-                                                                                       op=orig_layer.module,
-                                                                                       input_op_names=
-                                                                                       orig_layer_db.starting_ops,
-                                                                                       input_shape=
-                                                                                       orig_layer_db.input_shape)
-
                 # channels_last (NHWC) to channels_first data format (NCHW - Common format)
-                input_data = np.transpose(input_data, (0, 3, 1, 2))
                 output_data = np.transpose(output_data, (0, 3, 1, 2))
 
-                # get the sub sampled input and output data
-                sub_sampled_inp_data, sub_sampled_out_data = InputMatchSearch.subsample_data(layer_attributes,
-                                                                                             input_data,
-                                                                                             output_data,
-                                                                                             samples_per_image)
-                all_sub_sampled_inp_data.append(sub_sampled_inp_data)
-                all_sub_sampled_out_data.append(sub_sampled_out_data)
+            # input data from compressed model
+            feed_dict = aimet_tensorflow.utils.common.create_input_feed_dict(comp_layer_db.model.graph,
+                                                                             inp_op_names, batch_data)
+            input_data = comp_layer_db.model.run(pruned_layer.module.inputs[0], feed_dict=feed_dict)
+
+            # channels_last (NHWC) to channels_first data format (NCHW - Common format)
+            input_data = np.transpose(input_data, (0, 3, 1, 2))
+
+            # get the sub sampled input and output data
+            if data_cache is None:
+                yield InputMatchSearch.subsample_data(layer_attributes, input_data, output_data, samples_per_image)
+            else:
+                # the input data is sampled at the output pixels sampled when the cache was collected
+                sub_sampled_out_data, output_pixels = data_cache.layers_output_data[orig_layer.name][batch_index]
+                yield InputMatchSearch.subsample_input_data(layer_attributes, input_data, output_pixels), \
+                    sub_sampled_out_data
+
+    @classmethod
+    def get_sub_sampled_data(cls, orig_layer: Layer, pruned_layer: Layer, inp_op_names: List,
+                             orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase, data_set: tf.data.Dataset,
+                             batch_size: int, num_reconstruction_samples: int,
+                             data_cache: ReconstructionDataCache = None) -> \
+            (np.ndarray, np.ndarray):
+
+        # pylint: disable=too-many-arguments
+
+        """
+        Get all the input data from pruned model and output data from original model
+
+        :param orig_layer: layer in original model database
+        :param pruned_layer: layer in pruned model database
+        :param inp_op_names : input Op names, should be same in both models
+        :param orig_layer_db: original model database, un-pruned, used to provide the actual outputs
+        :param comp_layer_db: comp. model database, this is potentially already pruned in the upstreams layers of given
+         layer name
+        :param data_set: tf.data.Dataset object
+        :param batch_size : batch size
+        :param num_reconstruction_samples: The number of reconstruction samples
+        :param data_cache: batches and sub sampled original layer output data from
+         collect_orig_layers_output_data(). If given, only the compressed model is run, on the cached batches
+        :return: input_data, output_data
+        """
+
+        # hard coded value
+        samples_per_image = 10
 
-            except tf.errors.OutOfRangeError:
+        num_of_batches = cls._get_number_of_batches(batch_size, num_reconstruction_samples, samples_per_image)
 
-                raise StopIteration("There are insufficient batches of data in the provided dataset for the purpose of"
-                                    " weight reconstruction! Either reduce number of reconstruction samples or increase"
-                                    " data in dataset")
+        # sub sampled data of all the batches is written into buffers allocated once
+        all_sub_sampled_inp_data = SubSampledDataBuffer(num_of_batches)
+        all_sub_sampled_out_data = SubSampledDataBuffer(num_of_batches)
 
-        # close the session
-        sess.close()
+        for sub_sampled_inp_data, sub_sampled_out_data in cls.get_sub_sampled_data_batches(
+                orig_layer, pruned_layer, inp_op_names, orig_layer_db, comp_layer_db, data_set, batch_size,
+                num_reconstruction_samples, data_cache):
+            all_sub_sampled_inp_data.append(sub_sampled_inp_data)
+            all_sub_sampled_out_data.append(sub_sampled_out_data)
 
-        # accumulate total sub sampled input and output data
-        return np.vstack(all_sub_sampled_inp_data), np.vstack(all_sub_sampled_out_data)
+        # total sub sampled input and output data
+        return all_sub_sampled_inp_data.get_data(), all_sub_sampled_out_data.get_data()
@@ -38,15 +38,15 @@
 
 """ This module contains code to reconstruct weights post winnowing for the channel pruning feature """
 
-from typing import Union, List
+from typing import Union, List, Iterable, Tuple
 import numpy as np
-from sklearn import linear_model
 
 # Import aimet specific modules
 from aimet_tensorflow.layer_database import Layer
 import aimet_tensorflow.utils.common
 from aimet_tensorflow.utils.op.conv import WeightTensorUtils, BiasUtils
 from aimet_common.utils import AimetLogger
+from aimet_common.channel_pruner import NormalEquationsRegression
 from aimet_common.winnow.winnow_utils import get_zero_positions_in_binary_mask
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.ChannelPruning)
@@ -79,18 +79,14 @@ class WeightReconstructor:
 
         assert input_data.shape[0] == output_data.shape[0]
 
-        # least squares Linear Regression
-        # copy_X : If True, X (input_data) will be copied; else, it may be overwritten
-        regressor = linear_model.LinearRegression(copy_X=True, fit_intercept=bias)
+        # least squares Linear Regression, solved with the normal equations
+        regression = NormalEquationsRegression(bias)
 
-        regressor.fit(X=input_data, y=output_data)
+        regression.add_data(input_data, output_data)
 
-        logger.info("finished linear regression fit ")
-
-        # after regression, the coefficients attrib in the regressor form the new conv weights
-        new_weight = regressor.coef_
+        new_weight, new_bias = regression.solve()
 
-        new_bias = regressor.intercept_ if bias is True else None
+        logger.info("finished linear regression fit ")
 
         return new_weight, new_bias
 
@@ -120,7 +116,7 @@ class WeightReconstructor:
     def reconstruct_params_for_conv2d(cls, layer: Layer, input_data: np.ndarray, output_data: np.ndarray,
                                       output_mask: List[int]):
         """
-        Reconstruction of conv2d params (weights and biases) is performed using linear regression from sckit -learn.
+        Reconstruction of conv2d params (weights and biases) is performed using least squares linear regression.
 
         :param layer        : The layer to prune
         :param input_data   : input_data to the current layer, in the shape of (Ns * Nb, Nic, k_h, k_w)
@@ -133,23 +129,54 @@ class WeightReconstructor:
         Nic, Noc = input and output channels of given layer
         k_h, k_w = kernel dimensions of given layer (height, width)
         """
+        cls.reconstruct_params_for_conv2d_from_batches(layer, [(input_data, output_data)], output_mask,
+                                                       pipeline_depth=0)
 
-        assert layer.module.type == 'Conv2D'
-        assert len(input_data.shape) == 4
-        assert len(output_data.shape) == 2
+    @classmethod
+    def reconstruct_params_for_conv2d_from_batches(cls, layer: Layer,
+                                                   sub_sampled_data_batches: Iterable[Tuple[np.ndarray, np.ndarray]],
+                                                   output_mask: List[int], pipeline_depth: int = 2):
+        """
+        Reconstruction of conv2d params (weights and biases) using least squares linear regression, with the data
+        arriving batch by batch. Only the normal equations are accumulated, so the data of all the batches is never
+        held in memory at once.
 
-        assert input_data.shape[0] == output_data.shape[0]
-        input_data = input_data.reshape(input_data.shape[0], -1)
+        :param layer        : The layer to prune
+        :param sub_sampled_data_batches: (input_data, output_data) of each batch, input_data in the shape of
+         (Ns, Nic, k_h, k_w) and output_data of shape [Ns, Noc]
+        :param output_mask  : output mask that specifies certain output channels to remove
+        :param pipeline_depth: maximum number of batches waiting to be accumulated by a worker thread while the next
+         ones are produced, 0 to accumulate them in the calling thread
+        """
+
+        def _flatten_input_data(batches):
+            """
+            verify the data of each batch and flatten the input data to [Ns, Nic * k_h * k_w]
+            """
+            for input_data, output_data in batches:
+
+                assert len(input_data.shape) == 4
+                assert len(output_data.shape) == 2
+
+                assert input_data.shape[0] == output_data.shape[0]
+
+                yield input_data.reshape(input_data.shape[0], -1), output_data
+
+        assert layer.module.type == 'Conv2D'
 
-        assert len(input_data.shape) == 2
         # Check that the output shape is same as number of ones in output mask
         assert layer.weight_shape[0] == sum(output_mask)
 
         calculate_bias = bool(aimet_tensorflow.utils.common.get_succeeding_bias_op(op=layer.module))
 
+        regression = NormalEquationsRegression(calculate_bias)
+
+        regression.add_batches(_flatten_input_data(sub_sampled_data_batches), pipeline_depth)
+
         # reconstruct newer weight and bias
-        new_weight, new_bias = cls._linear_regression(input_data=input_data, output_data=output_data,
-                                                      bias=calculate_bias)
+        new_weight, new_bias = regression.solve()
+
+        logger.info("finished linear regression fit ")
 
         # reshape the new weights to common shape [Noc, Nic, kh, kw]
         _, n_ic, kh, kw = layer.weight_shape
@@ -101,7 +101,15 @@ class CompressionFactory:
                                                                greedy_params.use_monotonic_fit,
                                                                greedy_params.saved_eval_scores_dict,
                                                                comp_ratio_rounding_algo, use_cuda,
-                                                               bokeh_session=bokeh_session)
+                                                               bokeh_session=bokeh_session,
+                                                               num_workers=greedy_params.num_workers,
+                                                               use_processes=greedy_params.use_processes,
+                                                               eval_scores_cache_path=
+                                                               greedy_params.eval_scores_cache_path,
+                                                               adaptive_sampling_tolerance=
+                                                               greedy_params.adaptive_sampling_tolerance,
+                                                               early_exit_score_threshold=
+                                                               greedy_params.early_exit_score_threshold)
             layer_selector = ConvNoDepthwiseLayerSelector()
             modules_to_ignore = params.mode_params.modules_to_ignore
 
@@ -153,7 +161,8 @@ class CompressionFactory:
         pruner = InputChannelPruner(input_op_names=params.input_op_names, output_op_names=params.output_op_names,
                                     data_set=params.data_set, batch_size=params.batch_size,
                                     num_reconstruction_samples=params.num_reconstruction_samples,
-                                    allow_custom_downsample_ops=params.allow_custom_downsample_ops)
+                                    allow_custom_downsample_ops=params.allow_custom_downsample_ops,
+                                    reconstruction_memory_budget=params.reconstruction_memory_budget)
 
         comp_ratio_rounding_algo = ChannelRounder(params.multiplicity)
 
@@ -169,7 +178,15 @@ class CompressionFactory:
                                                                greedy_params.use_monotonic_fit,
                                                                greedy_params.saved_eval_scores_dict,
                                                                comp_ratio_rounding_algo, use_cuda,
-                                                               bokeh_session=bokeh_session)
+                                                               bokeh_session=bokeh_session,
+                                                               num_workers=greedy_params.num_workers,
+                                                               use_processes=greedy_params.use_processes,
+                                                               eval_scores_cache_path=
+                                                               greedy_params.eval_scores_cache_path,
+                                                               adaptive_sampling_tolerance=
+                                                               greedy_params.adaptive_sampling_tolerance,
+                                                               early_exit_score_threshold=
+                                                               greedy_params.early_exit_score_threshold)
             layer_selector = ConvNoDepthwiseLayerSelector()
             modules_to_ignore = params.mode_params.modules_to_ignore
 
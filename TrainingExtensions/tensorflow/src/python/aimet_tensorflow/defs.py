@@ -152,7 +152,8 @@ class ChannelPruningParameters:
 
     def __init__(self, input_op_names: List[str], output_op_names: List[str], data_set: tf.data.Dataset,
                  batch_size: int, num_reconstruction_samples: int, allow_custom_downsample_ops: bool, mode: Mode,
-                 params: Union[ManualModeParams, AutoModeParams], multiplicity=1):
+                 params: Union[ManualModeParams, AutoModeParams], multiplicity=1,
+                 reconstruction_memory_budget: Optional[int] = None):
         """
 
         :param input_op_names: list of input op names to the model
@@ -164,6 +165,8 @@ class ChannelPruningParameters:
         :param mode: indicates whether the mode is manual or auto
         :param params: ManualModeParams or AutoModeParams, depending on teh value of mode
         :param multiplicity: The multiplicity to which ranks/input channels will get rounded. Default: 1
+        :param reconstruction_memory_budget: Maximum size in bytes of the batches cached in memory for reconstruction,
+         larger data is written to a temporary file. Default: None (no limit)
         """
 
         # pylint: disable=too-many-arguments
@@ -176,3 +179,4 @@ class ChannelPruningParameters:
         self.mode = mode
         self.mode_params = params
         self.multiplicity = multiplicity
+        self.reconstruction_memory_budget = reconstruction_memory_budget
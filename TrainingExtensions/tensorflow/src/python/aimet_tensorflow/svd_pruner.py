@@ -64,7 +64,7 @@ class SpatialSvdPruner(aimet_common.svd_pruner.SpatialSvdPruner):
         """
 
         # Split module using Spatial SVD
-        module_a, module_b = SpatialSvdModuleSplitter.split_module(layer, rank)
+        module_a, module_b = SpatialSvdModuleSplitter.split_module(layer, rank, self._svd_cache)
 
         # get the output activation shape for first conv op
         output_shape_a = get_output_activation_shape(sess=layer.model, op=module_a,
@@ -46,7 +46,7 @@ import aimet_tensorflow.utils.op.conv
 from aimet_tensorflow.layer_database import Layer
 
 from aimet_common.utils import AimetLogger
-from aimet_common.svd_pruner import SpatialSvdPruner
+from aimet_common.svd_pruner import SpatialSvdPruner, SvdFactorizationCache
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.Svd)
 
@@ -55,15 +55,16 @@ class SpatialSvdModuleSplitter:
     """ Spatial SVD module splitter"""
 
     @staticmethod
-    def split_module(layer: Layer, rank: int) -> (tf.Operation, tf.Operation):
+    def split_module(layer: Layer, rank: int, svd_cache: SvdFactorizationCache = None) -> (tf.Operation, tf.Operation):
         """
 
         :param layer: Module to be split
         :param rank: rank for splitting
+        :param svd_cache: Cache of SVD factorizations. If None, the SVD is computed for this split only
         :return: Two split modules
         """
 
-        h, v = SpatialSvdModuleSplitter.get_svd_matrices(layer, rank)
+        h, v = SpatialSvdModuleSplitter.get_svd_matrices(layer, rank, svd_cache)
 
         conv_a_stride, conv_b_stride = aimet_tensorflow.utils.op.conv.get_strides_for_split_conv_ops(op=layer.module)
 
@@ -102,10 +103,11 @@ class SpatialSvdModuleSplitter:
                layer.model.graph.get_operation_by_name(conv_b_name)
 
     @staticmethod
-    def get_svd_matrices(layer: Layer, rank: int) -> (np.array, np.array):
+    def get_svd_matrices(layer: Layer, rank: int, svd_cache: SvdFactorizationCache = None) -> (np.array, np.array):
         """
         :param layer: Module to be split
         :param rank: rank for splitting
+        :param svd_cache: Cache of SVD factorizations. If None, the SVD is computed for this split only
         :return: v and h matrices after Single Value Decomposition
         """
 
@@ -118,7 +120,8 @@ class SpatialSvdModuleSplitter:
 
         out_channels, in_channels, height, width = weight_tensor.shape
 
-        h, v = SpatialSvdPruner.lingalg_spatial_svd(weight_tensor, rank, in_channels, out_channels, height, width)
+        h, v = SpatialSvdPruner.lingalg_spatial_svd(weight_tensor, rank, in_channels, out_channels, height, width,
+                                                    svd_cache)
 
         # h, v matrices are in the common shape [Noc, Nic, kh, kw]
         # re order in TensorFlow Conv2d shape [kh, kw, Nic, Noc]
@@ -868,6 +868,49 @@ class TestTrainingExtensionsChannelPruning(unittest.TestCase):
         # delete temp directory
         shutil.rmtree(str('./temp_meta/'))
 
+    def test_collect_orig_layers_output_data_with_memory_budget(self):
+        """
+        Test that batches are written into the reconstruction data cache one at a time, spilling beyond the budget
+        """
+        batch_size = 1
+        input_data = np.random.rand(100, 224, 224, 3)
+        dataset = tf.data.Dataset.from_tensor_slices(input_data)
+        dataset = dataset.batch(batch_size=batch_size)
+
+        orig_g = tf.Graph()
+
+        with orig_g.as_default():
+
+            _ = VGG16(weights=None, input_shape=(224, 224, 3), include_top=False)
+            orig_init = tf.global_variables_initializer()
+
+        input_op_names = ['input_1']
+        # create sess with graph
+        orig_sess = tf.Session(graph=orig_g)
+        # initialize all the variables in VGG16
+        orig_sess.run(orig_init)
+
+        # create layer database
+        layer_db = LayerDatabase(model=orig_sess, input_shape=(1, 224, 224, 3), working_dir=None)
+        conv_layer = layer_db.find_layer_by_name('block1_conv1/convolution')
+
+        # each batch is 224 * 224 * 3 * 8 bytes, so the 5 batches do not fit the budget
+        with unittest.mock.patch.object(DataSubSampler, '_get_batches', side_effect=AssertionError):
+            data_cache = DataSubSampler.collect_orig_layers_output_data([conv_layer], input_op_names, layer_db,
+                                                                        dataset, batch_size,
+                                                                        num_reconstruction_samples=50,
+                                                                        memory_budget=2000000)
+
+        batches = data_cache.batches
+        self.assertEqual(5, len(batches))
+        self.assertIsInstance(batches[0], np.memmap)
+        self.assertTrue(np.array_equal(input_data[:5], np.concatenate(batches)))
+        self.assertEqual(5, len(data_cache.layers_output_data[conv_layer.name]))
+
+        layer_db.model.close()
+        # delete temp directory
+        shutil.rmtree(str('./temp_meta/'))
+
     def test_prune_model(self):
         """
         Test end-to-end prune_model with VGG16-imagenet
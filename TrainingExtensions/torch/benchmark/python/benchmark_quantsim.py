@@ -0,0 +1,350 @@
+# /usr/bin/env python3.5
+# -*- mode: python -*-
+# =============================================================================
+#  @@-COPYRIGHT-START-@@
+#
+#  Copyright (c) 2020, Qualcomm Innovation Center, Inc. All rights reserved.
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+#
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#  3. Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#
+#  @@-COPYRIGHT-END-@@
+# =============================================================================
+""" Benchmarks the overhead of quantization simulation over the float model
+
+Times QuantizationSimModel creation, compute_encodings, forward passes, save_checkpoint and export on the example
+models, using synthetic data. Forward pass time is further broken down per QcQuantizeWrapper. Results are written as
+JSON, so they can be compared across releases.
+
+Usage:
+    python benchmark_quantsim.py --output quantsim_benchmark.json [--models mnist mobilenet] [--device cuda]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import torch
+
+from aimet_common.utils import AimetLogger
+from aimet_torch import utils
+from aimet_torch.examples.mnist_torch_model import Net
+from aimet_torch.examples.mobilenet import MobileNetV2
+from aimet_torch.qc_quantize_op import QcQuantizeWrapper
+from aimet_torch.quantsim import QuantizationSimModel, save_checkpoint
+
+logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.Test)
+
+# Model constructor and input image size for each benchmarked model
+MODELS = {'mnist':     (Net, (1, 28, 28)),
+          'mobilenet': (MobileNetV2, (3, 224, 224))}
+
+# Time spent in a wrapper forward pass is split into these parts. The wrapped forward is what remains of the total
+# after the quantization steps, since in inference mode the wrapped module is run functionally
+WRAPPER_TIME_SPLITS = ('input_quant', 'param_quant', 'wrapped_forward', 'output_quant')
+
+
+def _synchronize(device: torch.device):
+    """ Waits for queued kernels to complete, so they are included in the measured time """
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+
+def _time_call(func: Callable, device: torch.device, iterations: int = 1, warmup_iterations: int = 0) -> float:
+    """
+    Times a function call
+    :param func: Function to time, called without arguments
+    :param device: Device the function runs on
+    :param iterations: Number of timed calls
+    :param warmup_iterations: Number of untimed calls before the timed ones
+    :return: Mean time per call, in seconds
+    """
+    for _ in range(warmup_iterations):
+        func()
+
+    _synchronize(device)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    _synchronize(device)
+
+    return (time.perf_counter() - start) / iterations
+
+
+class WrapperTimer:
+    """
+    Measures the time spent in each QcQuantizeWrapper of a model, split into input quantization, parameter
+    quantization, the wrapped forward pass and output quantization. Timing is attached to the wrapper instances, and
+    is removed again by detach()
+    """
+
+    def __init__(self, model: torch.nn.Module, device: torch.device):
+        """
+        Constructor
+        :param model: Model containing QcQuantizeWrapper modules
+        :param device: Device the model runs on
+        """
+        self._device = device
+        self._wrappers = [(name, module) for name, module in model.named_modules()
+                          if isinstance(module, QcQuantizeWrapper)]
+        self._times = {name: dict.fromkeys(WRAPPER_TIME_SPLITS + ('total',), 0.0) for name, _ in self._wrappers}
+        self._calls = dict.fromkeys(self._times, 0)
+        self._start_times = {}
+        self._hook_handles = []
+        self._patched_methods = []
+
+    def attach(self):
+        """
+        Starts timing the wrappers
+        :return: None
+        """
+        for name, wrapper in self._wrappers:
+            self._hook_handles.append(wrapper.register_forward_pre_hook(self._make_pre_hook(name)))
+            self._hook_handles.append(wrapper.register_forward_hook(self._make_hook(name)))
+
+            self._patch_method(wrapper, '_quantize_activation',
+                               lambda tensor_quantizer, _, wrapper=wrapper:
+                               'input_quant' if tensor_quantizer is wrapper.input_quantizer else 'output_quant')
+            for method_name in ('_quantize_dequantize_params', '_restore_shadow_params',
+                                '_get_cached_quantized_params'):
+                self._patch_method(wrapper, method_name, lambda *_: 'param_quant')
+
+    def detach(self):
+        """
+        Stops timing the wrappers
+        :return: None
+        """
+        for hook_handle in self._hook_handles:
+            hook_handle.remove()
+        for wrapper, method_name in self._patched_methods:
+            delattr(wrapper, method_name)
+
+        self._hook_handles = []
+        self._patched_methods = []
+
+    def get_results(self) -> Dict[str, Dict]:
+        """
+        Returns the mean time per call of every wrapper, in milliseconds
+        :return: Dictionary of wrapper name to its time splits
+        """
+        results = {}
+        for name, times in self._times.items():
+            calls = max(self._calls[name], 1)
+            wrapper_results = {split: 1000 * elapsed / calls for split, elapsed in times.items()}
+            wrapper_results['wrapped_forward'] = max(wrapper_results['total'] -
+                                                     sum(wrapper_results[split] for split in WRAPPER_TIME_SPLITS), 0.0)
+            wrapper_results['calls'] = self._calls[name]
+            results[name] = wrapper_results
+
+        return results
+
+    def _now(self) -> float:
+        _synchronize(self._device)
+        return time.perf_counter()
+
+    def _make_pre_hook(self, name: str):
+        def pre_hook(*_):
+            self._start_times[name] = self._now()
+        return pre_hook
+
+    def _make_hook(self, name: str):
+        def hook(*_):
+            self._times[name]['total'] += self._now() - self._start_times.pop(name)
+            self._calls[name] += 1
+        return hook
+
+    def _patch_method(self, wrapper: QcQuantizeWrapper, method_name: str, get_split: Callable):
+        """
+        Shadows a method of a wrapper instance with a timed version
+        :param wrapper: Wrapper to patch
+        :param method_name: Name of the method to time
+        :param get_split: Called with the method arguments, returns the name of the time split to add the time to
+        """
+        method = getattr(wrapper, method_name, None)
+        if method is None:
+            return
+        name = [wrapper_name for wrapper_name, module in self._wrappers if module is wrapper][0]
+
+        def timed_method(*args, **kwargs):
+            start = self._now()
+            result = method(*args, **kwargs)
+            self._times[name][get_split(*args)] += self._now() - start
+            return result
+
+        setattr(wrapper, method_name, timed_method)
+        self._patched_methods.append((wrapper, method_name))
+
+
+def _run_stage(results: Dict, stage: str, func: Callable, device: torch.device):
+    """
+    Times a single benchmark stage, recording the error instead if the stage fails
+    :param results: Dictionary to add the stage time to, in seconds
+    :param stage: Name of the stage
+    :param func: Function running the stage
+    :param device: Device the stage runs on
+    """
+    try:
+        results[stage + '_s'] = _time_call(func, device)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning('Benchmark stage %s failed: %s', stage, e)
+        results[stage + '_s'] = None
+        results.setdefault('errors', {})[stage] = str(e)
+
+
+def benchmark_model(model_name: str, device: torch.device, quant_scheme: str, batch_size: int,
+                    num_calibration_batches: int, iterations: int) -> Dict:
+    """
+    Benchmarks quantization simulation on one of the example models
+    :param model_name: Name of the model in MODELS
+    :param device: Device to run on
+    :param quant_scheme: Quantization scheme, 'tf' or 'tf_enhanced'
+    :param batch_size: Batch size of the synthetic data
+    :param num_calibration_batches: Number of batches to compute encodings on
+    :param iterations: Number of timed forward passes
+    :return: Dictionary of benchmark results. If the sim cannot be created, only the float forward pass time and the
+        create_sim error are reported
+    """
+    model_constructor, image_size = MODELS[model_name]
+    torch.manual_seed(0)
+    model = model_constructor().to(device).eval()
+
+    data_loader = utils.create_fake_data_loader(dataset_size=batch_size * num_calibration_batches,
+                                                batch_size=batch_size, image_size=image_size)
+    inputs = next(iter(data_loader))[0].to(device)
+
+    def forward_pass(model_to_run: torch.nn.Module, _):
+        with torch.no_grad():
+            for batch, _ in data_loader:
+                model_to_run(batch.to(device))
+
+    def run_model(model_to_run: torch.nn.Module):
+        with torch.no_grad():
+            model_to_run(inputs)
+
+    results = {'image_size': list(image_size)}
+    results['float_forward_ms'] = 1000 * _time_call(lambda: run_model(model), device, iterations,
+                                                    warmup_iterations=1)
+
+    sim_holder = {}
+    _run_stage(results, 'create_sim', lambda: sim_holder.update(sim=QuantizationSimModel(model, quant_scheme)),
+               device)
+    if 'sim' not in sim_holder:
+        # All the remaining stages need the sim, the create_sim error is reported in the results
+        return results
+    sim = sim_holder['sim']
+    _run_stage(results, 'compute_encodings', lambda: sim.compute_encodings(forward_pass, None), device)
+    sim.model.eval()
+
+    results['sim_forward_ms'] = 1000 * _time_call(lambda: run_model(sim.model), device, iterations,
+                                                  warmup_iterations=1)
+    results['sim_overhead_ratio'] = results['sim_forward_ms'] / results['float_forward_ms']
+
+    wrapper_timer = WrapperTimer(sim.model, device)
+    wrapper_timer.attach()
+    try:
+        for _ in range(iterations):
+            run_model(sim.model)
+    finally:
+        wrapper_timer.detach()
+    results['wrappers'] = wrapper_timer.get_results()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        _run_stage(results, 'save_checkpoint',
+                   lambda: save_checkpoint(sim, os.path.join(output_dir, model_name + '.checkpoint')), device)
+        _run_stage(results, 'export',
+                   lambda: sim.export(output_dir, model_name, input_shape=(1,) + image_size), device)
+
+    return results
+
+
+def run_benchmarks(model_names: List[str], device: torch.device, quant_scheme: str, batch_size: int,
+                   num_calibration_batches: int, iterations: int) -> Dict:
+    """
+    Benchmarks quantization simulation on the given models
+    :param model_names: Names of models in MODELS
+    :param device: Device to run on
+    :param quant_scheme: Quantization scheme, 'tf' or 'tf_enhanced'
+    :param batch_size: Batch size of the synthetic data
+    :param num_calibration_batches: Number of batches to compute encodings on
+    :param iterations: Number of timed forward passes
+    :return: Dictionary with the benchmark settings and the results per model
+    """
+    report = {'settings': {'device': str(device),
+                           'quant_scheme': quant_scheme,
+                           'batch_size': batch_size,
+                           'num_calibration_batches': num_calibration_batches,
+                           'iterations': iterations,
+                           'num_threads': torch.get_num_threads(),
+                           'torch_version': torch.__version__,
+                           'python_version': platform.python_version(),
+                           'machine': platform.machine(),
+                           'timestamp': datetime.datetime.now().isoformat()},
+              'models': {}}
+
+    for model_name in model_names:
+        logger.info('Benchmarking %s', model_name)
+        results = benchmark_model(model_name, device, quant_scheme, batch_size, num_calibration_batches, iterations)
+        report['models'][model_name] = results
+        if 'sim_forward_ms' not in results:
+            logger.error('%s: could not create the sim: %s', model_name, results['errors']['create_sim'])
+            continue
+        logger.info('%s: float forward %.2f ms, sim forward %.2f ms (%.2fx)', model_name,
+                    results['float_forward_ms'], results['sim_forward_ms'], results['sim_overhead_ratio'])
+
+    return report
+
+
+def main():
+    """ Parses command line arguments, runs the benchmarks and writes the results to a JSON file """
+    parser = argparse.ArgumentParser(description='Benchmarks quantization simulation overhead')
+    parser.add_argument('--output', default='quantsim_benchmark.json', help='Path of the JSON file to write')
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=sorted(MODELS),
+                        help='Models to benchmark')
+    parser.add_argument('--device', default='cpu', help='Device to run on, e.g. cpu or cuda')
+    parser.add_argument('--quant-scheme', choices=('tf', 'tf_enhanced'), default='tf_enhanced')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--calibration-batches', type=int, default=4,
+                        help='Number of batches to compute encodings on')
+    parser.add_argument('--iterations', type=int, default=10, help='Number of timed forward passes')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.models, torch.device(args.device), args.quant_scheme, args.batch_size,
+                            args.calibration_batches, args.iterations)
+
+    with open(args.output, 'w') as output_fp:
+        json.dump(report, output_fp, sort_keys=True, indent=4)
+    logger.info('Results written to %s', args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -42,11 +42,17 @@
 #include <DlQuantization/Quantization.hpp>
 #include <DlQuantization/QuantizerFactory.hpp>
 
+#include <ATen/Parallel.h>
 #include <iostream>
+#include <pybind11/stl.h>
+#include <stdexcept>
 #include <string>
 #include <torch/extension.h>
 #include <vector>
 
+// Minimum number of elements per thread when quantizing-dequantizing on CPU
+constexpr int64_t QUANTIZE_DEQUANTIZE_GRAIN_SIZE = 32768;
+
 class AimetTensorQuantizer
 {
 public:
@@ -72,13 +78,12 @@ public:
         // Set encoding as valid
         _isEncodingValid = true;
 
-        at::IntArrayRef sizes  = input.sizes();
-        size_t inputTensorSize = 1;
-        for (auto size: sizes)
-            inputTensorSize *= size;
+        // Stats are collected from a flat buffer, so gather strided tensors into a contiguous one first
+        at::Tensor contiguousInput = input.contiguous();
+        size_t inputTensorSize     = contiguousInput.numel();
 
         // Get a pointer to the tensor data
-        float* inputDataPtr = input.data<float>();
+        float* inputDataPtr = contiguousInput.data<float>();
 
         DlQuantization::ComputationMode cpu_gpu_mode =
             use_cuda ? DlQuantization::ComputationMode::COMP_MODE_GPU : DlQuantization::ComputationMode::COMP_MODE_CPU;
@@ -89,20 +94,44 @@ public:
     at::Tensor quantizeDequantize(at::Tensor input, DlQuantization::TfEncoding& encoding,
                                   DlQuantization::RoundingMode roundingMode, bool use_cuda)
     {
-        // Allocate an output tensor as the same shape as the input
-        at::Tensor output = input;
+        // Allocate a new output tensor as the same shape as the input, leaving the input untouched
+        at::Tensor output = at::empty(input.sizes(), input.options());
+
+        return quantizeDequantizeOut(input, output, encoding, roundingMode, use_cuda);
+    }
+
+    // Writes into a preallocated output tensor. The output may be the input itself, but must not otherwise overlap
+    // with it
+    at::Tensor quantizeDequantizeOut(at::Tensor input, at::Tensor output, DlQuantization::TfEncoding& encoding,
+                                     DlQuantization::RoundingMode roundingMode, bool use_cuda)
+    {
+        if (input.scalar_type() != at::kFloat || output.scalar_type() != at::kFloat)
+            throw std::invalid_argument("Only float tensors can be quantized-dequantized");
+        if (!input.sizes().equals(output.sizes()))
+            throw std::invalid_argument("Output tensor must have the same shape as the input tensor");
+        if (input.device() != output.device())
+            throw std::invalid_argument("Output tensor must be on the same device as the input tensor");
+
+        // The kernels work on flat buffers, so gather strided tensors into contiguous ones first
+        at::Tensor contiguousInput  = input.contiguous();
+        bool isOutputContiguous     = output.is_contiguous();
+        at::Tensor contiguousOutput = isOutputContiguous ? output : at::empty(output.sizes(), output.options());
 
-        at::IntArrayRef sizes  = input.sizes();
-        size_t inputTensorSize = 1;
-        for (auto size: sizes)
-            inputTensorSize *= size;
+        _quantizeDequantizeContiguous(contiguousInput.data<float>(), contiguousInput.numel(),
+                                      contiguousOutput.data<float>(), encoding, roundingMode, use_cuda);
 
-        _tensorQuantizationSim->quantizeDequantizeTensor(input.data<float>(), inputTensorSize, output.data<float>(),
-                                                         encoding.min, encoding.max, encoding.bw, roundingMode, use_cuda);
+        if (!isOutputContiguous)
+            output.copy_(contiguousOutput);
 
         return output;
     }
 
+    at::Tensor quantizeDequantizeInPlace(at::Tensor input, DlQuantization::TfEncoding& encoding,
+                                         DlQuantization::RoundingMode roundingMode, bool use_cuda)
+    {
+        return quantizeDequantizeOut(input, input, encoding, roundingMode, use_cuda);
+    }
+
     std::tuple<DlQuantization::TfEncoding, bool> getEncoding(unsigned int bitwidth, bool useSymmetricEncodings)
     {
         DlQuantization::TfEncoding out_encoding;
@@ -115,7 +144,56 @@ public:
         return std::make_tuple(out_encoding, _isEncodingValid);
     }
 
+    std::vector<double> getStats()
+    {
+        if (!_isEncodingValid)
+        {
+            return std::vector<double>();
+        }
+
+        return _encodingAnalyzer->getStats();
+    }
+
+    void setStats(const std::vector<double>& stats)
+    {
+        _encodingAnalyzer->setStats(stats);
+        _isEncodingValid = !stats.empty();
+    }
+
+    void mergeStats(const std::vector<double>& stats)
+    {
+        if (!_isEncodingValid)
+        {
+            setStats(stats);
+            return;
+        }
+
+        _encodingAnalyzer->mergeStats(stats);
+    }
+
 private:
+    void _quantizeDequantizeContiguous(const float* inputDataPtr, int64_t inputTensorSize, float* outputDataPtr,
+                                       const DlQuantization::TfEncoding& encoding,
+                                       DlQuantization::RoundingMode roundingMode, bool use_cuda)
+    {
+        // The GPU kernel is parallel already, and stochastic rounding draws from a random number generator that
+        // is not thread safe
+        if (use_cuda || roundingMode != DlQuantization::RoundingMode::ROUND_NEAREST)
+        {
+            _tensorQuantizationSim->quantizeDequantizeTensor(inputDataPtr, inputTensorSize, outputDataPtr,
+                                                             encoding.min, encoding.max, encoding.bw, roundingMode,
+                                                             use_cuda);
+            return;
+        }
+
+        // Split the tensor into chunks processed on the intra-op thread pool, so this follows torch.set_num_threads()
+        at::parallel_for(0, inputTensorSize, QUANTIZE_DEQUANTIZE_GRAIN_SIZE, [&](int64_t begin, int64_t end) {
+            _tensorQuantizationSim->quantizeDequantizeTensor(inputDataPtr + begin, end - begin, outputDataPtr + begin,
+                                                             encoding.min, encoding.max, encoding.bw, roundingMode,
+                                                             false);
+        });
+    }
+
     bool _isEncodingValid;
     DlQuantization::QuantizationMode _quantizationScheme;
     std::unique_ptr<DlQuantization::IQuantizationEncodingAnalyzer<float>> _encodingAnalyzer;
@@ -127,8 +205,17 @@ PYBIND11_MODULE(TORCH_EXTENSION_NAME, m)
 {
     pybind11::class_<AimetTensorQuantizer>(m, "AimetTensorQuantizer")
         .def(pybind11::init<DlQuantization::QuantizationMode>())
-        .def("updateStats", &AimetTensorQuantizer::updateStats)
-        .def("quantizeDequantize", &AimetTensorQuantizer::quantizeDequantize)
+        // Stats updates do not touch any python objects, so release the GIL to let them run on background threads
+        .def("updateStats", &AimetTensorQuantizer::updateStats, pybind11::call_guard<pybind11::gil_scoped_release>())
+        .def("quantizeDequantize", &AimetTensorQuantizer::quantizeDequantize,
+             pybind11::call_guard<pybind11::gil_scoped_release>())
+        .def("quantizeDequantizeOut", &AimetTensorQuantizer::quantizeDequantizeOut,
+             pybind11::call_guard<pybind11::gil_scoped_release>())
+        .def("quantizeDequantizeInPlace", &AimetTensorQuantizer::quantizeDequantizeInPlace,
+             pybind11::call_guard<pybind11::gil_scoped_release>())
         .def("getEncoding", &AimetTensorQuantizer::getEncoding)
-        .def("resetEncodingStats", &AimetTensorQuantizer::resetEncodingStats);
+        .def("resetEncodingStats", &AimetTensorQuantizer::resetEncodingStats)
+        .def("getStats", &AimetTensorQuantizer::getStats)
+        .def("setStats", &AimetTensorQuantizer::setStats)
+        .def("mergeStats", &AimetTensorQuantizer::mergeStats);
 }
\ No newline at end of file
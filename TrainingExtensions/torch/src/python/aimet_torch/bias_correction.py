@@ -96,10 +96,11 @@ def get_quantized_dequantized_weight(layer: torch.nn.Module, use_cuda: bool) ->
     """
     weight_tensor = layer._modules['_module_to_wrap'].weight
 
-    encodings = layer.param_quantizers['weight'].encoding
-    round_mode = layer.param_quantizers['weight'].round_mode
-    quant_dequant_weights = layer.param_quantizers['weight']._cppOp.quantizeDequantize(weight_tensor, encodings,
-                                                                                       round_mode, use_cuda)
+    weight_quantizer = layer.param_quantizers['weight']
+    if use_cuda:
+        weight_tensor = weight_tensor.cuda()
+
+    quant_dequant_weights = weight_quantizer.quantize_dequantize(weight_tensor.detach(), weight_quantizer.round_mode)
     return quant_dequant_weights
 
 
@@ -37,7 +37,7 @@
 # =============================================================================
 
 """ Prunes layers using Channel Pruning scheme """
-from typing import Iterator, List
+from typing import Iterator, List, Optional
 import copy
 
 import torch
@@ -49,7 +49,7 @@ from aimet_common.cost_calculator import CostCalculator, Cost
 from aimet_common.pruner import Pruner
 from aimet_common.channel_pruner import select_channels_to_prune
 from aimet_torch.layer_database import LayerDatabase, Layer
-from aimet_torch.data_subsampler import DataSubSampler
+from aimet_torch.data_subsampler import DataSubSampler, ReconstructionDataCache
 from aimet_torch.channel_pruning.weight_reconstruction import WeightReconstructor
 from aimet_torch.winnow.winnow import winnow_model
 
@@ -59,19 +59,27 @@ class InputChannelPruner(Pruner):
     Pruner for Channel Pruning method
     """
 
+    # Reconstruction data is collected with forward hooks on the original model, which would also fire in the forward
+    # passes of other threads
+    IS_THREAD_SAFE = False
+
     def __init__(self, data_loader: Iterator, input_shape, num_reconstruction_samples: int,
-                 allow_custom_downsample_ops: bool):
+                 allow_custom_downsample_ops: bool, reconstruction_memory_budget: Optional[int] = None):
         """
         Input Channel Pruner with given data_loader, input shape, number of batches and samples per image.
 
         :param data_loader: data loader
         :param input_shape: input shape
         :param num_reconstruction_samples: number of reconstruction samples
+        :param allow_custom_downsample_ops: allow downsample/upsample ops to be inserted
+        :param reconstruction_memory_budget: maximum size in bytes of the batches cached in memory for reconstruction,
+         None for no limit
         """
         self._data_loader = data_loader
         self._input_shape = input_shape
         self._num_reconstruction_samples = num_reconstruction_samples
         self._allow_custom_downsample_ops = allow_custom_downsample_ops
+        self._reconstruction_memory_budget = reconstruction_memory_budget
 
     @staticmethod
     def _select_inp_channels(layer: torch.nn.Module, comp_ratio: float) -> list:
@@ -102,7 +110,8 @@ class InputChannelPruner(Pruner):
         return prune_indices
 
     def _data_subsample_and_reconstruction(self, orig_layer: torch.nn.Conv2d, pruned_layer: torch.nn.Conv2d,
-                                           orig_model: torch.nn.Module, comp_model: torch.nn.Module):
+                                           orig_model: torch.nn.Module, comp_model: torch.nn.Module,
+                                           data_cache: Optional[ReconstructionDataCache] = None):
         """
         Collect and sub sampled output data from original layer and input from pruned layer and set
         reconstructed weight and bias to pruned layer in pruned model
@@ -111,12 +120,17 @@ class InputChannelPruner(Pruner):
         :param pruned_layer: layer from potentially compressed model
         :param orig_model: original model without any compression
         :param comp_model: compressed model
+        :param data_cache: original model output data collected for all the layers to prune, or None
         :return: Nothing
         """
-        inp_data, out_data = DataSubSampler.get_sub_sampled_data(orig_layer, pruned_layer, orig_model, comp_model,
-                                                                 self._data_loader, self._num_reconstruction_samples)
+        # the sub sampled data is streamed batch by batch into the reconstruction, which accumulates a batch in a worker
+        # thread while the next one is being captured
+        sub_sampled_data_batches = DataSubSampler.get_sub_sampled_data_batches(orig_layer, pruned_layer, orig_model,
+                                                                               comp_model, self._data_loader,
+                                                                               self._num_reconstruction_samples,
+                                                                               data_cache)
 
-        WeightReconstructor.reconstruct_params_for_conv2d(pruned_layer, inp_data, out_data)
+        WeightReconstructor.reconstruct_params_for_conv2d_from_batches(pruned_layer, sub_sampled_data_batches)
 
     def _sort_on_occurrence(self, model: torch.nn.Module, layer_comp_ratio_list: List[LayerCompRatioPair]) -> \
             List[LayerCompRatioPair]:
@@ -160,7 +174,8 @@ class InputChannelPruner(Pruner):
         return sorted_layer_comp_ratio_list
 
     def _winnow_and_reconstruct_layer(self, orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase,
-                                      layer: Layer, comp_ratio: float, perform_reconstruction: bool):
+                                      layer: Layer, comp_ratio: float, perform_reconstruction: bool,
+                                      data_cache: Optional[ReconstructionDataCache] = None):
         """
         Replaces a given layer within the comp_layer_db with a pruned version of the layer
 
@@ -168,6 +183,8 @@ class InputChannelPruner(Pruner):
         :param comp_layer_db: Layer database, will be modified
         :param layer: Layer to prune
         :param comp_ratio: compression - ratio
+        :param perform_reconstruction: True to reconstruct the weight and bias of the pruned layer
+        :param data_cache: original model output data collected for all the layers to prune, or None
         :return:
         """
         # 1) channel selection
@@ -184,7 +201,7 @@ class InputChannelPruner(Pruner):
             # get original layer reference
             orig_layer = orig_layer_db.find_layer_by_name(layer.name)
             self._data_subsample_and_reconstruction(orig_layer.module, layer.module, orig_layer_db.model,
-                                                    comp_layer_db.model)
+                                                    comp_layer_db.model, data_cache)
 
         # 4) update layer database
         if module_list:
@@ -214,8 +231,9 @@ class InputChannelPruner(Pruner):
                 comp_layer_db.replace_layer(old_layer, new_layer)
 
     def _prune_layer(self, orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase,
-                     layer: Layer, comp_ratio: float, cost_metric: CostMetric):
-        self._winnow_and_reconstruct_layer(orig_layer_db, comp_layer_db, layer, comp_ratio, True)
+                     layer: Layer, comp_ratio: float, cost_metric: CostMetric,
+                     data_cache: Optional[ReconstructionDataCache] = None):
+        self._winnow_and_reconstruct_layer(orig_layer_db, comp_layer_db, layer, comp_ratio, True, data_cache)
 
     def calculate_compressed_cost(self, layer_db: LayerDatabase,
                                   layer_comp_ratio_list: List[LayerCompRatioPair]) -> Cost:
@@ -246,16 +264,27 @@ class InputChannelPruner(Pruner):
 
         # sort all the layers in layer_comp_ratio_list based on occurrence
         layer_comp_ratio_list = self._sort_on_occurrence(layer_db.model, layer_comp_ratio_list)
-        # call the base class method
-        comp_layer_db = Pruner.prune_model(self, layer_db,
-                                           layer_comp_ratio_list, cost_metric, trainer)
 
-        return comp_layer_db
+        # collect the original model's output data of all the layers to prune in a single pass, it is reused for the
+        # reconstruction of each of them. The cache is local to this call, so concurrent calls do not share it
+        orig_layers = [layer_db.find_layer_by_name(pair.layer.name).module for pair in layer_comp_ratio_list
+                       if pair.comp_ratio is not None and pair.comp_ratio < 1.0]
+        data_cache = None
+        if orig_layers:
+            data_cache = DataSubSampler.collect_orig_layers_output_data(orig_layers, layer_db.model,
+                                                                        self._data_loader,
+                                                                        self._num_reconstruction_samples,
+                                                                        self._reconstruction_memory_budget)
+
+        return super().prune_model(layer_db, layer_comp_ratio_list, cost_metric, trainer, data_cache=data_cache)
 
 
 class ChannelPruningCostCalculator(CostCalculator):
     """ Cost calculation utilities for Channel Pruning """
 
+    # Pruning input channels of a layer also winnows the output channels of the layers feeding it
+    HAS_INDEPENDENT_LAYER_COSTS = False
+
     def __init__(self, pruner: InputChannelPruner):
         self._pruner = pruner
 
@@ -38,14 +38,15 @@
 
 """ This module contains code to reconstruct weights post winnowing for the channel pruning feature """
 
+from typing import Iterable, Tuple
 import numpy as np
-from sklearn import linear_model
 import torch
 import torch.utils.data
 import torch.nn
 
 # Import AIMET specific modules
 from aimet_common.utils import AimetLogger
+from aimet_common.channel_pruner import NormalEquationsRegression
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.ChannelPruning)
 
@@ -77,18 +78,14 @@ class WeightReconstructor:
 
         assert input_data.shape[0] == output_data.shape[0]
 
-        # least squares Linear Regression
-        # copy_X : If True, X (input_data) will be copied; else, it may be overwritten
-        regressor = linear_model.LinearRegression(copy_X=True, fit_intercept=bias)
+        # least squares Linear Regression, solved with the normal equations
+        regression = NormalEquationsRegression(bias)
 
-        regressor.fit(X=input_data, y=output_data)
+        regression.add_data(input_data, output_data)
 
-        logger.info("finished linear regression fit ")
-
-        # after regression, the coefficients attrib in the regressor form the new conv weights
-        new_weight = regressor.coef_
+        new_weight, new_bias = regression.solve()
 
-        new_bias = regressor.intercept_ if bias is True else None
+        logger.info("finished linear regression fit ")
 
         return new_weight, new_bias
 
@@ -131,7 +128,7 @@ class WeightReconstructor:
     def reconstruct_params_for_conv2d(cls, layer: torch.nn.Module, input_data: np.ndarray,
                                       output_data: np.ndarray) -> (np.ndarray, np.ndarray):
         """
-        Reconstruction of conv2d params (weights and biases) is performed using linear regression from sckit -learn.
+        Reconstruction of conv2d params (weights and biases) is performed using least squares linear regression.
 
         :param layer        : layer
         :param input_data   : input_data to the current layer, in the shape of (Ns * Nb, Nic, k_h, k_w)
@@ -143,23 +140,50 @@ class WeightReconstructor:
         Nic, Noc = input and output channels of given layer
         k_h, k_w = kernel dimensions of given layer (height, width)
         """
+        cls.reconstruct_params_for_conv2d_from_batches(layer, [(input_data, output_data)], pipeline_depth=0)
+
+    @classmethod
+    def reconstruct_params_for_conv2d_from_batches(cls, layer: torch.nn.Module,
+                                                   sub_sampled_data_batches: Iterable[Tuple[np.ndarray, np.ndarray]],
+                                                   pipeline_depth: int = 2):
+        """
+        Reconstruction of conv2d params (weights and biases) using least squares linear regression, with the data
+        arriving batch by batch. Only the normal equations are accumulated, so the data of all the batches is never
+        held in memory at once.
+
+        :param layer        : layer
+        :param sub_sampled_data_batches: (input_data, output_data) of each batch, input_data in the shape of
+         (Ns, Nic, k_h, k_w) and output_data of shape [Ns, Noc]
+        :param pipeline_depth: maximum number of batches waiting to be accumulated by a worker thread while the next
+         ones are produced, 0 to accumulate them in the calling thread
+        """
         assert isinstance(layer, torch.nn.Conv2d)
-        assert len(input_data.shape) == 4
-        assert len(output_data.shape) == 2
 
-        assert input_data.shape[0] == output_data.shape[0]
-        assert np.prod(input_data.shape[1:4]) == np.prod(layer.weight.shape[1:4])
-        assert output_data.shape[1] == layer.out_channels
+        def _flatten_input_data(batches):
+            """
+            verify the data of each batch and flatten the input data to [Ns, Nic * k_h * k_w]
+            """
+            for input_data, output_data in batches:
 
-        input_data = input_data.reshape(input_data.shape[0], -1)
+                assert len(input_data.shape) == 4
+                assert len(output_data.shape) == 2
 
-        assert len(input_data.shape) == 2
+                assert input_data.shape[0] == output_data.shape[0]
+                assert np.prod(input_data.shape[1:4]) == np.prod(layer.weight.shape[1:4])
+                assert output_data.shape[1] == layer.out_channels
+
+                yield input_data.reshape(input_data.shape[0], -1), output_data
 
         calculate_bias = bool(layer.bias is not None)
 
+        regression = NormalEquationsRegression(calculate_bias)
+
+        regression.add_batches(_flatten_input_data(sub_sampled_data_batches), pipeline_depth)
+
         # reconstruct newer weight and bias
-        new_weight, new_bias = cls._linear_regression(input_data=input_data, output_data=output_data,
-                                                      bias=calculate_bias)
+        new_weight, new_bias = regression.solve()
+
+        logger.info("finished linear regression fit ")
 
         # reshape the new weights
         new_weight = new_weight.reshape([layer.out_channels, layer.in_channels, *layer.kernel_size])
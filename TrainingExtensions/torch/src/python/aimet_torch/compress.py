@@ -38,10 +38,10 @@
 
 """ Top-level API to AIMET compression library """
 
-from typing import Union, Tuple
+from typing import Union, Tuple, List
 import torch
 
-from aimet_common.defs import CostMetric, CompressionScheme, EvalFunction, CompressionStats
+from aimet_common.defs import CostMetric, CompressionScheme, EvalFunction, CompressionStats, CompressionSweepResult
 from aimet_common.bokeh_plots import BokehServerSession
 
 from aimet_torch.defs import SpatialSvdParameters, WeightSvdParameters, ChannelPruningParameters
@@ -65,7 +65,8 @@ class ModelCompressor:
 
         :param model: Model to compress
         :param eval_callback:  Evaluation callback. Expected signature is evaluate(model, iterations, use_cuda).
-                               Expected to return an accuracy metric.
+                               Expected to return an accuracy metric. For SVD schemes the model passed in may share
+                               its parameters with the given model, so they must not be modified by the callback
         :param eval_iterations: Iterations to run evaluation for
         :param trainer: Training Class: Contains a callable, train_model, which takes model, layer which is being fine
                         tuned and an optional parameter train_flag as a parameter
@@ -78,6 +79,62 @@ class ModelCompressor:
         :return: A tuple of the compressed model, and compression statistics
         """
         # pylint:disable=too-many-arguments
+        algo = ModelCompressor._create_compression_algo(model, eval_callback, eval_iterations, input_shape,
+                                                        compress_scheme, cost_metric, parameters, trainer,
+                                                        visualization_url)
+
+        compressed_layer_db, stats = algo.compress_model(cost_metric, trainer)
+        return compressed_layer_db.model, stats
+
+    @staticmethod
+    def compress_model_for_targets(model: torch.nn.Module, eval_callback: EvalFunction, eval_iterations,
+                                   input_shape: Tuple,
+                                   compress_scheme: CompressionScheme, cost_metric: CostMetric,
+                                   parameters: Union[SpatialSvdParameters,
+                                                     WeightSvdParameters,
+                                                     ChannelPruningParameters],
+                                   target_comp_ratios: List[float], create_models: bool = False,
+                                   num_workers: int = 1, trainer=None,
+                                   visualization_url=None) -> List[CompressionSweepResult]:
+        """
+        Selects per-layer compression-ratios for several target compression-ratios using a single greedy eval scores
+        table, e.g. to trace the trade-off between compression and accuracy. The target compression-ratio in the
+        greedy parameters is ignored
+
+        :param model: Model to compress
+        :param eval_callback:  Evaluation callback. Expected signature is evaluate(model, iterations, use_cuda).
+                               Expected to return an accuracy metric. For SVD schemes the model passed in may share
+                               its parameters with the given model, so they must not be modified by the callback
+        :param eval_iterations: Iterations to run evaluation for
+        :param input_shape: Shape of the input tensor for model
+        :param compress_scheme: Compression scheme. See the enum for allowed values
+        :param cost_metric: Cost metric to use for the compression-ratio (either mac or memory)
+        :param parameters: Compression parameters specific to given compression scheme, must use auto mode
+        :param target_comp_ratios: List of target compression-ratios
+        :param create_models: If True, a compressed model is created and evaluated for each target. These are found
+                              in the compressed_layer_db and compression_stats of each result
+        :param num_workers: Number of threads used to create and evaluate the compressed models
+        :param trainer: Training Class, used only if create_models is True. See compress_model()
+        :param visualization_url: url the user will need to input where visualizations will appear
+        :return: List of results, one per target compression-ratio
+        """
+        # pylint:disable=too-many-arguments
+        algo = ModelCompressor._create_compression_algo(model, eval_callback, eval_iterations, input_shape,
+                                                        compress_scheme, cost_metric, parameters, trainer,
+                                                        visualization_url)
+
+        return algo.compress_model_for_targets(cost_metric, target_comp_ratios, trainer, create_models, num_workers)
+
+    @staticmethod
+    def _create_compression_algo(model: torch.nn.Module, eval_callback: EvalFunction, eval_iterations,
+                                 input_shape: Tuple, compress_scheme: CompressionScheme, cost_metric: CostMetric,
+                                 parameters: Union[SpatialSvdParameters, WeightSvdParameters, ChannelPruningParameters],
+                                 trainer, visualization_url):
+        """
+        Creates the compression algorithm for given compression scheme. See compress_model() for the parameters
+        :return: Compression algorithm
+        """
+        # pylint:disable=too-many-arguments
         # If no url is passed in, then do not create a bokeh server session
         if not visualization_url:
             bokeh_session = None
@@ -110,5 +167,4 @@ class ModelCompressor:
         else:
             raise ValueError("Compression scheme not supported: {}".format(compress_scheme))
 
-        compressed_layer_db, stats = algo.compress_model(cost_metric, trainer)
-        return compressed_layer_db.model, stats
+        return algo
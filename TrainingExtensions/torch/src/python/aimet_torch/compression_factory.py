@@ -98,7 +98,15 @@ class CompressionFactory:
                                                                greedy_params.use_monotonic_fit,
                                                                greedy_params.saved_eval_scores_dict,
                                                                comp_ratio_rounding_algo, use_cuda,
-                                                               bokeh_session=bokeh_session)
+                                                               bokeh_session=bokeh_session,
+                                                               num_workers=greedy_params.num_workers,
+                                                               use_processes=greedy_params.use_processes,
+                                                               eval_scores_cache_path=
+                                                               greedy_params.eval_scores_cache_path,
+                                                               adaptive_sampling_tolerance=
+                                                               greedy_params.adaptive_sampling_tolerance,
+                                                               early_exit_score_threshold=
+                                                               greedy_params.early_exit_score_threshold)
             layer_selector = ConvNoDepthwiseLayerSelector()
             modules_to_ignore = params.mode_params.modules_to_ignore
         else:
@@ -145,7 +153,8 @@ class CompressionFactory:
         # Create a pruner
         pruner = InputChannelPruner(data_loader=params.data_loader, input_shape=input_shape,
                                     num_reconstruction_samples=params.num_reconstruction_samples,
-                                    allow_custom_downsample_ops=params.allow_custom_downsample_ops)
+                                    allow_custom_downsample_ops=params.allow_custom_downsample_ops,
+                                    reconstruction_memory_budget=params.reconstruction_memory_budget)
         comp_ratio_rounding_algo = ChannelRounder(params.multiplicity)
 
         # Create a comp-ratio selection algorithm
@@ -160,7 +169,15 @@ class CompressionFactory:
                                                                greedy_params.use_monotonic_fit,
                                                                greedy_params.saved_eval_scores_dict,
                                                                comp_ratio_rounding_algo, use_cuda,
-                                                               bokeh_session=bokeh_session)
+                                                               bokeh_session=bokeh_session,
+                                                               num_workers=greedy_params.num_workers,
+                                                               use_processes=greedy_params.use_processes,
+                                                               eval_scores_cache_path=
+                                                               greedy_params.eval_scores_cache_path,
+                                                               adaptive_sampling_tolerance=
+                                                               greedy_params.adaptive_sampling_tolerance,
+                                                               early_exit_score_threshold=
+                                                               greedy_params.early_exit_score_threshold)
             layer_selector = ConvNoDepthwiseLayerSelector()
             modules_to_ignore = params.mode_params.modules_to_ignore
 
@@ -237,7 +254,8 @@ class CompressionFactory:
                                                            eval_iterations=eval_iterations,
                                                            cost_metric=cost_metric,
                                                            num_rank_indices=tar_params.num_rank_indices,
-                                                           use_cuda=use_cuda)
+                                                           use_cuda=use_cuda,
+                                                           num_workers=tar_params.num_workers)
             else:
                 raise ValueError("Unknown Rank selection scheme: {}".format(params.AutoModeParams.rank_select_scheme))
 
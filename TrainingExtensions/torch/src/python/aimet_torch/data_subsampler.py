@@ -38,7 +38,7 @@
 
 """ Sub-sample data for weight reconstruction for channel pruning feature """
 
-from typing import Iterator, Callable, Tuple, Union, List
+from typing import Iterator, Callable, Tuple, Union, List, Dict, Optional
 import abc
 import math
 import numpy as np
@@ -49,7 +49,7 @@ import torch.nn
 
 # Import AIMET specific modules
 from aimet_common.utils import AimetLogger
-from aimet_common.input_match_search import InputMatchSearch
+from aimet_common.input_match_search import InputMatchSearch, SubSampledDataBuffer
 from aimet_torch import utils
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.ChannelPruning)
@@ -93,6 +93,26 @@ class LayerSubSampler(abc.ABC):
         :return: (sub sampled input data, sub sampled output data)
         """
 
+    @abc.abstractmethod
+    def get_sub_sampled_output_data(self, orig_layer: torch.nn.Module, output_data: np.ndarray,
+                                    samples_per_image: int) -> Tuple[np.ndarray, Optional[tuple]]:
+        """
+        :param orig_layer: original layer
+        :param output_data: output data collected from un compressed model
+        :param samples_per_image: samples per image (default 10)
+        :return: (sub sampled output data, sampled output pixels to pass to get_sub_sampled_input_data())
+        """
+
+    @abc.abstractmethod
+    def get_sub_sampled_input_data(self, orig_layer: torch.nn.Module, input_data: np.ndarray,
+                                   output_pixels: Optional[tuple]) -> np.ndarray:
+        """
+        :param orig_layer: original layer
+        :param input_data: input data collected from compressed model
+        :param output_pixels: sampled output pixels from get_sub_sampled_output_data()
+        :return: sub sampled input data
+        """
+
 
 class Conv2dSubSampler(LayerSubSampler):
     """
@@ -128,6 +148,22 @@ class Conv2dSubSampler(LayerSubSampler):
 
         return sub_sampled_inp_data, sub_sampled_out_data
 
+    def get_sub_sampled_output_data(self, orig_layer: torch.nn.Module, output_data: np.ndarray,
+                                    samples_per_image: int) -> Tuple[np.ndarray, Optional[tuple]]:
+
+        layer_attributes = (orig_layer.kernel_size, orig_layer.stride, orig_layer.padding)
+
+        output_pixels = InputMatchSearch.select_output_pixels(layer_attributes, output_data.shape, samples_per_image)
+
+        return InputMatchSearch.subsample_output_data(output_data, output_pixels), output_pixels
+
+    def get_sub_sampled_input_data(self, orig_layer: torch.nn.Module, input_data: np.ndarray,
+                                   output_pixels: Optional[tuple]) -> np.ndarray:
+
+        layer_attributes = (orig_layer.kernel_size, orig_layer.stride, orig_layer.padding)
+
+        return InputMatchSearch.subsample_input_data(layer_attributes, input_data, output_pixels)
+
 
 class LinearSubSampler(LayerSubSampler):
     """
@@ -156,6 +192,59 @@ class LinearSubSampler(LayerSubSampler):
         # just return the input and output data as it is. No sub sampling needed
         return input_data, output_data
 
+    def get_sub_sampled_output_data(self, orig_layer: torch.nn.Module, output_data: np.ndarray,
+                                    samples_per_image: int) -> Tuple[np.ndarray, Optional[tuple]]:
+
+        return output_data, None
+
+    def get_sub_sampled_input_data(self, orig_layer: torch.nn.Module, input_data: np.ndarray,
+                                   output_pixels: Optional[tuple]) -> np.ndarray:
+
+        return input_data
+
+
+class ReconstructionDataCache:
+    """
+    Batches of a data loader and the sub sampled output data of the original model's layers for these batches. The
+    original model is not modified while its layers are pruned one after another, so its output data is collected once
+    for all the layers to reconstruct. Only the sampled output pixels are kept, and the batches are written into a
+    buffer that is spilled to disk beyond the memory budget
+    """
+    def __init__(self, num_of_batches: int, memory_budget: Optional[int] = None):
+        """
+        :param num_of_batches: expected number of batches
+        :param memory_budget: maximum size in bytes of the batches in memory, beyond which they are written to a spill
+         file. None for no limit
+        """
+        self._batch_buffer = SubSampledDataBuffer(num_of_batches, memory_budget)
+        self._batch_sizes = list()
+        # batches that are not a single tensor are kept as they are
+        self._batches = list()
+        # dictionary mapping original layers to their (sub sampled output data, sampled output pixels), one per batch
+        self.layers_output_data = dict()
+
+    def add_batch(self, batch: Union[torch.Tensor, List, Tuple]):
+        """
+        Add the model inputs of the next batch
+        :param batch: model inputs of the batch
+        """
+        if isinstance(batch, torch.Tensor):
+            self._batch_buffer.append(utils.to_numpy(batch))
+            self._batch_sizes.append(len(batch))
+        else:
+            self._batches.append(batch)
+
+    @property
+    def batches(self) -> List[Union[torch.Tensor, List, Tuple]]:
+        """ model inputs of the batches, in data loader order """
+        if not self._batch_sizes:
+            return self._batches
+
+        batch_data = self._batch_buffer.get_data()
+        batch_offsets = np.cumsum([0] + self._batch_sizes)
+
+        return [torch.from_numpy(batch_data[start:end]) for start, end in zip(batch_offsets[:-1], batch_offsets[1:])]
+
 
 class DataSubSampler:
     """ Utilities to sub-sample data for weight reconstruction """
@@ -195,14 +284,150 @@ class DataSubSampler:
         hook_handle = layer.register_forward_hook(hook)
         return hook_handle
 
+    @staticmethod
+    def _create_sub_sampler(orig_layer: Union[torch.nn.Conv2d, torch.nn.Linear],
+                            pruned_layer: Union[torch.nn.Conv2d, torch.nn.Linear]) -> LayerSubSampler:
+        """
+        create the sub sampler for given layer type and verify the layers
+        :param orig_layer: original layer
+        :param pruned_layer: pruned layer
+        :return: sub sampler
+        """
+        if isinstance(orig_layer, torch.nn.Conv2d) and isinstance(pruned_layer, torch.nn.Conv2d):
+            sub_sampler = Conv2dSubSampler()
+
+        elif isinstance(orig_layer, torch.nn.Linear) and isinstance(pruned_layer, torch.nn.Linear):
+            sub_sampler = LinearSubSampler()
+
+        else:
+            raise ValueError('Layer type not supported!')
+
+        # verify the layers
+        sub_sampler.verify_layers(orig_layer, pruned_layer)
+
+        return sub_sampler
+
+    @staticmethod
+    def _get_number_of_batches(sub_sampler: LayerSubSampler, orig_layer: torch.nn.Module, data_loader: Iterator,
+                               num_reconstruction_samples: int, samples_per_image: int) -> int:
+        """
+        get number of batches depending on the layer type
+        :param sub_sampler: sub sampler for the layer type
+        :param orig_layer: original layer
+        :param data_loader: data loader
+        :param num_reconstruction_samples: The number of reconstruction samples
+        :param samples_per_image: samples per image
+        :return: number of batches
+        """
+        num_of_batches = sub_sampler.get_number_of_batches(data_loader, orig_layer, num_reconstruction_samples,
+                                                           samples_per_image)
+
+        # Todo - I am not sure if checking the length of a data loader is a great idea.
+        if num_of_batches > len(data_loader) or num_of_batches < 1:
+            raise ValueError("There are insufficient batches of data in the provided data loader for the "
+                             "purpose of weight reconstruction or number of reconstruction samples!")
+
+        return num_of_batches
+
     @classmethod
-    def get_sub_sampled_data(cls, orig_layer: Union[torch.nn.Conv2d, torch.nn.Linear],
-                             pruned_layer: Union[torch.nn.Conv2d, torch.nn.Linear],
-                             orig_model: torch.nn.Module, comp_model: torch.nn.Module, data_loader: Iterator,
-                             num_reconstruction_samples: int) -> (np.ndarray, np.ndarray):
+    def collect_orig_layers_output_data(cls, orig_layers: List[Union[torch.nn.Conv2d, torch.nn.Linear]],
+                                        orig_model: torch.nn.Module, data_loader: Iterator,
+                                        num_reconstruction_samples: int,
+                                        memory_budget: Optional[int] = None) -> ReconstructionDataCache:
+        """
+        Collect the sub sampled output data of many layers of the original model with a single pass over the data
+        loader. Each forward pass stops as soon as all the layers have been reached. The output pixels to sample are
+        selected while collecting, so only the sampled output data is kept
+
+        :param orig_layers: layers of the original model
+        :param orig_model: original model, un-pruned, used to provide the actual outputs
+        :param data_loader: data loader
+        :param num_reconstruction_samples: The number of reconstruction samples
+        :param memory_budget: maximum size in bytes of the cached batches in memory, beyond which they are written to
+         a spill file. None for no limit
+        :return: cache with the batches and the sub sampled output data of the layers, to pass to
+         get_sub_sampled_data()
+        """
         # pylint: disable=too-many-locals
+
+        def _hook_to_collect_output_data(module, _, out_data):
+            """
+            hook to collect sub sampled output data
+            """
+            # a layer called more than once in a forward pass provides its first output
+            if module not in batch_output_data:
+                batch_output_data[module] = None
+                if batch_index < num_of_batches_per_layer[module]:
+                    batch_output_data[module] = sub_samplers[module].get_sub_sampled_output_data(
+                        module, utils.to_numpy(out_data), samples_per_image)
+
+            if len(batch_output_data) == len(orig_layers):
+                raise StopForwardException
+
+        # hard coded value
+        samples_per_image = 10
+
+        sub_samplers = dict()
+        num_of_batches_per_layer = dict()
+        for orig_layer in orig_layers:
+            sub_samplers[orig_layer] = cls._create_sub_sampler(orig_layer, orig_layer)
+            num_of_batches_per_layer[orig_layer] = cls._get_number_of_batches(sub_samplers[orig_layer], orig_layer,
+                                                                              data_loader, num_reconstruction_samples,
+                                                                              samples_per_image)
+        num_of_batches = max(num_of_batches_per_layer.values())
+
+        batch_output_data = dict()
+
+        data_cache = ReconstructionDataCache(num_of_batches, memory_budget)
+        data_cache.layers_output_data = {orig_layer: list() for orig_layer in orig_layers}
+
+        # register forward hooks
+        hook_handles = [cls._register_fwd_hook_for_layer(orig_layer, _hook_to_collect_output_data)
+                        for orig_layer in orig_layers]
+
+        try:
+            for batch_index, batch in enumerate(data_loader):
+
+                assert isinstance(batch, (tuple, list)), 'data loader should provide data in list or tuple format' \
+                                                         '(input_data, labels) or [input_data, labels]'
+
+                batch, _ = batch
+
+                DataSubSampler._forward_pass(orig_model, batch)
+
+                if len(batch_output_data) < len(orig_layers):
+                    layer_names = {module: name for name, module in orig_model.named_modules()}
+                    raise ValueError("Layers %s of the original model are not reached in its forward pass!" %
+                                     [layer_names.get(orig_layer, orig_layer) for orig_layer in orig_layers
+                                      if orig_layer not in batch_output_data])
+
+                data_cache.add_batch(batch)
+                for orig_layer, output_data in data_cache.layers_output_data.items():
+                    if batch_index < num_of_batches_per_layer[orig_layer]:
+                        output_data.append(batch_output_data[orig_layer])
+
+                batch_output_data.clear()
+
+                if batch_index == num_of_batches - 1:
+                    logger.debug("batch index : %s reached number of batches: %s", batch_index + 1, num_of_batches)
+                    break
+
+        finally:
+            # remove hook handles
+            for hook_handle in hook_handles:
+                hook_handle.remove()
+
+        return data_cache
+
+    @classmethod
+    def get_sub_sampled_data_batches(cls, orig_layer: Union[torch.nn.Conv2d, torch.nn.Linear],
+                                     pruned_layer: Union[torch.nn.Conv2d, torch.nn.Linear],
+                                     orig_model: torch.nn.Module, comp_model: torch.nn.Module, data_loader: Iterator,
+                                     num_reconstruction_samples: int, data_cache: ReconstructionDataCache = None) -> \
+            Iterator[Tuple[np.ndarray, np.ndarray]]:
         """
-        Get all the input data from pruned model and output data from original model
+        Get the input data from pruned model and output data from original model, sub sampled batch by batch. The data
+        of a batch is collected only when the previous one has been consumed
 
         :param orig_layer: original layer
         :param pruned_layer: pruned layer
@@ -210,7 +435,41 @@ class DataSubSampler:
         :param comp_model: comp. model, this is potentially already pruned in the upstreams layers of given layer name
         :param data_loader: data loader
         :param num_reconstruction_samples: The number of reconstruction samples
-        :return: input_data, output_data
+        :param data_cache: batches and sub sampled original layer output data from collect_orig_layers_output_data().
+         If given, only the compressed model is run, on the cached batches
+        :return: iterator over (sub sampled input data, sub sampled output data) of each batch
+        """
+        sub_sampler = cls._create_sub_sampler(orig_layer, pruned_layer)
+
+        # hard coded value
+        samples_per_image = 10
+
+        num_of_batches = cls._get_number_of_batches(sub_sampler, orig_layer, data_loader, num_reconstruction_samples,
+                                                    samples_per_image)
+
+        return cls._sub_sample_batches(sub_sampler, orig_layer, pruned_layer, orig_model, comp_model, data_loader,
+                                       num_of_batches, samples_per_image, data_cache)
+
+    @classmethod
+    def _sub_sample_batches(cls, sub_sampler: LayerSubSampler, orig_layer: Union[torch.nn.Conv2d, torch.nn.Linear],
+                            pruned_layer: Union[torch.nn.Conv2d, torch.nn.Linear], orig_model: torch.nn.Module,
+                            comp_model: torch.nn.Module, data_loader: Iterator, num_of_batches: int,
+                            samples_per_image: int, data_cache: Optional[ReconstructionDataCache]) -> \
+            Iterator[Tuple[np.ndarray, np.ndarray]]:
+        # pylint: disable=too-many-arguments, too-many-locals
+        """
+        Generator behind get_sub_sampled_data_batches()
+
+        :param sub_sampler: sub sampler for the layer type
+        :param orig_layer: original layer
+        :param pruned_layer: pruned layer
+        :param orig_model: original model
+        :param comp_model: comp. model
+        :param data_loader: data loader
+        :param num_of_batches: number of batches
+        :param samples_per_image: samples per image
+        :param data_cache: batches and sub sampled original layer output data, or None
+        :return: iterator over (sub sampled input data, sub sampled output data) of each batch
         """
 
         def _hook_to_collect_input_data(module, inp_data, _):
@@ -229,77 +488,96 @@ class DataSubSampler:
             orig_layer_out_data.append(out_data)
             raise StopForwardException
 
-        if isinstance(orig_layer, torch.nn.Conv2d) and isinstance(pruned_layer, torch.nn.Conv2d):
-            sub_sampler = Conv2dSubSampler()
+        hook_handles = list()
 
-        elif isinstance(orig_layer, torch.nn.Linear) and isinstance(pruned_layer, torch.nn.Linear):
-            sub_sampler = LinearSubSampler()
+        orig_layer_out_data = list()
+        pruned_layer_inp_data = list()
 
-        else:
-            raise ValueError('Layer type not supported!')
+        # register forward hooks
+        hook_handles.append(cls._register_fwd_hook_for_layer(pruned_layer, _hook_to_collect_input_data))
 
-        # verify the layers
-        sub_sampler.verify_layers(orig_layer, pruned_layer)
+        if data_cache is None:
+            hook_handles.append(cls._register_fwd_hook_for_layer(orig_layer, _hook_to_collect_output_data))
+            batches = data_loader
+        else:
+            batches = data_cache.batches
 
-        # hard coded value
-        samples_per_image = 10
+        try:
+            # forward pass for given number of batches for both original model and compressed model
+            for batch_index, batch in enumerate(batches):
 
-        # get number of batches depending on the layer type
-        num_of_batches = sub_sampler.get_number_of_batches(data_loader, orig_layer, num_reconstruction_samples,
-                                                           samples_per_image)
+                if data_cache is None:
+                    assert isinstance(batch, (tuple, list)), 'data loader should provide data in list or tuple ' \
+                                                             'format (input_data, labels) or [input_data, labels]'
 
-        # Todo - I am not sure if checking the length of a data loader is a great idea.
-        if num_of_batches > len(data_loader) or num_of_batches < 1:
-            raise ValueError("There are insufficient batches of data in the provided data loader for the "
-                             "purpose of weight reconstruction or number of reconstruction samples!")
+                    batch, _ = batch
 
-        hook_handles = list()
+                    DataSubSampler._forward_pass(orig_model, batch)
+                    output_data = np.vstack(orig_layer_out_data)
 
-        orig_layer_out_data = list()
-        pruned_layer_inp_data = list()
+                DataSubSampler._forward_pass(comp_model, batch)
+                input_data = np.vstack(pruned_layer_inp_data)
 
-        all_sub_sampled_inp_data = list()
-        all_sub_sampled_out_data = list()
+                # delete list entries used for hooks
+                del pruned_layer_inp_data[:]
+                del orig_layer_out_data[:]
 
-        # register forward hooks
-        hook_handles.append(cls._register_fwd_hook_for_layer(orig_layer, _hook_to_collect_output_data))
+                # get the sub sampled input and output data depending on layer type
+                if data_cache is None:
+                    yield sub_sampler.get_sub_sampled_data(orig_layer, input_data, output_data, samples_per_image)
+                else:
+                    # the input data is sampled at the output pixels sampled when the cache was collected
+                    sub_sampled_out_data, output_pixels = data_cache.layers_output_data[orig_layer][batch_index]
+                    yield sub_sampler.get_sub_sampled_input_data(orig_layer, input_data, output_pixels), \
+                        sub_sampled_out_data
 
-        hook_handles.append(cls._register_fwd_hook_for_layer(pruned_layer, _hook_to_collect_input_data))
+                if batch_index == num_of_batches - 1:
+                    logger.debug("batch index : %s reached number of batches: %s", batch_index + 1, num_of_batches)
+                    break
 
-        # forward pass for given number of batches for both original model and compressed model
-        for batch_index, batch in enumerate(data_loader):
+        finally:
+            # remove hook handles
+            for hook_handle in hook_handles:
+                hook_handle.remove()
 
-            assert isinstance(batch, (tuple, list)), 'data loader should provide data in list or tuple format' \
-                                                     '(input_data, labels) or [input_data, labels]'
+    @classmethod
+    def get_sub_sampled_data(cls, orig_layer: Union[torch.nn.Conv2d, torch.nn.Linear],
+                             pruned_layer: Union[torch.nn.Conv2d, torch.nn.Linear],
+                             orig_model: torch.nn.Module, comp_model: torch.nn.Module, data_loader: Iterator,
+                             num_reconstruction_samples: int, data_cache: ReconstructionDataCache = None) -> \
+            (np.ndarray, np.ndarray):
+        """
+        Get all the input data from pruned model and output data from original model
 
-            batch, _ = batch
+        :param orig_layer: original layer
+        :param pruned_layer: pruned layer
+        :param orig_model: original model, un-pruned, used to provide the actual outputs
+        :param comp_model: comp. model, this is potentially already pruned in the upstreams layers of given layer name
+        :param data_loader: data loader
+        :param num_reconstruction_samples: The number of reconstruction samples
+        :param data_cache: batches and sub sampled original layer output data from collect_orig_layers_output_data().
+         If given, only the compressed model is run, on the cached batches
+        :return: input_data, output_data
+        """
+        sub_sampler = cls._create_sub_sampler(orig_layer, pruned_layer)
 
-            DataSubSampler._forward_pass(orig_model, batch)
-            DataSubSampler._forward_pass(comp_model, batch)
+        # hard coded value
+        samples_per_image = 10
 
-            input_data = np.vstack(pruned_layer_inp_data)
-            output_data = np.vstack(orig_layer_out_data)
+        num_of_batches = cls._get_number_of_batches(sub_sampler, orig_layer, data_loader, num_reconstruction_samples,
+                                                    samples_per_image)
 
-            # delete list entries used for hooks
-            del pruned_layer_inp_data[:]
-            del orig_layer_out_data[:]
+        # sub sampled data of all the batches is written into buffers allocated once
+        all_sub_sampled_inp_data = SubSampledDataBuffer(num_of_batches)
+        all_sub_sampled_out_data = SubSampledDataBuffer(num_of_batches)
 
-            # get the sub sampled input and output data depending on layer type
-            sub_sampled_inp_data, sub_sampled_out_data = sub_sampler.get_sub_sampled_data(orig_layer, input_data,
-                                                                                          output_data,
-                                                                                          samples_per_image)
+        sub_sampled_data_batches = cls._sub_sample_batches(sub_sampler, orig_layer, pruned_layer, orig_model,
+                                                           comp_model, data_loader, num_of_batches, samples_per_image,
+                                                           data_cache)
 
+        for sub_sampled_inp_data, sub_sampled_out_data in sub_sampled_data_batches:
             all_sub_sampled_inp_data.append(sub_sampled_inp_data)
             all_sub_sampled_out_data.append(sub_sampled_out_data)
 
-            if batch_index == num_of_batches - 1:
-                logger.debug("batch index : %s reached number of batches: %s", batch_index + 1, num_of_batches)
-                break
-
-        # remove hook handles
-        for hook_handle in hook_handles:
-            hook_handle.remove()
-
-        # accumulate total sub sampled input and output data
-
-        return np.vstack(all_sub_sampled_inp_data), np.vstack(all_sub_sampled_out_data)
+        # total sub sampled input and output data
+        return all_sub_sampled_inp_data.get_data(), all_sub_sampled_out_data.get_data()
@@ -147,13 +147,15 @@ class ChannelPruningParameters:
 
     def __init__(self, data_loader: torch.utils.data.DataLoader, num_reconstruction_samples: int,
                  allow_custom_downsample_ops: bool,
-                 mode: Mode, params: Union[ManualModeParams, AutoModeParams], multiplicity=1):
+                 mode: Mode, params: Union[ManualModeParams, AutoModeParams], multiplicity=1,
+                 reconstruction_memory_budget: Optional[int] = None):
         self.data_loader = data_loader
         self.num_reconstruction_samples = num_reconstruction_samples
         self.allow_custom_downsample_ops = allow_custom_downsample_ops
         self.mode = mode
         self.mode_params = params
         self.multiplicity = multiplicity
+        self.reconstruction_memory_budget = reconstruction_memory_budget
 
 
 class WeightSvdParameters:
@@ -38,6 +38,7 @@
 
 """Stores and updates Layer Attributes"""
 import copy
+import contextlib
 
 import torch
 from aimet_torch import utils
@@ -140,6 +141,22 @@ class LayerDatabase(aimet_common.layer_database.LayerDatabase):
 
         self._compressible_layers[id(new_layer.module)] = new_layer
 
+    @contextlib.contextmanager
+    def temporarily_replace_module(self, layer: Layer, new_module: torch.nn.Module):
+        """
+        Swaps a module into the model in place of the module of given layer, and restores the original module on exit.
+        The LayerDatabase itself is not updated
+
+        :param layer: Layer whose module is to be replaced
+        :param new_module: Module to use in place of the layer's module
+        :return: None
+        """
+        setattr(layer.parent_module, layer.var_name_of_module_in_parent, new_module)
+        try:
+            yield
+        finally:
+            setattr(layer.parent_module, layer.var_name_of_module_in_parent, layer.module)
+
     def replace_layer_with_sequential_of_two_layers(self, layer_to_replace: Layer,
                                                     layer_a: Layer, layer_b: Layer):
         """
@@ -39,12 +39,16 @@
 
 import abc
 from enum import Enum
-from typing import Union
+from typing import Union, Dict, Callable
 
+import torch
 from torch import nn
+import torch.nn.functional as F
 from aimet_common.utils import AimetLogger
 from aimet_common.defs import QuantScheme
-from aimet_torch.tensor_quantizer import PostTrainingTensorQuantizer
+from aimet_torch.tensor_quantizer import PostTrainingTensorQuantizer, PerChannelPostTrainingTensorQuantizer, \
+    AsyncEncodingStatsCollector
+from aimet_torch.quantsim_profiler import QuantSimProfiler, record_event
 
 import libpymo
 
@@ -81,8 +85,89 @@ def module_has_weights(module):
     return False
 
 
+def _conv1d_forward(module: nn.Conv1d, inp: torch.Tensor, params: Dict[str, torch.Tensor]) -> torch.Tensor:
+    return F.conv1d(inp, params['weight'], params.get('bias'), module.stride, module.padding, module.dilation,
+                    module.groups)
+
+
+def _conv2d_forward(module: nn.Conv2d, inp: torch.Tensor, params: Dict[str, torch.Tensor]) -> torch.Tensor:
+    return F.conv2d(inp, params['weight'], params.get('bias'), module.stride, module.padding, module.dilation,
+                    module.groups)
+
+
+def _conv_transpose2d_forward(module: nn.ConvTranspose2d, inp: torch.Tensor,
+                              params: Dict[str, torch.Tensor]) -> torch.Tensor:
+    return F.conv_transpose2d(inp, params['weight'], params.get('bias'), module.stride, module.padding,
+                              module.output_padding, module.groups, module.dilation)
+
+
+def _linear_forward(module: nn.Linear, inp: torch.Tensor, params: Dict[str, torch.Tensor]) -> torch.Tensor:
+    return F.linear(inp, params['weight'], params.get('bias'))
+
+
+# Functional equivalents of module forward passes. Used to run a wrapped module against quantized-dequantized
+# copies of its parameters, without having to swap the quantized values into the module's parameters
+FUNCTIONAL_FORWARD_FOR_MODULE_TYPE = {nn.Conv1d:          _conv1d_forward,
+                                      nn.Conv2d:          _conv2d_forward,
+                                      nn.ConvTranspose2d: _conv_transpose2d_forward,
+                                      nn.Linear:          _linear_forward}
+
+
+def get_functional_forward(module: nn.Module) -> Union[Callable, None]:
+    """
+    Returns the functional equivalent of the forward pass for a given module, if one is known
+    :param module: Module
+    :return: Functional forward taking (module, input, params), or None if the module is not supported
+    """
+    # Only exact type matches are considered since derived classes may have overridden forward()
+    functional_forward = FUNCTIONAL_FORWARD_FOR_MODULE_TYPE.get(type(module))
+
+    # Only zero padding maps directly onto the functional conv ops
+    if getattr(module, 'padding_mode', 'zeros') != 'zeros':
+        functional_forward = None
+
+    # Hooks only run when the module is called, and reparametrizations (e.g. weight norm) replace the weight with
+    # other parameters
+    if module._forward_hooks or module._forward_pre_hooks or module._backward_hooks:  # pylint: disable=protected-access
+        functional_forward = None
+
+    if {name for name, _ in module.named_parameters()} not in ({'weight'}, {'weight', 'bias'}):
+        functional_forward = None
+
+    return functional_forward
+
+
+# Axis of the weight along which output channels are laid out, for modules supporting per-channel weight quantization
+PER_CHANNEL_AXIS_FOR_MODULE_TYPE = {nn.Conv1d:          0,
+                                    nn.Conv2d:          0,
+                                    nn.ConvTranspose2d: 1,
+                                    nn.Linear:          0}
+
+
+def get_per_channel_axis(module: nn.Module) -> Union[int, None]:
+    """
+    Returns the output channel axis of the weight of a given module, if the module supports per-channel quantization
+    :param module: Module
+    :return: Output channel axis, or None if the module is not supported
+    """
+    for module_type, channel_axis in PER_CHANNEL_AXIS_FOR_MODULE_TYPE.items():
+        if isinstance(module, module_type):
+            return channel_axis
+
+    return None
+
+
+def is_tracing() -> bool:
+    """
+    Check if the forward pass is being traced by torch.jit. Traced graphs need to be identical across invocations, so
+    cached results should not be used while tracing
+    :return: True if tracing, False otherwise
+    """
+    return torch._C._get_tracing_state() is not None  # pylint: disable=protected-access
+
+
 def tensor_quantizer_factory(bitwidth: int, round_mode: str, quant_scheme: Union[QuantScheme, libpymo.QuantizationMode],
-                             use_symmetric_encodings: bool, enabled_by_default: bool):
+                             use_symmetric_encodings: bool, enabled_by_default: bool, channel_axis: int = None):
     """
     Instantiates TensorQuantizer depending on the quant_scheme
     :param bitwidth: Quantization bitwidth
@@ -90,12 +175,18 @@ def tensor_quantizer_factory(bitwidth: int, round_mode: str, quant_scheme: Union
     :param quant_scheme: Quantization scheme (e.g. Range Learning)
     :param use_symmetric_encodings: True if symmetric encoding is used.  False otherwise.
     :param enabled_by_default: True if quantization of tensor is enabled.  False otherwise.
-    :return: An instance of PostTrainingTensorQuantizer
+    :param channel_axis: If given, the tensor is quantized with a separate encoding per channel along this axis
+    :return: An instance of PostTrainingTensorQuantizer or PerChannelPostTrainingTensorQuantizer
     """
     assert quant_scheme in [libpymo.QuantizationMode.QUANTIZATION_TF_ENHANCED, libpymo.QuantizationMode.QUANTIZATION_TF]
 
-    tensor_quantizer = PostTrainingTensorQuantizer(bitwidth, round_mode, quant_scheme, use_symmetric_encodings,
-                                                   enabled_by_default)
+    if channel_axis is not None:
+        tensor_quantizer = PerChannelPostTrainingTensorQuantizer(bitwidth, round_mode, quant_scheme,
+                                                                 use_symmetric_encodings, enabled_by_default,
+                                                                 channel_axis)
+    else:
+        tensor_quantizer = PostTrainingTensorQuantizer(bitwidth, round_mode, quant_scheme, use_symmetric_encodings,
+                                                       enabled_by_default)
     return tensor_quantizer
 
 
@@ -119,6 +210,22 @@ class QcQuantizeStandAloneBase(nn.Module):
                                                          enabled_by_default=True)
         self._mode = QcQuantizeOpMode.PASSTHROUGH
 
+        # If set, forward passes are recorded to this profiler
+        self._profiler = None
+        self._profiling_name = None
+
+    def __getstate__(self):
+        # Profilers are not saved along with the op
+        state = self.__dict__.copy()
+        state['_profiler'] = None
+        return state
+
+    def __setstate__(self, state):
+        # Ops saved before profiling was added do not have the profiling attributes
+        super().__setstate__(state)
+        self._profiler = None
+        self._profiling_name = None
+
     @abc.abstractmethod
     def forward(self, *inputs):
         """
@@ -144,6 +251,16 @@ class QcQuantizeStandAloneBase(nn.Module):
         """
         self._mode = mode
 
+    def set_profiler(self, profiler: Union[QuantSimProfiler, None], name: str = None):
+        """
+        Sets a profiler to record forward passes of this op and its tensor quantizer to
+        :param profiler: Profiler to use, or None to stop profiling
+        :param name: Name of this op in the model
+        """
+        self._profiler = profiler
+        self._profiling_name = name
+        self.output_quantizer.set_profiler(profiler, name + '.output_quantizer' if profiler else None)
+
     def _quantize_activation(self, tensor_quantizer, tensors_to_quantize):
         """
         Forward-pass routine. This quantizes the weights before delegating to the wrapped module and
@@ -188,7 +305,7 @@ class QcQuantizeWrapper(nn.Module):
     """
 
     def __init__(self, module_to_wrap: nn.Module, weight_bw: int, activation_bw: int, round_mode, quant_scheme,
-                 is_output_quantized=True, is_symmetric=False):
+                 is_output_quantized=True, is_symmetric=False, per_channel_quantization=False):
         """
         Constructor
         :param module_to_wrap: Module that will be wrapped with this custom op
@@ -198,6 +315,8 @@ class QcQuantizeWrapper(nn.Module):
         :param quant_scheme: Quantization scheme (e.g. TF Enhanced)
         :param is_output_quantized: True if output tensor quantizer is enabled.  False otherwise.
         :param is_symmetric: True if symmetric encoding is used.  False otherwise.
+        :param per_channel_quantization: True if the weight is quantized with a separate encoding per output channel,
+            for modules that support it.  False otherwise.
         """
         super(QcQuantizeWrapper, self).__init__()
         self.output_quantizer = tensor_quantizer_factory(activation_bw, round_mode,
@@ -212,12 +331,15 @@ class QcQuantizeWrapper(nn.Module):
 
         # Create quantizer for each parameter and compute encodings
         self.param_quantizers = {}
+        weight_channel_axis = get_per_channel_axis(module_to_wrap) if per_channel_quantization else None
         for name, _ in module_to_wrap.named_parameters():
             _logger.debug("Adding quantizer for parameter: %s", name)
             self.param_quantizers[name] = tensor_quantizer_factory(weight_bw, round_mode,
                                                                    quant_scheme,
                                                                    is_symmetric,
-                                                                   enabled_by_default=True)
+                                                                   enabled_by_default=True,
+                                                                   channel_axis=weight_channel_axis
+                                                                   if name == 'weight' else None)
 
         # Create quantizer for layer input
         self.input_quantizer = tensor_quantizer_factory(activation_bw, round_mode,
@@ -225,6 +347,27 @@ class QcQuantizeWrapper(nn.Module):
                                                         is_symmetric,
                                                         enabled_by_default=False)
 
+        # If set, activation stats in analysis mode are updated through this collector instead of synchronously
+        self._stats_collector = None
+
+        # If set, forward passes are recorded to this profiler
+        self._profiler = None
+        self._profiling_name = None
+
+    def __getstate__(self):
+        # Profilers and stats collectors are not saved along with the wrapper
+        state = self.__dict__.copy()
+        state['_profiler'] = None
+        state['_stats_collector'] = None
+        return state
+
+    def __setstate__(self, state):
+        # Wrappers saved before profiling and async stats collection were added do not have these attributes
+        super().__setstate__(state)
+        self._profiler = None
+        self._profiling_name = None
+        self._stats_collector = None
+
     @abc.abstractmethod
     def forward(self, *inputs):
         """
@@ -249,12 +392,42 @@ class QcQuantizeWrapper(nn.Module):
         """
         self._mode = mode
 
+    def set_stats_collector(self, stats_collector: Union[AsyncEncodingStatsCollector, None]):
+        """
+        Sets a collector to defer activation stats updates to in analysis mode
+        :param stats_collector: Stats collector to use, or None to update stats synchronously
+        """
+        self._stats_collector = stats_collector
+
+    def set_profiler(self, profiler: Union[QuantSimProfiler, None], name: str = None):
+        """
+        Sets a profiler to record forward passes of this wrapper and its tensor quantizers to
+        :param profiler: Profiler to use, or None to stop profiling
+        :param name: Name of this wrapper in the model
+        """
+        self._profiler = profiler
+        self._profiling_name = name
+
+        for quantizer_name, tensor_quantizer in self._get_named_tensor_quantizers():
+            tensor_quantizer.set_profiler(profiler, name + '.' + quantizer_name if profiler else None)
+
+    def _get_named_tensor_quantizers(self):
+        """
+        Returns all tensor quantizers of this wrapper
+        :return: List of (name, tensor quantizer) tuples
+        """
+        named_tensor_quantizers = [('input_quantizer', self.input_quantizer),
+                                   ('output_quantizer', self.output_quantizer)]
+        named_tensor_quantizers += [('param_quantizers.' + param_name, param_quantizer)
+                                    for param_name, param_quantizer in self.param_quantizers.items()]
+        return named_tensor_quantizers
+
 
 class QcPostTrainingWrapper(QcQuantizeWrapper):
     """ A custom PyTorch module that derives from QcQuantizeWrapper and quantizes modules """
 
     def __init__(self, module_to_wrap: nn.Module, weight_bw: int, activation_bw: int, round_mode, quant_scheme,
-                 is_output_quantized=True, is_symmetric=False):
+                 is_output_quantized=True, is_symmetric=False, per_channel_quantization=False):
         """
         Constructor
         :param module_to_wrap: Module that will be wrapped with this custom op
@@ -264,13 +437,15 @@ class QcPostTrainingWrapper(QcQuantizeWrapper):
         :param quant_scheme: Quantization scheme (e.g. TF Enhanced)
         :param is_output_quantized: True if output tensor quantizer is enabled.  False otherwise.
         :param is_symmetric: True if symmetric encoding is used.  False otherwise.
+        :param per_channel_quantization: True if the weight is quantized with a separate encoding per output channel,
+            for modules that support it.  False otherwise.
         """
         # Translate round mode and quant scheme into pymo types prior to initializing super()
         round_mode = MAP_ROUND_MODE_TO_PYMO[round_mode]
         quant_scheme = MAP_QUANT_SCHEME_TO_PYMO[quant_scheme]
 
         super(QcPostTrainingWrapper, self).__init__(module_to_wrap, weight_bw, activation_bw, round_mode, quant_scheme,
-                                                    is_output_quantized, is_symmetric)
+                                                    is_output_quantized, is_symmetric, per_channel_quantization)
 
     def forward(self, *inputs):
         """
@@ -280,35 +455,84 @@ class QcPostTrainingWrapper(QcQuantizeWrapper):
         :return: Quantized output from the wrapped module
         """
 
-        # Quantize the inputs
-        quantized_inputs = self._quantize_activation(self.input_quantizer, inputs)
-        if not isinstance(quantized_inputs, list):
-            quantized_inputs = [quantized_inputs]
+        with record_event(self._profiler, self._profiling_name, 'forward', inputs) as forward_event:
 
-        # Quantize the parameters
-        shadow_params = self._quantize_dequantize_params()
+            # Quantize the inputs
+            quantized_inputs = self._quantize_activation(self.input_quantizer, inputs)
+            if not isinstance(quantized_inputs, list):
+                quantized_inputs = [quantized_inputs]
 
-        # Call the forward of the wrapped module
-        wrapped_output = self._module_to_wrap(*quantized_inputs)
+            functional_forward = get_functional_forward(self._module_to_wrap)
+            if functional_forward and len(quantized_inputs) == 1 and self._is_in_inference_mode():
+                # Run the wrapped module functionally on cached quantized parameters. This avoids copying and
+                # restoring every parameter on every forward pass
+                quantized_params = self._get_cached_quantized_params()
+                with record_event(self._profiler, self._profiling_name, 'wrapped_forward') as wrapped_forward_event:
+                    wrapped_output = functional_forward(self._module_to_wrap, quantized_inputs[0], quantized_params)
+                    if self._profiler:
+                        wrapped_forward_event.add_bytes([quantized_inputs, list(quantized_params.values()),
+                                                         wrapped_output])
+            else:
+                # Quantize the parameters
+                shadow_params = self._quantize_dequantize_params()
 
-        self._restore_shadow_params(shadow_params)
+                # Call the forward of the wrapped module
+                with record_event(self._profiler, self._profiling_name, 'wrapped_forward') as wrapped_forward_event:
+                    wrapped_output = self._module_to_wrap(*quantized_inputs)
+                    if self._profiler:
+                        wrapped_forward_event.add_bytes([quantized_inputs, list(self._module_to_wrap.parameters()),
+                                                         wrapped_output])
 
-        # Quantize the outputs
-        if not self._is_output_quantized:
-            output = wrapped_output
-        else:
-            if not isinstance(wrapped_output, list):
-                wrapped_output = [wrapped_output]
-            output = self._quantize_activation(self.output_quantizer, wrapped_output)
+                self._restore_shadow_params(shadow_params)
+
+            # Quantize the outputs
+            if not self._is_output_quantized:
+                output = wrapped_output
+            else:
+                if not isinstance(wrapped_output, list):
+                    wrapped_output = [wrapped_output]
+                output = self._quantize_activation(self.output_quantizer, wrapped_output)
+
+            forward_event.add_bytes(output)
 
         return output
 
+    def _is_in_inference_mode(self) -> bool:
+        """
+        Checks if quantized parameters can be cached. This is the case when neither the wrapper nor the wrapped module
+        are training, and no gradients need to flow back into the parameters
+        :return: True if in inference mode, False otherwise
+        """
+        if self.training or self._module_to_wrap.training or is_tracing():
+            return False
+
+        if not torch.is_grad_enabled():
+            return True
+
+        return not any(param.requires_grad for param in self._module_to_wrap.parameters())
+
+    def _get_cached_quantized_params(self) -> Dict[str, torch.Tensor]:
+        """
+        Returns quantized-dequantized parameters of the wrapped module for use in inference mode. The param quantizers
+        only recompute these if the parameter or its encoding has changed since the last call
+        :return: Dictionary of parameter name to quantized-dequantized tensor
+        """
+        quantized_params = {}
+
+        for name, param in self._module_to_wrap.named_parameters():
+            param_quantizer = self.param_quantizers[name]
+            param_quantizer.compute_param_encoding(param, recompute=False)
+            quantized_params[name] = param_quantizer.quantize_dequantize_param(param,
+                                                                               libpymo.RoundingMode.ROUND_NEAREST,
+                                                                               use_cache=True)
+
+        return quantized_params
+
     def _restore_shadow_params(self, shadow_params):
 
         # Restore the parameters
         for name, param in self._module_to_wrap.named_parameters():
-            param.data.zero_()
-            param.data.add_(shadow_params[name].data)
+            param.data = shadow_params[name]
 
     def _quantize_dequantize_params(self):
         """
@@ -320,17 +544,15 @@ class QcPostTrainingWrapper(QcQuantizeWrapper):
         # Quantize the parameters, if present
         for name, param in self._module_to_wrap.named_parameters():
 
-            # Store current weight for use later on
-            shadow_params[name] = param.detach().clone()
+            # Store reference to current weight for use later on. The quantized-dequantized values are swapped in as
+            # new data, so the original tensor stays untouched
+            shadow_params[name] = param.data
 
             param_quantizer = self.param_quantizers[name]
 
             # If we are in training mode with quant-sim nodes, then we want to calculate encodings for the parameters
             # in every pass
-            if self._module_to_wrap.training or param_quantizer.encoding is None:
-                param_quantizer.reset_encoding_stats()
-                param_quantizer.update_encoding_stats(param.data)
-                param_quantizer.compute_encoding()
+            param_quantizer.compute_param_encoding(param, recompute=self._module_to_wrap.training)
 
             # if we are not in training, then only nearest rounding should be used
             # else we should use whatever the user desires (i.e.. stochastic rounding is a valid option)
@@ -338,14 +560,16 @@ class QcPostTrainingWrapper(QcQuantizeWrapper):
                 round_mode = param_quantizer.round_mode
             else:
                 round_mode = libpymo.RoundingMode.ROUND_NEAREST
-            param.data = param_quantizer.quantize_dequantize(param.data, round_mode)
+            # Parameters do not change between passes unless we are training, so reuse their quantized values otherwise
+            use_cache = not self._module_to_wrap.training and not is_tracing()
+            param.data = param_quantizer.quantize_dequantize_param(param, round_mode, use_cache)
 
         return shadow_params
 
     def compute_weight_encodings(self):
         """
         Compute quantized model weight encoding.
-        :return: weight_encoding value (libpymo.TfEncoding type)
+        :return: weight_encoding value (libpymo.TfEncoding type, or a list of them with per-channel quantization)
         """
 
         if 'weight' in self.param_quantizers:
@@ -375,7 +599,10 @@ class QcPostTrainingWrapper(QcQuantizeWrapper):
 
             if self._mode is QcQuantizeOpMode.ANALYSIS:
 
-                tensor_quantizer.update_encoding_stats(input_tensor)
+                if self._stats_collector:
+                    self._stats_collector.update_encoding_stats(tensor_quantizer, input_tensor)
+                else:
+                    tensor_quantizer.update_encoding_stats(input_tensor)
                 output = input_tensor
 
             elif self._mode is QcQuantizeOpMode.ACTIVE:
@@ -410,7 +637,9 @@ class QcQuantizeStandalone(QcQuantizeStandAloneBase):
         :return: Quantized output from the wrapped module
         """
 
-        output = self._quantize_activation(self.output_quantizer, list(inputs))
+        with record_event(self._profiler, self._profiling_name, 'forward', inputs) as forward_event:
+            output = self._quantize_activation(self.output_quantizer, list(inputs))
+            forward_event.add_bytes(output)
 
         return output
 
@@ -41,23 +41,31 @@ import os
 import io
 import copy
 import pickle
+import queue
 from typing import Tuple, List, Union, Dict
 import json
 import torch
+import torch.multiprocessing
 
 from aimet_common.utils import AimetLogger
 from aimet_common.defs import QuantScheme
 from aimet_torch.quantsim_config.quantsim_config import QuantSimConfigurator
 from aimet_torch.qc_quantize_op import QcQuantizeStandAloneBase, QcQuantizeWrapper, QcQuantizeOpMode, \
     QcPostTrainingWrapper
-from aimet_torch.tensor_quantizer import TensorQuantizer
+from aimet_torch.tensor_quantizer import TensorQuantizer, AsyncEncodingStatsCollector
+from aimet_torch.quantsim_profiler import QuantSimProfiler
 from aimet_torch.batch_norm_fold import PassThroughOp
 from aimet_torch import utils
 from aimet_torch import onnx_utils
 from aimet_torch.meta.connectedgraph import ConnectedGraph
 
+import libpymo
+
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.Quant)
 
+# Interval at which the liveness of calibration worker processes is checked while waiting on them
+WORKER_POLL_INTERVAL_SECS = 1.0
+
 
 class QuantParams:
     """
@@ -84,7 +92,8 @@ class QuantizationSimModel:
     # pylint: disable=too-many-arguments
     def __init__(self, model: torch.nn.Module, quant_scheme: Union[str, QuantScheme] = QuantScheme.post_training_tf_enhanced,
                  rounding_mode: str = 'nearest', default_output_bw: int = 8, default_param_bw: int = 8,
-                 in_place: bool = False, config_file=None, input_shapes=None):
+                 in_place: bool = False, config_file=None, input_shapes=None,
+                 per_channel_quantization: bool = False):
         """
         Constructor
 
@@ -98,6 +107,8 @@ class QuantizationSimModel:
                 Only suggested use of this option is when the user wants to avoid creating a copy of the model
         :param config_file: Configuration file for model quantizers
         :param input_shapes: List of input shapes to the model
+        :param per_channel_quantization: If True, weights of conv and linear layers are quantized with a separate
+                encoding per output channel
 
         """
 
@@ -131,6 +142,8 @@ class QuantizationSimModel:
         self._rounding_mode = rounding_mode
         self._default_output_bw = default_output_bw
         self._default_param_bw = default_param_bw
+        self._per_channel_quantization = per_channel_quantization
+        self._is_calibrating = False
 
         # Add quantization layers
         self._add_quantization_wrappers(self.model)
@@ -184,7 +197,7 @@ class QuantizationSimModel:
 
         return stream.getvalue()
 
-    def compute_encodings(self, forward_pass_callback, forward_pass_callback_args):
+    def compute_encodings(self, forward_pass_callback, forward_pass_callback_args, num_stats_threads: int = 0):
         """
         Computes encodings for all quantization sim nodes in the model. It is also used to find initial encodings for
         Range Learning
@@ -197,6 +210,9 @@ class QuantizationSimModel:
             the user to determine the type of this parameter. E.g. could be simply an integer representing the number
             of data samples to use. Or could be a tuple of parameters or an object representing something more complex.
             If set to None, forward_pass_callback will be invoked with no parameters.
+        :param num_stats_threads: If greater than 0, activation stats collected during each forward pass are handed
+            off to this many background threads, instead of being updated one tensor at a time in the forward pass.
+            This requires extra memory to buffer the activations of up to two forward passes.
         :return: None
 
         """
@@ -208,9 +224,171 @@ class QuantizationSimModel:
 
         # Run forward iterations so we can collect statistics to compute the appropriate encodings
         self.model.eval()
+        if num_stats_threads > 0:
+            self._run_forward_pass_with_stats_collector(forward_pass_callback, forward_pass_callback_args,
+                                                        quantized_layers, num_stats_threads)
+        else:
+            with torch.no_grad():
+                _ = forward_pass_callback(self.model, forward_pass_callback_args)
+
+        self._compute_and_activate_encodings(quantized_layers)
+
+    def begin_calibration(self, calibration_stats: Dict = None):
+        """
+        Starts incremental calibration of the model. Feed batches of representative data with feed(), and call
+        finalize_calibration() to compute the encodings from the collected statistics.
+
+        The statistics collected so far can be retrieved at any point with get_calibration_stats(). This allows
+        calibrating across multiple processes (each feeding a shard of the data), or resuming an interrupted calibration.
+
+        :param calibration_stats: Optional statistics returned by get_calibration_stats(), to resume calibration from.
+            If None, calibration starts from scratch
+        :return: None
+        """
+        quantized_layers = self._get_qc_quantized_layers(self.model)
+
+        for _, layer in quantized_layers:
+            layer.set_mode(QcQuantizeOpMode.ANALYSIS)
+            layer.input_quantizer.reset_encoding_stats()
+            layer.output_quantizer.reset_encoding_stats()
+
+        if calibration_stats:
+            self.merge_calibration_stats(calibration_stats)
+
+        self.model.eval()
+        self._is_calibrating = True
+
+    def feed(self, model_input: Union[torch.Tensor, Tuple]):
+        """
+        Runs a forward pass on a batch of data to update the calibration statistics. Must be called between
+        begin_calibration() and finalize_calibration()
+
+        :param model_input: Input to the model. If the model takes more than one input, pass these as a tuple
+        :return: None
+        """
+        if not self._is_calibrating:
+            raise RuntimeError('begin_calibration() needs to be called before feeding data')
+
+        if not isinstance(model_input, (tuple, list)):
+            model_input = (model_input,)
+
         with torch.no_grad():
-            _ = forward_pass_callback(self.model, forward_pass_callback_args)
+            _ = self.model(*model_input)
+
+    def get_calibration_stats(self) -> Dict:
+        """
+        Returns the calibration statistics collected so far. These are JSON-serializable, see also
+        save_calibration_stats() and load_calibration_stats()
+
+        :return: Dictionary of layer name to the statistics of its input and output quantizers
+        """
+        calibration_stats = {}
+
+        for name, layer in self._get_qc_quantized_layers(self.model):
+            calibration_stats[name] = {'input': layer.input_quantizer.get_stats(),
+                                       'output': layer.output_quantizer.get_stats()}
+
+        return calibration_stats
+
+    def merge_calibration_stats(self, calibration_stats: Dict):
+        """
+        Merges calibration statistics collected by another QuantizationSimModel of the same model into the statistics
+        collected so far
+
+        :param calibration_stats: Statistics returned by get_calibration_stats()
+        :return: None
+        """
+        for name, layer in self._get_qc_quantized_layers(self.model):
+            if name not in calibration_stats:
+                raise ValueError('No calibration stats found for layer: ' + name)
+
+            layer.input_quantizer.merge_stats(calibration_stats[name]['input'])
+            layer.output_quantizer.merge_stats(calibration_stats[name]['output'])
+
+    def finalize_calibration(self):
+        """
+        Computes encodings for all quantization sim nodes in the model from the calibration statistics collected since
+        begin_calibration()
+
+        :return: None
+        """
+        if not self._is_calibrating:
+            raise RuntimeError('begin_calibration() needs to be called before finalizing calibration')
+
+        self._compute_and_activate_encodings(self._get_qc_quantized_layers(self.model))
+        self._is_calibrating = False
+
+    def compute_encodings_distributed(self, data_loader, num_workers: int, num_batches: int = None):
+        """
+        Computes encodings for all quantization sim nodes in the model, running the forward passes in multiple worker
+        processes on the CPU. Each worker holds a copy of the model (with parameters in shared memory), collects
+        calibration statistics on the batches handed to it, and sends them back to be merged into the statistics of
+        this model.
+
+        Note that the parameters and buffers of the model are moved to shared memory, and stay there after this call.
+
+        :param data_loader: Data loader with representative data. The first element of each batch is used as the model
+            input, i.e. the data loader is expected to yield (inputs, labels)
+        :param num_workers: Number of worker processes. Each worker runs single-threaded, so this would typically be
+            set to the number of CPU cores
+        :param num_batches: Number of batches to use from the data loader. If None, all batches are used
+        :return: None
+        """
+        if utils.is_model_on_gpu(self.model):
+            raise ValueError('Distributed computation of encodings is only supported for models on the CPU')
+
+        if num_batches is not None:
+            data_loader = utils.IterFirstX(data_loader, num_batches)
+
+        # Workers are forked from this process, so they start out calibrating with a copy of this model
+        self.model.share_memory()
+        self.begin_calibration()
+
+        context = torch.multiprocessing.get_context('fork')
+        batch_queue = context.Queue(maxsize=2 * num_workers)
+        stats_queue = context.Queue()
+        workers = [context.Process(target=_run_calibration_worker, args=(self, batch_queue, stats_queue))
+                   for _ in range(num_workers)]
+        for worker in workers:
+            worker.start()
+
+        is_complete = False
+        try:
+            for batch in data_loader:
+                _put_to_workers(batch_queue, batch[0], workers)
+
+            # Signal end of data to the workers
+            for _ in workers:
+                _put_to_workers(batch_queue, None, workers)
+
+            # Collect statistics from all workers before joining them, so no worker blocks on a full queue
+            errors = []
+            for _ in workers:
+                worker_stats, error = _get_from_workers(stats_queue, workers)
+                if error:
+                    errors.append(error)
+                else:
+                    self.merge_calibration_stats(worker_stats)
+            is_complete = True
 
+        finally:
+            for worker in workers:
+                # Do not leave workers waiting for batches that will never come
+                if not is_complete:
+                    worker.terminate()
+                worker.join()
+
+        if errors:
+            raise RuntimeError('Calibration failed in worker process: ' + errors[0])
+
+        self.finalize_calibration()
+
+    def _compute_and_activate_encodings(self, quantized_layers):
+        """
+        Computes encodings from the collected statistics, and sets the quantization wrappers to the appropriate mode
+        :param quantized_layers: List of (name, layer) tuples of quantization wrappers in the model
+        :return: None
+        """
         # Get the computed per-layer encodings and log them
         for name, layer in quantized_layers:
             layer.compute_encoding()
@@ -233,6 +411,59 @@ class QuantizationSimModel:
 
         self._replace_wrappers_for_quantize_dequantize()
 
+    def _run_forward_pass_with_stats_collector(self, forward_pass_callback, forward_pass_callback_args,
+                                               quantized_layers, num_stats_threads: int):
+        """
+        Runs the forward pass callback, with activation stats updated by a pool of background threads
+        :param forward_pass_callback: Callback that runs forward passes on the model
+        :param forward_pass_callback_args: Arguments passed to the forward_pass_callback as-is
+        :param quantized_layers: List of (name, layer) tuples of quantization wrappers in the model
+        :param num_stats_threads: Number of background threads to use
+        :return: None
+        """
+        stats_collector = AsyncEncodingStatsCollector(num_stats_threads)
+        for _, layer in quantized_layers:
+            layer.set_stats_collector(stats_collector)
+
+        # Hand off buffered activations at the end of every forward pass through the model
+        hook_handle = self.model.register_forward_hook(lambda *_: stats_collector.flush())
+
+        try:
+            with torch.no_grad():
+                _ = forward_pass_callback(self.model, forward_pass_callback_args)
+            stats_collector.wait()
+
+        finally:
+            hook_handle.remove()
+            for _, layer in quantized_layers:
+                layer.set_stats_collector(None)
+            stats_collector.shutdown()
+
+    def enable_profiling(self, synchronize_cuda: bool = True) -> QuantSimProfiler:
+        """
+        Starts recording wall time, bytes moved and call counts of every quantization op in the model, and of their
+        tensor quantizers. Quantization ops record nothing unless profiling is enabled
+
+        :param synchronize_cuda: If True, CUDA kernels are waited for at the start and end of every recorded event, so
+                their time is attributed to the op that launched them
+        :return: Profiler the ops record to. Use its get_table() or export_chrome_trace() to inspect the results
+        """
+        profiler = QuantSimProfiler(synchronize_cuda)
+        self._set_profiler(profiler)
+        return profiler
+
+    def disable_profiling(self):
+        """
+        Stops recording to the profiler returned by enable_profiling()
+        :return: None
+        """
+        self._set_profiler(None)
+
+    def _set_profiler(self, profiler: Union[QuantSimProfiler, None]):
+        for name, module in self.model.named_modules():
+            if isinstance(module, (QcQuantizeWrapper, QcQuantizeStandAloneBase)):
+                module.set_profiler(profiler, name)
+
     def export(self, path: str, filename_prefix: str, input_shape: Union[Tuple, List[Tuple]],
                set_onnx_layer_names: bool = True):
         """
@@ -428,15 +659,22 @@ class QuantizationSimModel:
         activation_encodings[layer_name] = tensor_dict
 
     @staticmethod
-    def _create_encoding_dict_for_quantizer(quantizer: TensorQuantizer) -> Dict:
+    def _create_encoding_dict_for_quantizer(quantizer: TensorQuantizer) -> Union[Dict, List[Dict]]:
+        if isinstance(quantizer.encoding, list):
+            # Per-channel encodings are exported as a list, in channel order
+            return [QuantizationSimModel._create_encoding_dict(encoding) for encoding in quantizer.encoding]
         if quantizer.encoding:
-            return {'min': quantizer.encoding.min,
-                    'max': quantizer.encoding.max,
-                    'scale': quantizer.encoding.delta,
-                    'offset': quantizer.encoding.offset,
-                    'bitwidth': quantizer.encoding.bw}
+            return QuantizationSimModel._create_encoding_dict(quantizer.encoding)
         return None
 
+    @staticmethod
+    def _create_encoding_dict(encoding: libpymo.TfEncoding) -> Dict:
+        return {'min': encoding.min,
+                'max': encoding.max,
+                'scale': encoding.delta,
+                'offset': encoding.offset,
+                'bitwidth': encoding.bw}
+
     @staticmethod
     def _get_qc_quantized_layers(model):
         quantized_layers = []
@@ -475,7 +713,8 @@ class QuantizationSimModel:
                                       QuantScheme.post_training_tf, QuantScheme.post_training_tf_enhanced]
 
         quantized_module = QcPostTrainingWrapper(module_to_wrap, self._default_param_bw, self._default_output_bw,
-                                                 self._rounding_mode, self._quant_scheme)
+                                                 self._rounding_mode, self._quant_scheme,
+                                                 per_channel_quantization=self._per_channel_quantization)
 
         return quantized_module
 
@@ -533,6 +772,83 @@ class QuantizationSimModel:
                 cls._remove_quantization_wrappers(module_ref, list_of_modules_to_exclude)
 
 
+def _run_calibration_worker(quant_sim_model: QuantizationSimModel, batch_queue, stats_queue):
+    """
+    Entry point of worker processes for QuantizationSimModel.compute_encodings_distributed(). Feeds batches from the
+    batch queue to the model until a None batch is received, and then sends back the collected statistics
+    :param quant_sim_model: QuantizationSimModel to calibrate
+    :param batch_queue: Queue of model inputs
+    :param stats_queue: Queue to send back a tuple of (calibration statistics, error message) to
+    :return: None
+    """
+    # Workers run in parallel, so avoid oversubscribing the cores with intra-op threads
+    torch.set_num_threads(1)
+
+    error = None
+    batch = batch_queue.get()
+    while batch is not None:
+        # Keep draining the queue after an error, so the process feeding batches does not block
+        if not error:
+            try:
+                quant_sim_model.feed(batch)
+            except Exception as e:  # pylint: disable=broad-except
+                error = repr(e)
+
+        batch = batch_queue.get()
+
+    if error:
+        stats_queue.put((None, error))
+    else:
+        stats_queue.put((quant_sim_model.get_calibration_stats(), None))
+
+
+def _check_workers_alive(workers: List, check_running: bool = True):
+    """
+    Raises an error if any of the worker processes died, or if none of them is running anymore
+    :param workers: Worker processes
+    :param check_running: If False, only workers that died are reported
+    :return: None
+    """
+    for worker in workers:
+        if worker.exitcode is not None and worker.exitcode != 0:
+            raise RuntimeError('Calibration worker process exited unexpectedly with exit code %d' % worker.exitcode)
+
+    if check_running and not any(worker.is_alive() for worker in workers):
+        raise RuntimeError('All calibration worker processes exited before completing calibration')
+
+
+def _put_to_workers(worker_queue, item, workers: List):
+    """
+    Puts an item to a queue read by worker processes, raising an error instead of blocking forever if they died
+    :param worker_queue: Queue read by the workers
+    :param item: Item to put
+    :param workers: Worker processes
+    :return: None
+    """
+    while True:
+        try:
+            worker_queue.put(item, timeout=WORKER_POLL_INTERVAL_SECS)
+            return
+        except queue.Full:
+            _check_workers_alive(workers)
+
+
+def _get_from_workers(worker_queue, workers: List):
+    """
+    Gets an item from a queue written by worker processes, raising an error instead of blocking forever if they died
+    :param worker_queue: Queue written by the workers
+    :param workers: Worker processes
+    :return: Item from the queue
+    """
+    while True:
+        # Liveness is checked before waiting, so items sent by workers that exited in the meantime are still read
+        workers_done = not any(worker.is_alive() for worker in workers)
+        try:
+            return worker_queue.get(timeout=WORKER_POLL_INTERVAL_SECS)
+        except queue.Empty:
+            _check_workers_alive(workers, check_running=workers_done)
+
+
 def save_checkpoint(quant_sim_model: QuantizationSimModel, file_path: str):
     """
     This API provides a way for the user to save a checkpoint of the quantized model which can
@@ -547,6 +863,30 @@ def save_checkpoint(quant_sim_model: QuantizationSimModel, file_path: str):
         pickle.dump(quant_sim_model, file)
 
 
+def save_calibration_stats(calibration_stats: Dict, file_path: str):
+    """
+    Saves calibration statistics returned by QuantizationSimModel.get_calibration_stats() to a JSON file
+
+    :param calibration_stats: Calibration statistics to save
+    :param file_path: Path to the file to save the statistics to
+    :return: None
+    """
+    with open(file_path, 'w') as stats_fp:
+        json.dump(calibration_stats, stats_fp)
+
+
+def load_calibration_stats(file_path: str) -> Dict:
+    """
+    Loads calibration statistics saved with save_calibration_stats()
+
+    :param file_path: Path to the file to load the statistics from
+    :return: Calibration statistics, which can be passed to QuantizationSimModel.begin_calibration() or
+        QuantizationSimModel.merge_calibration_stats()
+    """
+    with open(file_path, 'r') as stats_fp:
+        return json.load(stats_fp)
+
+
 def load_checkpoint(file_path: str) -> QuantizationSimModel:
     """
     Load the quantized model
@@ -0,0 +1,266 @@
+# /usr/bin/env python3.5
+# -*- mode: python -*-
+# =============================================================================
+#  @@-COPYRIGHT-START-@@
+#
+#  Copyright (c) 2020, Qualcomm Innovation Center, Inc. All rights reserved.
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+#
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#  3. Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#
+#  @@-COPYRIGHT-END-@@
+# =============================================================================
+""" Profiling of quantization simulation wrappers and tensor quantizers """
+
+import functools
+import io
+import json
+import threading
+import time
+from typing import Dict, List, Tuple, Union
+
+import torch
+
+
+def get_num_bytes(tensors: Union[torch.Tensor, List, Tuple]) -> int:
+    """
+    Returns the number of bytes held by a tensor, or by all tensors in a (nested) list or tuple
+    :param tensors: Tensor, or list or tuple of tensors
+    :return: Number of bytes
+    """
+    if isinstance(tensors, torch.Tensor):
+        return tensors.numel() * tensors.element_size()
+    if isinstance(tensors, (list, tuple)):
+        return sum(get_num_bytes(tensor) for tensor in tensors)
+    return 0
+
+
+class ProfilerEvent:
+    """
+    A timed section of code, recorded by QuantSimProfiler when the section completes. Used as a context manager
+    """
+
+    def __init__(self, profiler: 'QuantSimProfiler', name: str, category: str, num_bytes: int):
+        """
+        Constructor
+        :param profiler: Profiler to record the event to
+        :param name: Name of the profiled object, e.g. the name of a wrapper or a tensor quantizer
+        :param category: Kind of work being done, e.g. 'forward' or 'quantize_dequantize'
+        :param num_bytes: Number of bytes moved so far. More can be added while the section runs
+        """
+        self._profiler = profiler
+        self.name = name
+        self.category = category
+        self.num_bytes = num_bytes
+        self.start = None
+
+    def add_bytes(self, tensors):
+        """
+        Adds the bytes held by tensors to the bytes moved by this event
+        :param tensors: Tensor, or list or tuple of tensors
+        :return: None
+        """
+        self.num_bytes += get_num_bytes(tensors)
+
+    def __enter__(self):
+        self.start = self._profiler.get_time()
+        return self
+
+    def __exit__(self, *_):
+        self._profiler.add_event(self, self._profiler.get_time())
+
+
+class NullProfilerEvent:
+    """
+    Stands in for a ProfilerEvent when profiling is disabled, doing nothing
+    """
+
+    def add_bytes(self, tensors):
+        """ Does nothing """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+_NULL_PROFILER_EVENT = NullProfilerEvent()
+
+
+def record_event(profiler: Union['QuantSimProfiler', None], name: str, category: str, tensors=None):
+    """
+    Returns a context manager that records the time spent in it to a profiler. If no profiler is given, the context
+    manager does nothing
+    :param profiler: Profiler to record to, or None
+    :param name: Name of the profiled object, e.g. the name of a wrapper or a tensor quantizer
+    :param category: Kind of work being done, e.g. 'forward' or 'quantize_dequantize'
+    :param tensors: Tensors moved by the event, if already known
+    :return: Event to use as a context manager
+    """
+    if profiler is None:
+        return _NULL_PROFILER_EVENT
+    return profiler.record(name, category, tensors)
+
+
+class QuantSimProfiler:
+    """
+    Records wall time, bytes moved and call counts of quantization simulation wrappers and tensor quantizers. Wrappers
+    and tensor quantizers only report to the profiler once it has been set on them, see
+    QuantizationSimModel.enable_profiling()
+    """
+
+    def __init__(self, synchronize_cuda: bool = True):
+        """
+        Constructor
+        :param synchronize_cuda: If True, wait for queued CUDA kernels to complete at the start and end of every event,
+            so kernel time is attributed to the event that launched it
+        """
+        self._synchronize_cuda = synchronize_cuda and torch.cuda.is_available()
+        self._lock = threading.Lock()
+        self._start_time = time.perf_counter()
+        self._events = []
+        self._summary = {}
+
+    def record(self, name: str, category: str, tensors=None) -> ProfilerEvent:
+        """
+        Returns a context manager that records the time spent in it as an event
+        :param name: Name of the profiled object, e.g. the name of a wrapper or a tensor quantizer
+        :param category: Kind of work being done, e.g. 'forward' or 'quantize_dequantize'
+        :param tensors: Tensors moved by the event, if already known
+        :return: Event to use as a context manager
+        """
+        return ProfilerEvent(self, name, category, get_num_bytes(tensors))
+
+    def get_time(self) -> float:
+        """
+        Returns the time since the profiler was created
+        :return: Time in seconds
+        """
+        if self._synchronize_cuda:
+            torch.cuda.synchronize()
+        return time.perf_counter() - self._start_time
+
+    def add_event(self, event: ProfilerEvent, end: float):
+        """
+        Records a completed event
+        :param event: Event to record
+        :param end: Time the event completed at, as returned by get_time()
+        :return: None
+        """
+        duration = end - event.start
+        with self._lock:
+            self._events.append((event.name, event.category, event.start, duration, event.num_bytes,
+                                 threading.get_ident()))
+
+            summary = self._summary.setdefault((event.name, event.category), [0, 0.0, 0])
+            summary[0] += 1
+            summary[1] += duration
+            summary[2] += event.num_bytes
+
+    def reset(self):
+        """
+        Drops all recorded events
+        :return: None
+        """
+        with self._lock:
+            self._events = []
+            self._summary = {}
+
+    def get_summary(self) -> Dict[Tuple[str, str], Dict]:
+        """
+        Returns the recorded events, aggregated per profiled object and category
+        :return: Dictionary of (name, category) to the number of calls, total time in seconds and total bytes moved
+        """
+        with self._lock:
+            return {key: {'calls': calls, 'total_time': total_time, 'bytes': num_bytes}
+                    for key, (calls, total_time, num_bytes) in self._summary.items()}
+
+    def get_table(self, sort_by: str = 'total_time', limit: int = None) -> str:
+        """
+        Returns the aggregated events as a table
+        :param sort_by: Column to sort by, in descending order. One of 'total_time', 'calls' or 'bytes'
+        :param limit: If given, only the top rows are included
+        :return: Table as a string
+        """
+        if sort_by not in ('total_time', 'calls', 'bytes'):
+            raise ValueError('Cannot sort by {}. Valid options are total_time, calls or bytes'.format(sort_by))
+
+        rows = sorted(self.get_summary().items(), key=lambda item: item[1][sort_by], reverse=True)
+        if limit is not None:
+            rows = rows[:limit]
+
+        name_width = max([len('Name')] + [len(name) for (name, _), _ in rows])
+        stream = io.StringIO(newline='\n')
+        stream.write('{:<{}}  {:<20}  {:>8}  {:>12}  {:>12}  {:>12}\n'.format('Name', name_width, 'Category', 'Calls',
+                                                                            'Total (ms)', 'Mean (ms)', 'MB moved'))
+        for (name, category), summary in rows:
+            stream.write('{:<{}}  {:<20}  {:>8}  {:>12.3f}  {:>12.3f}  {:>12.3f}\n'.format(
+                name, name_width, category, summary['calls'], 1000 * summary['total_time'],
+                1000 * summary['total_time'] / summary['calls'], summary['bytes'] / 2 ** 20))
+
+        return stream.getvalue()
+
+    def export_chrome_trace(self, file_path: str):
+        """
+        Saves the recorded events in the Chrome trace event format, which can be viewed in chrome://tracing
+        :param file_path: Path to the JSON file to save the trace to
+        :return: None
+        """
+        with self._lock:
+            events = list(self._events)
+
+        trace_events = [{'name': name, 'cat': category, 'ph': 'X', 'ts': 1e6 * start, 'dur': 1e6 * duration,
+                         'pid': 0, 'tid': thread_id, 'args': {'bytes': num_bytes}}
+                        for name, category, start, duration, num_bytes, thread_id in events]
+
+        with open(file_path, 'w') as trace_fp:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, trace_fp)
+
+
+def profiled(category: str):
+    """
+    Decorator for tensor quantizer methods taking a tensor as their first argument. Records calls as events of the
+    given category, if a profiler has been set on the tensor quantizer
+    :param category: Kind of work done by the method, e.g. 'update_stats'
+    :return: Decorator
+    """
+    def decorator(method):
+
+        @functools.wraps(method)
+        def profiled_method(self, tensor, *args, **kwargs):
+            # pylint: disable=protected-access
+            if self._profiler is None:
+                return method(self, tensor, *args, **kwargs)
+
+            with self._profiler.record(self._profiling_name, category, tensor):
+                return method(self, tensor, *args, **kwargs)
+
+        return profiled_method
+
+    return decorator
@@ -37,7 +37,7 @@
 # =============================================================================
 
 """Gives best rank for compression"""
-from aimet_common.utils import AimetLogger
+from aimet_common.utils import AimetLogger, ordered_parallel_map
 from aimet_common import statistics_util as stats_u, cost_calculator as cc
 from aimet_torch.svd import model_stats_calculator as MS
 from aimet_torch.svd import svd_pruner_deprecated
@@ -56,8 +56,38 @@ class RankSelector:
     def _select_candidate_ranks(self, num_rank_indices):
         return self._svd_lib_ref.SetCandidateRanks(num_rank_indices)
 
+    def _compress_and_evaluate(self, svd_rank_pair_dict, model, run_model, run_model_iterations, use_cuda, metric,
+                               network_cost, database):
+        """
+        Creates the compressed model for a rank index and evaluates it
+        :param svd_rank_pair_dict: Rank pair of each selected layer for the rank index
+        :param model: Original model
+        :param run_model: Method to run evaluation on model
+        :param run_model_iterations: Number of iterations for run_model
+        :param use_cuda: Model is on GPU or not
+        :param metric: cost metric
+        :param network_cost: Cost of the original model
+        :param database: reference to Layer Attribute Database
+        :return: Compression score, model performance and per layer statistics list
+        """
+        # pylint: disable=too-many-arguments
+
+        # Compress the model given a rank index
+        compressed_model, compressed_layers, layer_stats_list = svd_pruner_deprecated.ModelPruner().create_compressed_model(
+            svd_rank_pair_dict=svd_rank_pair_dict, model=model,
+            compressible_layers=database.get_compressible_layers(), svd_lib_ref=self._svd_lib_ref, metric=metric)
+        ms = MS.ModelStats
+
+        # Estimate relative compression score for this rank_index
+        compression_score = ms.compute_compression_ratio(compressed_layers, metric, network_cost)
+
+        # Get accuracy for the compressed model
+        model_perf = run_model(compressed_model, run_model_iterations, use_cuda)
+
+        return compression_score, model_perf, layer_stats_list
+
     def choose_best_rank(self, model, run_model, run_model_iterations, use_cuda, metric, error_margin, baseline_perf,
-                         num_rank_indices, database):
+                         num_rank_indices, database, num_workers=1):
         """
         :param model: Original model
         :param run_model: Method to run evaluation on model
@@ -68,6 +98,8 @@ class RankSelector:
         :param baseline_perf: original model's accuracy
         :param num_rank_indices: number of rank indices
         :param database: reference to Layer Attribute Database
+        :param num_workers: number of worker threads used to evaluate rank indices concurrently. Rank indices not
+                            started yet are skipped once model performance falls out of the error margin
         :return:
         """
         # pylint: disable=too-many-arguments, too-many-locals
@@ -82,6 +114,10 @@ class RankSelector:
         # List to hold the SVD Statistics for all the Rank indices
         rank_stats_list = list()
 
+        # Get the candidate ranks for all rank indices upfront, so that the workers share the SVD factorizations
+        # already computed by the library. The workers still call into the library to split layers, those calls are
+        # serialized by WeightSvdModuleSplitter
+        svd_rank_pair_dicts = []
         for rank_index in range(num_rank_indices):
             svd_rank_pair_dict = {}
             for layer in database.get_selected_layers():
@@ -89,18 +125,17 @@ class RankSelector:
                 # Get the candidate ranks for given rank index
                 svd_ranks = self._svd_lib_ref.GetCandidateRanks(str(layer.name), rank_index)
                 svd_rank_pair_dict[layer.name] = (svd_ranks[0], 0)
-            # Compress the model given a rank index
-            compressed_model, compressed_layers, layer_stats_list = svd_pruner_deprecated.ModelPruner().create_compressed_model(
-                svd_rank_pair_dict=svd_rank_pair_dict, model=model,
-                compressible_layers=database.get_compressible_layers(), svd_lib_ref=self._svd_lib_ref, metric=metric)
-            ms = MS.ModelStats
+            svd_rank_pair_dicts.append(svd_rank_pair_dict)
 
-            # Estimate relative compression score for this rank_index
-            compression_score = ms.compute_compression_ratio(compressed_layers, metric, network_cost)
-            logger.debug('Rank Index: %i, Compression Score: %f', rank_index, compression_score)
+        results = ordered_parallel_map(
+            lambda rank_pair_dict: self._compress_and_evaluate(rank_pair_dict, model, run_model, run_model_iterations,
+                                                               use_cuda, metric, network_cost, database),
+            svd_rank_pair_dicts, num_workers)
 
-            # Get accuracy for the compressed model
-            model_perf = run_model(compressed_model, run_model_iterations, use_cuda)
+        for rank_index, (compression_score, model_perf, layer_stats_list) in enumerate(results):
+            svd_rank_pair_dict = svd_rank_pair_dicts[rank_index]
+            ms = MS.ModelStats
+            logger.debug('Rank Index: %i, Compression Score: %f', rank_index, compression_score)
 
             model_accuracy = model_perf
             model_compression_ratio = compression_score
@@ -135,6 +170,9 @@ class RankSelector:
                                                            layer_stats_list=layer_stats_list)
             rank_stats_list.append(rank_data)
 
+        # Cancel the rank indices that have not started yet, if rank selection ended early
+        results.close()
+
         if not best_index:
             raise RuntimeError('No suitable ranks found to compress model within defined error bounds.')
 
@@ -99,7 +99,7 @@ class Svd:
         if rank_selection_scheme == RankSelectionScheme.manual:
             Svd._check_params_and_throw(kwargs,
                                         ['layer_rank_list'],
-                                        ['error_margin', 'num_rank_indices'])
+                                        ['error_margin', 'num_rank_indices', 'num_workers'])
 
         if rank_selection_scheme == RankSelectionScheme.auto:
             Svd._check_params_and_throw(kwargs,
@@ -130,6 +130,7 @@ class Svd:
          - If the layer_selection_scheme is top_x_percent then the user has to specify percentage threshold by using percent_thresh= <number>
          - If the mode is manual then user has to specify the layers and the respective ranks by specifying a list as layer_rank = [[layer, rank]]
          - If the mode is auto then user has to specify maximum rank till the optimum rank search has to happen as max_ranks_error_margin= [maximum rank, error margin]
+         - If the mode is auto then user can optionally specify the number of worker threads evaluating rank indices concurrently as num_workers= <number> (default 1)
 
         """
         Svd._validate_layer_rank_params(model, layer_selection_scheme, rank_selection_scheme, **kw_layer_rank_params)
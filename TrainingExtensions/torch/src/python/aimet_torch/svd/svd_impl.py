@@ -194,12 +194,13 @@ class SvdImpl:
         if rank_selection_scheme is RankSelectionScheme.auto:
             num_rank_indices = kw_args['num_rank_indices']
             error_margin = kw_args['error_margin']
+            num_workers = kw_args.get('num_workers', 1)
             best_index, svd_rank_pair_dict_best_index, rank_stats_list = \
                 rank_selector.choose_best_rank(model=self._model, run_model=self._run_model,
                                                run_model_iterations=self._run_model_iterations, use_cuda=self._use_cuda,
                                                metric=self._metric, error_margin=error_margin,
                                                baseline_perf=baseline_accuracy, num_rank_indices=num_rank_indices,
-                                               database=self._layer_database)
+                                               database=self._layer_database, num_workers=num_workers)
             compressed_model, stats = self._final_compressed_network(best_index, svd_rank_pair_dict_best_index,
                                                                      rank_stats_list)
 
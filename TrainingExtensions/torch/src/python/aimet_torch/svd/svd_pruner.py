@@ -38,24 +38,68 @@
 
 """ Prunes layers using SpatialSvdModuleSplitter SVD scheme """
 
+import abc
+import contextlib
 import copy
+from decimal import Decimal
+from typing import Tuple
 
-import libpymo as pymo
+import torch
 
 from aimet_common.utils import AimetLogger
 from aimet_common.defs import CostMetric
 from aimet_common import cost_calculator
 import aimet_common.svd_pruner
+from aimet_common.svd_pruner import SvdFactorizationCache
 from aimet_common.pruner import Pruner
 
-from aimet_torch import pymo_utils
 from aimet_torch.svd.svd_splitter import SpatialSvdModuleSplitter, WeightSvdModuleSplitter
 from aimet_torch.layer_database import LayerDatabase, Layer
+from aimet_torch.utils import preserve_model_state
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.Svd)
 
 
-class SpatialSvdPruner(aimet_common.svd_pruner.SpatialSvdPruner):
+class SvdPruner(Pruner):
+    """
+    Base class for SVD pruners, which replace a layer with a sequential of two split layers
+    """
+
+    @abc.abstractmethod
+    def _split_layer(self, layer: Layer, comp_ratio: Decimal, cost_metric: CostMetric) -> Tuple[Layer, Layer]:
+        """
+        Splits given layer into two layers. The original layer is not modified
+        :param layer: Layer to split
+        :param comp_ratio: Compression-ratio
+        :param cost_metric: Cost metric
+        :return: Tuple of the two split layers
+        """
+
+    @contextlib.contextmanager
+    def patch_model(self, layer_db: LayerDatabase, layer: Layer, comp_ratio: Decimal, cost_metric: CostMetric):
+        """
+        Temporarily replaces given layer in the model of layer_db with its split version, without copying the model.
+        The original module is restored on exit, along with the mode, device, buffers and hooks of the model. The model
+        parameters must not be modified inside the context
+
+        :param layer_db: Layer database of the model to prune
+        :param layer: Layer to prune
+        :param comp_ratio: Compression-ratio
+        :param cost_metric: Cost metric
+        :return: Model with the pruned layer, only valid inside the context
+        """
+        if comp_ratio is None or comp_ratio >= 1.0:
+            yield layer_db.model
+            return
+
+        layer_a, layer_b = self._split_layer(layer, comp_ratio, cost_metric)
+
+        with preserve_model_state(layer_db.model):
+            with layer_db.temporarily_replace_module(layer, torch.nn.Sequential(layer_a.module, layer_b.module)):
+                yield layer_db.model
+
+
+class SpatialSvdPruner(aimet_common.svd_pruner.SpatialSvdPruner, SvdPruner):
     """
     Pruner for Spatial-SVD method
     """
@@ -68,8 +112,24 @@ class SpatialSvdPruner(aimet_common.svd_pruner.SpatialSvdPruner):
         :param comp_layer_db: Compressed layer db to update with the split layers
         :return: None
         """
+        layer_a, layer_b = self._split_layer_with_rank(layer, rank)
+        comp_layer_db.replace_layer_with_sequential_of_two_layers(layer, layer_a, layer_b)
+
+    def _split_layer(self, layer: Layer, comp_ratio: Decimal, cost_metric: CostMetric) -> Tuple[Layer, Layer]:
+        rank = cost_calculator.SpatialSvdCostCalculator.calculate_rank_given_comp_ratio(layer, comp_ratio, cost_metric)
+        logger.info("Spatial SVD splitting layer: %s using rank: %s", layer.name, rank)
+
+        return self._split_layer_with_rank(layer, rank)
+
+    def _split_layer_with_rank(self, layer: Layer, rank: int) -> Tuple[Layer, Layer]:
+        """
+        Performs spatial svd and splits given layer into two layers
+        :param layer: Layer to split
+        :param rank: Rank to use for spatial svd splitting
+        :return: Tuple of the two split layers
+        """
         # Split module using Spatial SVD
-        module_a, module_b = SpatialSvdModuleSplitter.split_module(layer.module, rank)
+        module_a, module_b = SpatialSvdModuleSplitter.split_module(layer.module, rank, self._svd_cache)
 
         first_layer_shape = copy.copy(layer.output_shape)
 
@@ -82,14 +142,19 @@ class SpatialSvdPruner(aimet_common.svd_pruner.SpatialSvdPruner):
         layer_a = Layer(module_a, layer.name + '.0', first_layer_shape)
         layer_b = Layer(module_b, layer.name + '.1', layer.output_shape)
 
-        comp_layer_db.replace_layer_with_sequential_of_two_layers(layer, layer_a, layer_b)
+        return layer_a, layer_b
 
 
-class WeightSvdPruner(Pruner):
+class WeightSvdPruner(SvdPruner):
     """
     Pruner for Weight-SVD method
     """
 
+    def __init__(self):
+        # Factorizations are shared by all the splits done by this pruner, e.g. for all comp-ratio candidates of a
+        # layer and for the final compressed model
+        self._svd_cache = SvdFactorizationCache()
+
     def _prune_layer(self, orig_layer_db: LayerDatabase, comp_layer_db: LayerDatabase, layer: Layer, comp_ratio: float,
                      cost_metric: CostMetric):
         """
@@ -113,17 +178,28 @@ class WeightSvdPruner(Pruner):
         comp_ratio = cost_calculator.WeightSvdCostCalculator.calculate_comp_ratio_given_rank(layer, rank,
                                                                                              cost_metric)
 
-        # Create a new instance of libpymo and register layers with it
-        svd_lib_ref = pymo.GetSVDInstance()
-        pymo_utils.PymoSvdUtils.configure_layers_in_pymo_svd([layer], cost_metric, svd_lib_ref)
+        layer_a, layer_b = self._split_layer_with_rank(layer, rank)
+        comp_layer_db.replace_layer_with_sequential_of_two_layers(layer, layer_a, layer_b)
+        return comp_ratio
 
+    def _split_layer(self, layer: Layer, comp_ratio: Decimal, cost_metric: CostMetric) -> Tuple[Layer, Layer]:
+        rank = cost_calculator.WeightSvdCostCalculator.calculate_rank_given_comp_ratio(layer, comp_ratio, cost_metric)
+        logger.info("Weight SVD splitting layer: %s using rank: %s", layer.name, rank)
+
+        return self._split_layer_with_rank(layer, rank)
+
+    def _split_layer_with_rank(self, layer: Layer, rank: int) -> Tuple[Layer, Layer]:
+        """
+        Performs weight svd and splits given layer into two layers
+        :param layer: Layer to split
+        :param rank: Rank to use for weight svd splitting
+        :return: Tuple of the two split layers
+        """
         # Split module using Weight SVD
         logger.info("Splitting module: %s with rank: %r", layer.name, rank)
-        module_a, module_b = WeightSvdModuleSplitter.split_module(layer.module, layer.name, rank,
-                                                                  svd_lib_ref)
+        module_a, module_b = WeightSvdModuleSplitter.split_module_using_svd_cache(layer.module, rank, self._svd_cache)
 
         layer_a = Layer(module_a, layer.name + '.0', layer.output_shape)
         layer_b = Layer(module_b, layer.name + '.1', layer.output_shape)
 
-        comp_layer_db.replace_layer_with_sequential_of_two_layers(layer, layer_a, layer_b)
-        return comp_ratio
+        return layer_a, layer_b
@@ -37,13 +37,15 @@
 # =============================================================================
 
 """ Implementation of layer splitting logic for spatial and weight svd schemes """
+import threading
+
 import numpy as np
 import torch
 from torch.nn import Conv2d, Linear
 
 from aimet_torch.winnow.winnow_utils import to_numpy
 from aimet_common.utils import AimetLogger
-from aimet_common.svd_pruner import SpatialSvdPruner
+from aimet_common.svd_pruner import SpatialSvdPruner, SvdFactorizationCache, lingalg_weight_svd
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.Svd)
 
@@ -52,10 +54,11 @@ class SpatialSvdModuleSplitter:
     """ Spatial SVD module splitter"""
 
     @staticmethod
-    def split_module(module: Conv2d, rank: int):
+    def split_module(module: Conv2d, rank: int, svd_cache: SvdFactorizationCache = None):
         """
         :param module: Module to be split
         :param rank: rank for splitting
+        :param svd_cache: Cache of SVD factorizations. If None, the SVD is computed for this split only
         :return: Two split modules
         """
         assert isinstance(module, Conv2d)
@@ -65,7 +68,7 @@ class SpatialSvdModuleSplitter:
         out_channels, in_channels, height, width = weight_tensor.shape
 
         h, v = SpatialSvdPruner.lingalg_spatial_svd(weight_tensor, rank, in_channels, out_channels,
-                                                    height, width)
+                                                    height, width, svd_cache)
 
         first_module = torch.nn.Conv2d(in_channels=module.in_channels,
                                        out_channels=rank, kernel_size=(height, 1),
@@ -79,7 +82,7 @@ class SpatialSvdModuleSplitter:
                                         padding=(0, module.padding[1]), dilation=1, bias=module.bias is not None)
         second_module.weight.data = torch.FloatTensor(h).to(device=module.weight.device)
         if module.bias is not None:
-            second_module.bias.data = module.bias.data
+            second_module.bias.data = module.bias.data.clone()
 
         return first_module, second_module
 
@@ -87,6 +90,10 @@ class SpatialSvdModuleSplitter:
 class WeightSvdModuleSplitter:
     """ Weight SVD module splitter """
 
+    # Serializes calls into the SVD library, which is not known to be thread-safe, when modules are split by
+    # concurrent workers
+    _svd_lib_lock = threading.Lock()
+
     @classmethod
     def split_module(cls, module, name, rank, svd_lib_ref):
         """
@@ -109,6 +116,51 @@ class WeightSvdModuleSplitter:
 
         return split_modules
 
+    @staticmethod
+    def split_module_using_svd_cache(module, rank: int, svd_cache: SvdFactorizationCache):
+        """
+        Split a given module using weight svd. The SVD factorization of the weight is looked up in (or added to) the
+        given cache, so splitting the same module with several ranks computes the SVD only once
+        :param module: Module to be split
+        :param rank: Rank to use to split with
+        :param svd_cache: Cache of SVD factorizations
+        :return: Two split modules
+        """
+        if isinstance(module, Conv2d):
+            weight_tensor = to_numpy(module.weight)
+            weight_a, weight_b = lingalg_weight_svd(weight_tensor, rank, svd_cache)
+
+            module_a = torch.nn.Conv2d(module.in_channels, rank, kernel_size=(1, 1),
+                                       stride=(1, 1), dilation=module.dilation)
+            module_b = torch.nn.Conv2d(rank, module.out_channels, kernel_size=module.kernel_size,
+                                       stride=module.stride, padding=module.padding, dilation=module.dilation)
+
+        elif isinstance(module, Linear):
+            # Linear weight is handled as a 1x1 convolution weight
+            weight_tensor = to_numpy(module.weight)[:, :, np.newaxis, np.newaxis]
+            weight_a, weight_b = lingalg_weight_svd(weight_tensor, rank, svd_cache)
+            weight_a, weight_b = weight_a[:, :, 0, 0], weight_b[:, :, 0, 0]
+
+            module_a = torch.nn.Linear(module.in_features, rank)
+            module_b = torch.nn.Linear(rank, module.out_features)
+
+        else:
+            raise AssertionError('Weight SVD only supports Conv2d and FC modules currently')
+
+        device = module.weight.device
+        module_a.weight = torch.nn.Parameter(torch.from_numpy(weight_a.astype(np.float32)).to(device=device))
+        module_b.weight = torch.nn.Parameter(torch.from_numpy(weight_b.astype(np.float32)).to(device=device))
+
+        # First module gets a zero bias, second module gets the original bias
+        if module.bias is not None:
+            module_a.bias = torch.nn.Parameter(torch.zeros(rank, device=device))
+            module_b.bias = torch.nn.Parameter(module.bias.detach().clone())
+        else:
+            module_a.bias = None
+            module_b.bias = None
+
+        return module_a, module_b
+
     @classmethod
     def split_conv_module(cls, module, name, rank, svd_lib_ref):
         """
@@ -134,8 +186,8 @@ class WeightSvdModuleSplitter:
         split_weights.append(conv_b_weight.flatten().tolist())
         weight_sizes.append(conv_b_weight.size)
 
-        split_weights = svd_lib_ref.SplitLayerWeights(str(name), split_weights, weight_sizes,
-                                                      [rank])
+        with WeightSvdModuleSplitter._svd_lib_lock:
+            split_weights = svd_lib_ref.SplitLayerWeights(str(name), split_weights, weight_sizes, [rank])
 
         logger.debug("Splitting conv module weight of shape %r into %r and %r",
                      module.weight.shape, conv_a_weight.shape, conv_b_weight.shape)
@@ -172,8 +224,8 @@ class WeightSvdModuleSplitter:
             split_biases.append(conv_b_bias.flatten().tolist())
             bias_sizes.append(conv_b_bias.size)
 
-            split_biases = svd_lib_ref.SplitLayerBiases(str(name), split_biases, bias_sizes,
-                                                        [rank])
+            with WeightSvdModuleSplitter._svd_lib_lock:
+                split_biases = svd_lib_ref.SplitLayerBiases(str(name), split_biases, bias_sizes, [rank])
 
             conv_a.bias = torch.nn.Parameter(torch.from_numpy(np.array(split_biases[0], dtype=np.float32)))
             conv_b.bias = torch.nn.Parameter(torch.from_numpy(np.array(split_biases[1], dtype=np.float32)))
@@ -211,8 +263,8 @@ class WeightSvdModuleSplitter:
         split_weights.append(fc_b_weight.flatten().tolist())
         weight_sizes.append(fc_b_weight.size)
 
-        split_weights = svd_lib_ref.SplitLayerWeights(str(name), split_weights, weight_sizes,
-                                                      [rank])
+        with WeightSvdModuleSplitter._svd_lib_lock:
+            split_weights = svd_lib_ref.SplitLayerWeights(str(name), split_weights, weight_sizes, [rank])
 
         # Todo: add sanity check for length of split_weights
         fc_a = torch.nn.Linear(module.in_features, rank)
@@ -244,8 +296,8 @@ class WeightSvdModuleSplitter:
             split_biases.append(fc_b_bias.flatten().tolist())
             bias_sizes.append(fc_b_bias.size)
 
-            split_biases = svd_lib_ref.SplitLayerBiases(str(name), split_biases, bias_sizes,
-                                                        [rank])
+            with WeightSvdModuleSplitter._svd_lib_lock:
+                split_biases = svd_lib_ref.SplitLayerBiases(str(name), split_biases, bias_sizes, [rank])
 
             fc_a.bias = torch.nn.Parameter(torch.from_numpy(np.array(split_biases[0], dtype=np.float32)))
             fc_b.bias = torch.nn.Parameter(torch.from_numpy(np.array(split_biases[1], dtype=np.float32)))
@@ -38,9 +38,13 @@
 """ Custom Tensor Quantizers for PyTorch Op for quantizing weights and activations """
 
 import io
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, List
+
+import torch
 
 from aimet_common.defs import QuantScheme
+from aimet_torch.quantsim_profiler import QuantSimProfiler, profiled
 import libpymo
 import AimetTensorQuantizer
 
@@ -68,6 +72,19 @@ class TensorQuantizer:
         self.bitwidth = bitwidth
         self.enabled = enabled_by_default
 
+        # If set, stats updates and quantize-dequantize calls are recorded to this profiler
+        self._profiler = None
+        self._profiling_name = None
+
+    def set_profiler(self, profiler: Union[QuantSimProfiler, None], name: str = None):
+        """
+        Sets a profiler to record stats updates and quantize-dequantize calls to
+        :param profiler: Profiler to use, or None to stop profiling
+        :param name: Name to record calls under
+        """
+        self._profiler = profiler
+        self._profiling_name = name
+
 
 class PickableState:
     """
@@ -84,6 +101,20 @@ class PickableState:
             self.bw = encoding.bw
 
 
+class QuantizeDequantizeStraightThrough(torch.autograd.Function):
+    """
+    Quantize-dequantizes a tensor in the forward pass, and passes gradients straight through in the backward pass
+    """
+
+    @staticmethod
+    def forward(ctx, tensor, tensor_quantizer, round_mode):  # pylint: disable=arguments-differ
+        return tensor_quantizer._quantize_dequantize(tensor, round_mode)  # pylint: disable=protected-access
+
+    @staticmethod
+    def backward(ctx, grad_output):  # pylint: disable=arguments-differ
+        return grad_output, None, None
+
+
 class PostTrainingTensorQuantizer(TensorQuantizer):
     """
     Simulates quantization for the given tensor post training.
@@ -104,6 +135,13 @@ class PostTrainingTensorQuantizer(TensorQuantizer):
         self._cppOp = AimetTensorQuantizer.AimetTensorQuantizer(quant_scheme)
         self.encoding = None
 
+        # Cached quantized-dequantized parameter, along with a key identifying the parameter contents and encoding it
+        # was computed from. The parameter data is kept referenced, so its memory cannot be reused by another tensor
+        # with the same key
+        self._quantized_param_key = None
+        self._quantized_param = None
+        self._quantized_param_source = None
+
     def __str__(self):
         stream = io.StringIO(newline='\n')
         stream.write('Post Training TensorQuantizer:\n')
@@ -130,11 +168,22 @@ class PostTrainingTensorQuantizer(TensorQuantizer):
         del state.dict['_cppOp']
         del state.dict['encoding']
 
+        # Cached parameter state is tied to tensors of this process, so do not save it
+        state.dict['_quantized_param_key'] = None
+        state.dict['_quantized_param'] = None
+        state.dict['_quantized_param_source'] = None
+        state.dict['_profiler'] = None
+
         return state
 
     def __setstate__(self, state):
-        # Restore instance attributes
+        # Restore instance attributes. Profilers and cached parameters are not saved, and may be missing from
+        # older checkpoints
         self.__dict__.update(state.dict)
+        self.set_profiler(None)
+        self._quantized_param_key = None
+        self._quantized_param = None
+        self._quantized_param_source = None
 
         # Create the c++ op
         self._cppOp = AimetTensorQuantizer.AimetTensorQuantizer(self.quant_scheme)
@@ -150,6 +199,7 @@ class PostTrainingTensorQuantizer(TensorQuantizer):
         else:
             self.encoding = None
 
+    @profiled('update_stats')
     def update_encoding_stats(self, tensor):
         """
         Update the stats for computing encoding
@@ -170,19 +220,36 @@ class PostTrainingTensorQuantizer(TensorQuantizer):
             if is_encoding_valid:
                 self.encoding = encoding
 
-    def quantize_dequantize(self, tensor, round_mode):
+    @profiled('quantize_dequantize')
+    def quantize_dequantize(self, tensor, round_mode, out=None):
         """
-        Quantize-dequantize the tensor, using the saved encoding for this tensor
+        Quantize-dequantize the tensor, using the saved encoding for this tensor. The input tensor is left untouched
         :param tensor: Tensor to quantize-dequantize
         :param round_mode: Rounding mode
+        :param out: Optional preallocated tensor to write the result to. Passing the input tensor itself
+            quantize-dequantizes it in place
+        :return: Resulting tensor. This is the input tensor as-is if quantization is disabled
+        """
+        if not self.enabled:
+            return tensor
+
+        if out is None and tensor.requires_grad and torch.is_grad_enabled():
+            return QuantizeDequantizeStraightThrough.apply(tensor, self, round_mode)
+
+        return self._quantize_dequantize(tensor, round_mode, out)
+
+    def _quantize_dequantize(self, tensor, round_mode, out=None):
+        """
+        Quantize-dequantize the tensor with the saved encoding, without tracking gradients
+        :param tensor: Tensor to quantize-dequantize
+        :param round_mode: Rounding mode
+        :param out: Optional preallocated tensor to write the result to
         :return: Resulting tensor
         """
-        if self.enabled:
-            quantized_tensor = self._cppOp.quantizeDequantize(tensor, self.encoding, round_mode, tensor.is_cuda)
-        else:
-            quantized_tensor = tensor
+        if out is not None:
+            return self._cppOp.quantizeDequantizeOut(tensor, out, self.encoding, round_mode, tensor.is_cuda)
 
-        return quantized_tensor
+        return self._cppOp.quantizeDequantize(tensor, self.encoding, round_mode, tensor.is_cuda)
 
     def reset_encoding_stats(self):
         """
@@ -190,3 +257,517 @@ class PostTrainingTensorQuantizer(TensorQuantizer):
         :return: None
         """
         self._cppOp.resetEncodingStats()
+
+    def get_stats(self) -> List[float]:
+        """
+        Returns the encoding stats collected so far. These can be saved, and later restored with set_stats() or merged
+        into the stats of another tensor quantizer with the same quant scheme using merge_stats()
+        :return: Encoding stats as a list of floats. Empty if no stats have been collected
+        """
+        return self._cppOp.getStats()
+
+    def set_stats(self, stats: List[float]):
+        """
+        Replaces the encoding stats with stats returned by get_stats()
+        :param stats: Encoding stats
+        :return: None
+        """
+        self._cppOp.setStats(stats)
+
+    def merge_stats(self, stats: List[float]):
+        """
+        Merges encoding stats returned by get_stats() of another tensor quantizer into the encoding stats
+        :param stats: Encoding stats
+        :return: None
+        """
+        self._cppOp.mergeStats(stats)
+
+    @staticmethod
+    def _get_tensor_key(tensor: torch.Tensor):
+        """
+        Returns a key identifying the current contents of a tensor. In-place updates to the tensor bump its version
+        counter, and assigning new data to the tensor changes its data pointer. In-place updates made through
+        tensor.data are not tracked
+        :param tensor: Tensor to get key for
+        :return: Tuple of tensor version and data pointer
+        """
+        return tensor._version, tensor.data_ptr()  # pylint: disable=protected-access
+
+    def _get_encoding_key(self):
+        """
+        Returns a key identifying the current encoding
+        :return: Tuple of encoding min, max and bitwidth, or None if there is no encoding
+        """
+        encoding = self.encoding
+        return (encoding.min, encoding.max, encoding.bw) if encoding else None
+
+    def compute_param_encoding(self, param: torch.Tensor, recompute: bool):
+        """
+        Computes the encoding for a parameter
+        :param param: Parameter to compute the encoding for
+        :param recompute: If True, the encoding is computed even if one is already present (e.g. when training)
+        :return: None
+        """
+        if recompute or self.encoding is None:
+            self.reset_encoding_stats()
+            self.update_encoding_stats(param.data)
+            self.compute_encoding()
+
+    def quantize_dequantize_param(self, param: torch.Tensor, round_mode, use_cache: bool) -> torch.Tensor:
+        """
+        Quantize-dequantize a parameter, using the saved encoding for this tensor. With nearest rounding the result
+        can be cached, and reused until the parameter or the encoding change.
+
+        Note that updates made through param.data (as done by the optimizers) are not tracked by the version counter
+        of the parameter, so the cache should not be used while training.
+
+        :param param: Parameter to quantize-dequantize
+        :param round_mode: Rounding mode
+        :param use_cache: If True, reuse (and update) the cached result for this parameter
+        :return: Resulting tensor
+        """
+        if not self.enabled:
+            return param.detach()
+
+        quantized_param_key = (self._get_tensor_key(param), self._get_encoding_key())
+
+        is_cacheable = use_cache and round_mode == libpymo.RoundingMode.ROUND_NEAREST
+        if is_cacheable and quantized_param_key == self._quantized_param_key:
+            return self._quantized_param
+
+        quantized_param = self.quantize_dequantize(param.detach(), round_mode)
+
+        if is_cacheable:
+            self._quantized_param_key = quantized_param_key
+            self._quantized_param = quantized_param
+            self._quantized_param_source = param.detach()
+
+        return quantized_param
+
+
+class PerChannelPostTrainingTensorQuantizer(PostTrainingTensorQuantizer):
+    """
+    Simulates quantization for the given tensor post training, with a separate encoding for every channel along a
+    given axis. Used for weights, where the ranges of different output channels can vary widely.
+    """
+
+    # Minimum range of an encoding, matching the C++ encoding analyzers
+    MIN_RANGE = 0.01
+
+    def __init__(self, bitwidth: int, round_mode: str, quant_scheme: str, use_symmetric_encodings: bool,
+                 enabled_by_default: bool, channel_axis: int):
+        """
+        Constructor
+        :param bitwidth: Quantization bitwidth
+        :param round_mode: Rounding mode (e.g. Nearest)
+        :param quant_scheme: Quantization scheme (e.g. tf, tf_enhanced)
+        :param use_symmetric_encodings: True if symmetric encoding is used.  False otherwise.
+        :param enabled_by_default: True if quantization of tensor is enabled.  False otherwise.
+        :param channel_axis: Axis of the tensor along which channels are laid out
+        """
+        super(PerChannelPostTrainingTensorQuantizer, self).__init__(bitwidth, round_mode, quant_scheme,
+                                                                    use_symmetric_encodings, enabled_by_default)
+        self.channel_axis = channel_axis
+
+        # Per-channel min and max stats, for the tf quant scheme
+        self._stats_min = None
+        self._stats_max = None
+
+        # Per-channel C++ ops collecting histograms, for the tf_enhanced quant scheme
+        self._channel_ops = []
+
+        # Encodings laid out as tensors for quantize-dequantize, along with the encoding key they were built from
+        self._encoding_tensors_key = None
+        self._encoding_tensors = None
+
+    def __str__(self):
+        stream = io.StringIO(newline='\n')
+        stream.write('Post Training Per-Channel TensorQuantizer:\n')
+        stream.write('  quant-scheme:{}, round_mode={}, bitwidth={}, enabled={}, channel_axis={}\n'.format(
+            self.quant_scheme, self.round_mode, self.bitwidth, self.enabled, self.channel_axis))
+        if self.encoding:
+            for channel, encoding in enumerate(self.encoding):
+                stream.write('  channel {}: min:{}, max={}, delta={}, offset={}\n'.format(channel, encoding.min,
+                                                                                     encoding.max, encoding.delta,
+                                                                                     encoding.offset))
+        else:
+            stream.write('  no encoding\n')
+
+        return stream.getvalue()
+
+    def __getstate__(self):
+        state = PickableState(self.__dict__.copy(), None)
+
+        # Remove the unpicklable entries, and save the encodings as plain tuples instead
+        del state.dict['_cppOp']
+        del state.dict['_channel_ops']
+        del state.dict['encoding']
+        if self.encoding:
+            state.encodings = [(encoding.min, encoding.max, encoding.delta, encoding.offset, encoding.bw)
+                               for encoding in self.encoding]
+
+        # Cached state is tied to tensors of this process, so do not save it
+        state.dict['_profiler'] = None
+        state.dict['_quantized_param_key'] = None
+        state.dict['_quantized_param'] = None
+        state.dict['_quantized_param_source'] = None
+        state.dict['_encoding_tensors_key'] = None
+        state.dict['_encoding_tensors'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        # Restore instance attributes. Profilers are not saved
+        self.__dict__.update(state.dict)
+        self.set_profiler(None)
+
+        # Create the c++ ops
+        self._cppOp = AimetTensorQuantizer.AimetTensorQuantizer(self.quant_scheme)
+        self._channel_ops = []
+
+        # Create the encoding objects
+        if hasattr(state, 'encodings'):
+            self.encoding = []
+            for encoding_min, encoding_max, delta, offset, bw in state.encodings:
+                encoding = libpymo.TfEncoding()
+                encoding.bw = bw
+                encoding.max = encoding_max
+                encoding.min = encoding_min
+                encoding.delta = delta
+                encoding.offset = offset
+                self.encoding.append(encoding)
+        else:
+            self.encoding = None
+
+    def _split_channels(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Lays out a tensor as a 2D tensor, with one row per channel
+        :param tensor: Tensor to split
+        :return: Tensor of shape (num channels, values per channel)
+        """
+        num_channels = tensor.shape[self.channel_axis]
+        return tensor.transpose(0, self.channel_axis).reshape(num_channels, -1)
+
+    @profiled('update_stats')
+    def update_encoding_stats(self, tensor):
+        """
+        Update the per-channel stats for computing encodings
+        :param tensor: Tensor to use for updating the encodings stats
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        channels = self._split_channels(tensor.detach())
+
+        if self.quant_scheme == libpymo.QuantizationMode.QUANTIZATION_TF:
+            # A single reduction across all channels
+            channel_min = channels.min(dim=1)[0].double()
+            channel_max = channels.max(dim=1)[0].double()
+
+            if self._stats_min is None:
+                self._stats_min, self._stats_max = channel_min, channel_max
+            else:
+                if self._stats_min.shape != channel_min.shape:
+                    raise ValueError('Expected {} channels, got {}'.format(self._stats_min.shape[0],
+                                                                           channel_min.shape[0]))
+                self._stats_min = torch.min(self._stats_min, channel_min)
+                self._stats_max = torch.max(self._stats_max, channel_max)
+
+        else:
+            # TF enhanced encodings are searched for on a histogram, which the C++ ops collect per channel
+            if not self._channel_ops:
+                self._channel_ops = [AimetTensorQuantizer.AimetTensorQuantizer(self.quant_scheme)
+                                     for _ in range(channels.shape[0])]
+            elif len(self._channel_ops) != channels.shape[0]:
+                raise ValueError('Expected {} channels, got {}'.format(len(self._channel_ops), channels.shape[0]))
+
+            for channel_op, channel in zip(self._channel_ops, channels):
+                channel_op.updateStats(channel, channel.is_cuda)
+
+    def compute_encoding(self):
+        """
+        Compute the quantization encodings for every channel of this tensor
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        if self.quant_scheme == libpymo.QuantizationMode.QUANTIZATION_TF:
+            if self._stats_min is not None:
+                self.encoding = self._compute_tf_encodings(self._stats_min.cpu(), self._stats_max.cpu())
+
+        elif self._channel_ops:
+            encodings = []
+            for channel_op in self._channel_ops:
+                encoding, is_encoding_valid = channel_op.getEncoding(self.bitwidth, self.use_symmetric_encodings)
+                if not is_encoding_valid:
+                    return
+                encodings.append(encoding)
+
+            self.encoding = encodings
+
+    def _compute_tf_encodings(self, stats_min: torch.Tensor, stats_max: torch.Tensor) -> List[libpymo.TfEncoding]:
+        """
+        Computes tf encodings for all channels at once. Follows TfEncodingAnalyzer::computeEncoding()
+        :param stats_min: Per-channel minimum, in double precision
+        :param stats_max: Per-channel maximum, in double precision
+        :return: List of encodings, one per channel
+        """
+        num_steps = 2 ** self.bitwidth - 1
+
+        # Make sure zero value is within the range, and the range is not too small
+        new_min = torch.clamp(stats_min, max=0.0)
+        new_max = torch.clamp(stats_max, min=0.0)
+        new_max = torch.max(new_max, new_min + self.MIN_RANGE)
+
+        if self.use_symmetric_encodings:
+            new_max = torch.max(new_max.abs(), new_min.abs())
+            new_min = -new_max
+
+        delta = (new_max - new_min) / num_steps
+
+        # Make sure zero is exactly quantizable when the range spans it
+        b_zero = torch.clamp(self._round(-new_min / delta), 0, num_steps)
+        offset = torch.where((new_min < 0) & (new_max > 0), -b_zero, self._round(new_min / delta))
+
+        encoding_min = delta * offset
+        encoding_max = new_max - new_min + encoding_min
+
+        encodings = []
+        for channel_min, channel_max, channel_delta, channel_offset in zip(encoding_min.tolist(),
+                                                                           encoding_max.tolist(),
+                                                                           delta.tolist(), offset.tolist()):
+            encoding = libpymo.TfEncoding()
+            encoding.bw = self.bitwidth
+            encoding.max = channel_max
+            encoding.min = channel_min
+            encoding.delta = channel_delta
+            encoding.offset = channel_offset
+            encodings.append(encoding)
+
+        return encodings
+
+    @staticmethod
+    def _round(tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Rounds half away from zero, like std::round(). torch.round() rounds half to even instead
+        :param tensor: Tensor to round
+        :return: Rounded tensor
+        """
+        return torch.sign(tensor) * torch.floor(tensor.abs() + 0.5)
+
+    def _get_encoding_key(self):
+        if not self.encoding:
+            return None
+        return tuple((encoding.min, encoding.max, encoding.bw) for encoding in self.encoding)
+
+    def _get_encoding_tensors(self, tensor: torch.Tensor):
+        """
+        Returns the per-channel encoding min, max and delta, shaped to broadcast against the given tensor
+        :param tensor: Tensor to quantize-dequantize
+        :return: Tuple of min, max and delta tensors in double precision
+        """
+        encoding_tensors_key = (self._get_encoding_key(), tensor.dim(), tensor.device)
+        if encoding_tensors_key != self._encoding_tensors_key:
+            shape = [1] * tensor.dim()
+            shape[self.channel_axis] = len(self.encoding)
+
+            encoding_values = torch.tensor([(encoding.min, encoding.max, encoding.delta) for encoding in self.encoding],
+                                           dtype=torch.float64, device=tensor.device)
+            self._encoding_tensors = tuple(values.reshape(shape) for values in encoding_values.t())
+            self._encoding_tensors_key = encoding_tensors_key
+
+        return self._encoding_tensors
+
+    def _quantize_dequantize(self, tensor, round_mode, out=None):
+        """
+        Quantize-dequantize the tensor using the saved per-channel encodings, in a single batched computation
+        :param tensor: Tensor to quantize-dequantize
+        :param round_mode: Rounding mode, nearest or stochastic
+        :param out: Optional preallocated tensor to write the result to
+        :return: Resulting tensor
+        """
+        encoding_min, encoding_max, delta = self._get_encoding_tensors(tensor)
+
+        # Mirrors the C++ op: clamp to the encoding range, storing the result in the tensor type, then scale and round
+        # in double precision
+        clamped = torch.max(torch.min(tensor.double(), encoding_max), encoding_min).to(tensor.dtype).double()
+        scaled = clamped / delta
+
+        if round_mode == libpymo.RoundingMode.ROUND_NEAREST:
+            quantized = self._round(scaled)
+        elif round_mode == libpymo.RoundingMode.ROUND_STOCHASTIC:
+            # Rounds up with a probability equal to the fractional part
+            quantized = torch.floor(scaled + torch.rand_like(scaled))
+        else:
+            raise ValueError('Unsupported rounding mode: {}'.format(round_mode))
+
+        if out is not None:
+            return out.copy_(quantized * delta)
+        return (quantized * delta).to(tensor.dtype)
+
+    def get_stats(self) -> List[float]:
+        """
+        Returns the per-channel encoding stats collected so far, see PostTrainingTensorQuantizer.get_stats(). These are
+        laid out as the number of channels, followed by the length and the stats of every channel
+        :return: Encoding stats as a list of floats. Empty if no stats have been collected
+        """
+        if self.quant_scheme == libpymo.QuantizationMode.QUANTIZATION_TF:
+            if self._stats_min is None:
+                return []
+            channel_stats = [[channel_min, channel_max] for channel_min, channel_max in
+                             zip(self._stats_min.tolist(), self._stats_max.tolist())]
+        else:
+            if not self._channel_ops:
+                return []
+            channel_stats = [list(channel_op.getStats()) for channel_op in self._channel_ops]
+
+        stats = [float(len(channel_stats))]
+        for stats_of_channel in channel_stats:
+            stats.append(float(len(stats_of_channel)))
+            stats.extend(stats_of_channel)
+        return stats
+
+    @staticmethod
+    def _split_stats(stats: List[float]) -> List[List[float]]:
+        """
+        Splits stats returned by get_stats() into the stats of every channel
+        :param stats: Encoding stats
+        :return: List of stats, one per channel
+        """
+        channel_stats = []
+        index = 1
+        for _ in range(int(stats[0])):
+            length = int(stats[index])
+            channel_stats.append(list(stats[index + 1:index + 1 + length]))
+            index += 1 + length
+
+        if index != len(stats):
+            raise ValueError('Malformed per-channel encoding stats')
+        return channel_stats
+
+    def set_stats(self, stats: List[float]):
+        """
+        Replaces the per-channel encoding stats with stats returned by get_stats()
+        :param stats: Encoding stats
+        :return: None
+        """
+        self.reset_encoding_stats()
+        if not stats:
+            return
+
+        channel_stats = self._split_stats(stats)
+        if self.quant_scheme == libpymo.QuantizationMode.QUANTIZATION_TF:
+            self._stats_min = torch.tensor([channel_min for channel_min, _ in channel_stats], dtype=torch.float64)
+            self._stats_max = torch.tensor([channel_max for _, channel_max in channel_stats], dtype=torch.float64)
+        else:
+            self._channel_ops = [AimetTensorQuantizer.AimetTensorQuantizer(self.quant_scheme)
+                                 for _ in channel_stats]
+            for channel_op, stats_of_channel in zip(self._channel_ops, channel_stats):
+                channel_op.setStats(stats_of_channel)
+
+    def merge_stats(self, stats: List[float]):
+        """
+        Merges per-channel encoding stats returned by get_stats() of another tensor quantizer into the encoding stats
+        :param stats: Encoding stats
+        :return: None
+        """
+        if not stats:
+            return
+
+        has_stats = self._stats_min is not None or bool(self._channel_ops)
+        if not has_stats:
+            self.set_stats(stats)
+            return
+
+        channel_stats = self._split_stats(stats)
+        if self.quant_scheme == libpymo.QuantizationMode.QUANTIZATION_TF:
+            if len(channel_stats) != self._stats_min.shape[0]:
+                raise ValueError('Expected {} channels, got {}'.format(self._stats_min.shape[0], len(channel_stats)))
+            channel_min = torch.tensor([channel_min for channel_min, _ in channel_stats], dtype=torch.float64)
+            channel_max = torch.tensor([channel_max for _, channel_max in channel_stats], dtype=torch.float64)
+            self._stats_min = torch.min(self._stats_min, channel_min.to(self._stats_min.device))
+            self._stats_max = torch.max(self._stats_max, channel_max.to(self._stats_max.device))
+        else:
+            if len(channel_stats) != len(self._channel_ops):
+                raise ValueError('Expected {} channels, got {}'.format(len(self._channel_ops), len(channel_stats)))
+            for channel_op, stats_of_channel in zip(self._channel_ops, channel_stats):
+                channel_op.mergeStats(stats_of_channel)
+
+    def reset_encoding_stats(self):
+        """
+        Resets the encodings stats
+        :return: None
+        """
+        super(PerChannelPostTrainingTensorQuantizer, self).reset_encoding_stats()
+        self._stats_min = None
+        self._stats_max = None
+        self._channel_ops = []
+
+
+class AsyncEncodingStatsCollector:
+    """
+    Defers encoding stats updates of tensor quantizers to a pool of background threads. Tensors seen during a forward
+    pass are buffered per quantizer, and handed off in bulk when the forward pass completes. Each quantizer gets a
+    single job per forward pass, so updates to the same quantizer never run concurrently and happen in order.
+    """
+
+    def __init__(self, num_threads: int):
+        """
+        Constructor
+        :param num_threads: Number of background threads to use for updating stats
+        """
+        self._executor = ThreadPoolExecutor(max_workers=num_threads)
+        self._pending_tensors = {}
+        self._in_flight_jobs = []
+
+    def update_encoding_stats(self, tensor_quantizer: PostTrainingTensorQuantizer, tensor: torch.Tensor):
+        """
+        Buffer a tensor for updating the stats of a given tensor quantizer
+        :param tensor_quantizer: Tensor quantizer to update the stats of
+        :param tensor: Tensor to use for updating the encodings stats
+        :return: None
+        """
+        if tensor_quantizer.enabled:
+            # Downstream layers could modify the tensor in place before its stats are updated, so keep a copy
+            self._pending_tensors.setdefault(tensor_quantizer, []).append(tensor.detach().clone())
+
+    def flush(self):
+        """
+        Hand off all buffered tensors to the background threads. Waits for the previous batch of jobs to complete
+        first, which bounds the number of buffered tensors to those of two forward passes
+        :return: None
+        """
+        self._wait_for_in_flight_jobs()
+
+        self._in_flight_jobs = [self._executor.submit(self._update_stats, tensor_quantizer, tensors)
+                                for tensor_quantizer, tensors in self._pending_tensors.items()]
+        self._pending_tensors = {}
+
+    def wait(self):
+        """
+        Flush buffered tensors and wait until stats have been updated for all of them
+        :return: None
+        """
+        self.flush()
+        self._wait_for_in_flight_jobs()
+
+    def shutdown(self):
+        """
+        Stop the background threads. Buffered tensors that have not been flushed are dropped
+        :return: None
+        """
+        self._pending_tensors = {}
+        self._executor.shutdown(wait=True)
+
+    def _wait_for_in_flight_jobs(self):
+        jobs, self._in_flight_jobs = self._in_flight_jobs, []
+        for job in jobs:
+            # Re-raises any exception raised by the job
+            job.result()
+
+    @staticmethod
+    def _update_stats(tensor_quantizer: PostTrainingTensorQuantizer, tensors):
+        for tensor in tensors:
+            tensor_quantizer.update_encoding_stats(tensor)
@@ -37,6 +37,7 @@
 # =============================================================================
 """ Utilities that are used for different AIMET PyTorch features """
 
+import contextlib
 from typing import List, Tuple, Union
 import numpy as np
 import torch.nn
@@ -224,6 +225,48 @@ def has_hooks(module: torch.nn.Module):
     return False
 
 
+@contextlib.contextmanager
+def preserve_model_state(model: torch.nn.Module):
+    """
+    Context manager that restores the train/eval mode of all modules, the device of the model, its buffers (e.g.
+    BatchNorm running statistics) and its hooks on exit. Parameters are not restored, they must not be modified
+    inside the context
+
+    :param model: Model whose state is to be restored
+    :return: None
+    """
+    modes = {module: module.training for module in model.modules()}
+    hook_ids = {module: [set(hooks) for hooks in (module._forward_pre_hooks,  # pylint: disable=protected-access
+                                                  module._forward_hooks,      # pylint: disable=protected-access
+                                                  module._backward_hooks)]    # pylint: disable=protected-access
+                for module in model.modules()}
+    device = get_device(model)
+    buffers = {name: buffer.detach().clone() for name, buffer in model.named_buffers()}
+
+    try:
+        yield
+
+    finally:
+        if get_device(model) != device:
+            model.to(device)
+
+        with torch.no_grad():
+            for name, buffer in model.named_buffers():
+                if name in buffers:
+                    buffer.copy_(buffers[name])
+
+        for module, training in modes.items():
+            module.training = training
+
+        for module, ids in hook_ids.items():
+            for hooks, orig_ids in zip((module._forward_pre_hooks,  # pylint: disable=protected-access
+                                        module._forward_hooks,      # pylint: disable=protected-access
+                                        module._backward_hooks),    # pylint: disable=protected-access
+                                       ids):
+                for hook_id in set(hooks) - orig_ids:
+                    del hooks[hook_id]
+
+
 def get_one_positions_in_binary_mask(mask):
     """
     Return the indices of one positions in a binary mask.
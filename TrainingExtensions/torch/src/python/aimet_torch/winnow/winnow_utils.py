@@ -128,15 +128,17 @@ def zero_out_input_channels(module, input_channels_to_prune):
     :param input_channels_to_prune: list of input channels to be zeroed out
     :return:
     """
-    for input_channel in input_channels_to_prune:
-        if isinstance(module, nn.Conv2d):
-            module.weight.data[:, input_channel, :, :] = 0
+    # Write to the weight itself rather than through weight.data, so its version counter tracks the update
+    with torch.no_grad():
+        for input_channel in input_channels_to_prune:
+            if isinstance(module, nn.Conv2d):
+                module.weight[:, input_channel, :, :] = 0
 
-        elif isinstance(module, nn.Linear):
-            module.weight.data[:, input_channel] = 0
+            elif isinstance(module, nn.Linear):
+                module.weight[:, input_channel] = 0
 
-        else:
-            raise ValueError("Unsupported layer_type")
+            else:
+                raise ValueError("Unsupported layer_type")
 
 
 def search_for_zero_planes(model: torch.nn.Module) -> List[Tuple[torch.nn.Module, List[int]]]:
@@ -45,6 +45,7 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as functional
 import numpy as np
+import scipy.linalg
 from torchvision import models
 
 # Import AIMET specific modules
@@ -52,8 +53,9 @@ from aimet_common.utils import AimetLogger
 from aimet_torch.winnow.winnow_utils import zero_out_input_channels
 from aimet_common.defs import CostMetric, LayerCompRatioPair
 from aimet_common.input_match_search import InputMatchSearch
+from aimet_common.channel_pruner import NormalEquationsRegression
 
-from aimet_torch.data_subsampler import DataSubSampler
+from aimet_torch.data_subsampler import DataSubSampler, ReconstructionDataCache
 from aimet_torch.channel_pruning.weight_reconstruction import WeightReconstructor
 from aimet_torch.channel_pruning.channel_pruner import InputChannelPruner
 from aimet_torch.examples.mnist_torch_model import Net as mnist_model
@@ -343,6 +345,46 @@ class TestTrainingExtensionsChannelPruning(unittest.TestCase):
         self.assertEqual(sub_sample_output.shape, (2, 10))
         self.assertTrue(np.array_equal(sub_sample_output, output_data[:, :, output_pixel[0], output_pixel[1]]))
 
+    def test_subsample_data_matches_per_pixel_search(self):
+        """Test that vectorized subsampling gathers the same input matches as the per output pixel search"""
+        np.random.seed(0)
+
+        for kernel_size, stride, padding in [((3, 3), (1, 1), (1, 1)), ((5, 3), (2, 1), (2, 0)),
+                                             ((3, 5), (2, 2), (0, 2)), ((1, 1), (1, 1), (0, 0)),
+                                             ((3, 3), (1, 1), (5, 5))]:
+            conv = torch.nn.Conv2d(4, 6, kernel_size=kernel_size, stride=stride, padding=padding)
+            layer_attributes = (conv.kernel_size, conv.stride, conv.padding)
+
+            input_data = np.random.rand(3, 4, 11, 9).astype(np.float32)
+            output_data = to_numpy(conv(torch.from_numpy(input_data)))
+
+            state = np.random.get_state()
+            sub_sample_input, sub_sample_output = InputMatchSearch.subsample_data(layer_attributes=layer_attributes,
+                                                                                  input_data=input_data,
+                                                                                  output_data=output_data,
+                                                                                  samples_per_image=20)
+            self.assertEqual((60, 4, *kernel_size), sub_sample_input.shape)
+            self.assertEqual((60, 6), sub_sample_output.shape)
+
+            # Replay the same random output pixels through the per output pixel search
+            np.random.set_state(state)
+            height_range, width_range = InputMatchSearch._determine_output_pixel_height_width_range_for_random_selection(
+                layer_attributes, output_data.shape)
+            for image_index in range(3):
+                heights = np.random.choice(range(*height_range), size=[20], replace=True)
+                widths = np.random.choice(range(*width_range), size=[20], replace=True)
+                for sample in range(20):
+                    input_match = InputMatchSearch._find_input_match_for_output_pixel(
+                        input_data[image_index], layer_attributes, (heights[sample], widths[sample]))
+                    self.assertTrue(np.array_equal(input_match, sub_sample_input[image_index * 20 + sample]))
+                    self.assertTrue(np.array_equal(output_data[image_index, :, heights[sample], widths[sample]],
+                                                   sub_sample_output[image_index * 20 + sample]))
+
+            # Output at each sampled pixel is the convolution of its input match
+            weight = to_numpy(conv.weight).reshape(6, -1)
+            expected_output = sub_sample_input.reshape(60, -1) @ weight.T + to_numpy(conv.bias)
+            self.assertTrue(np.allclose(expected_output, sub_sample_output, atol=1e-5))
+
     def test_linear_regression(self):
         """Test weight reconstruction with data only"""
 
@@ -386,6 +428,27 @@ class TestTrainingExtensionsChannelPruning(unittest.TestCase):
         # compare bias
         self.assertTrue(np.allclose(new_b, bias))
 
+    def test_linear_regression_with_collinear_inputs(self):
+        """Test that weight reconstruction with collinear inputs returns the minimum norm solution"""
+
+        np.random.seed(0)
+        input_data = np.random.randn(1000, 3).astype(np.float32)
+        # the last input is a linear combination of the first two
+        input_data = np.hstack([input_data, 3 * input_data[:, :1] + 0.7 * input_data[:, 1:2]]).astype(np.float32)
+        output_data = (input_data @ np.random.randn(4, 2) + 0.5 + 0.01 * np.random.randn(1000, 2)).astype(np.float32)
+
+        regression = NormalEquationsRegression(bias=True)
+        regression.add_data(input_data, output_data)
+        new_w, new_b = regression.solve()
+
+        # minimum norm least squares solution of the centered data
+        input_mean = input_data.mean(axis=0, dtype=np.float64)
+        output_mean = output_data.mean(axis=0, dtype=np.float64)
+        expected_w, _, _, _ = scipy.linalg.lstsq(input_data - input_mean, output_data - output_mean, cond=1e-5)
+
+        self.assertTrue(np.allclose(new_w, expected_w.T, atol=1e-6))
+        self.assertTrue(np.allclose(new_b, output_mean - input_mean @ expected_w, atol=1e-6))
+
     def test_reconstruct_weight_and_bias_for_layer(self):
         """ """
         model = TestNet()
@@ -413,6 +476,57 @@ class TestTrainingExtensionsChannelPruning(unittest.TestCase):
         # if data is increased, choose tolerance wisely
         self.assertTrue(np.allclose(to_numpy(outputs), to_numpy(new_outputs), atol=1e-5))
 
+    def test_reconstruct_weight_and_bias_for_layer_from_batches(self):
+        """ Test that reconstruction from data streamed batch by batch is the same as from all the data at once """
+        model = TestNet()
+        layer = model.conv2
+        layer_copy = copy.deepcopy(layer)
+
+        number_of_images = 500
+        inputs = np.random.rand(number_of_images, layer.in_channels, layer.kernel_size[0], layer.kernel_size[1])
+        # targets of a layer with different weights, so reconstruction changes the layer
+        outputs = np.random.rand(layer.out_channels, inputs[0].size) @ inputs.reshape(number_of_images, -1).T
+        outputs = outputs.T + np.random.rand(layer.out_channels)
+
+        WeightReconstructor.reconstruct_params_for_conv2d(layer=layer, input_data=inputs, output_data=outputs)
+
+        batches = [(inputs[start:start + 64], outputs[start:start + 64]) for start in range(0, number_of_images, 64)]
+        WeightReconstructor.reconstruct_params_for_conv2d_from_batches(layer=layer_copy,
+                                                                       sub_sampled_data_batches=iter(batches))
+
+        self.assertTrue(np.allclose(to_numpy(layer.weight), to_numpy(layer_copy.weight), atol=1e-5))
+        self.assertTrue(np.allclose(to_numpy(layer.bias), to_numpy(layer_copy.bias), atol=1e-5))
+
+    def test_pipelined_reconstruction(self):
+        """ Test that accumulating batches in a worker thread while they are produced gives the same reconstruction """
+        model = TestNet()
+        layer = model.conv2
+        layer_copy = copy.deepcopy(layer)
+
+        inputs = np.random.rand(500, layer.in_channels, layer.kernel_size[0], layer.kernel_size[1])
+        outputs = np.random.rand(500, layer.out_channels)
+
+        produced_batches = []
+
+        def produce_batches():
+            for start in range(0, 500, 50):
+                produced_batches.append(start)
+                yield inputs[start:start + 50], outputs[start:start + 50]
+
+        WeightReconstructor.reconstruct_params_for_conv2d_from_batches(layer, produce_batches(), pipeline_depth=0)
+        WeightReconstructor.reconstruct_params_for_conv2d_from_batches(layer_copy, produce_batches(), pipeline_depth=2)
+
+        self.assertEqual(20, len(produced_batches))
+        self.assertTrue(np.array_equal(to_numpy(layer.weight), to_numpy(layer_copy.weight)))
+        self.assertTrue(np.array_equal(to_numpy(layer.bias), to_numpy(layer_copy.bias)))
+
+        # errors in the worker thread are raised in the calling thread
+        regression = NormalEquationsRegression(bias=True)
+        bad_batches = [(np.random.rand(50, 125), np.random.rand(50, 10)), (np.random.rand(50, 100),
+                                                                           np.random.rand(50, 10))]
+        with self.assertRaises(ValueError):
+            regression.add_batches(iter(bad_batches), pipeline_depth=2)
+
     def test_data_sub_sampling_and_reconstruction(self):
         """Test end to end data sub sampling and reconstruction for MNIST conv2 layer"""
         orig_model = mnist_model().cuda()
@@ -742,6 +856,35 @@ class TestTrainingExtensionsChannelPruning(unittest.TestCase):
         self.assertEqual(comp_layer_db.model.conv4.in_channels, 15)
         self.assertEqual(comp_layer_db.model.conv4.out_channels, 40)
 
+    def test_prune_model_with_memory_budget(self):
+        """Test that prune model bounds the reconstruction data kept in memory by the given memory budget"""
+        orig_model = mnist_model()
+        orig_model.eval()
+        orig_layer_db = LayerDatabase(orig_model, input_shape=(1, 1, 28, 28))
+
+        data_loader = create_fake_data_loader(dataset_size=100, batch_size=10)
+        input_channel_pruner = InputChannelPruner(data_loader=data_loader, input_shape=(1, 1, 28, 28),
+                                                  num_reconstruction_samples=100,
+                                                  allow_custom_downsample_ops=True,
+                                                  reconstruction_memory_budget=10000)
+
+        layer_comp_ratio_list = [LayerCompRatioPair(Layer(orig_model.conv2, 'conv2', None), 0.5)]
+
+        with unittest.mock.patch.object(DataSubSampler, 'collect_orig_layers_output_data',
+                                        wraps=DataSubSampler.collect_orig_layers_output_data) as collect, \
+                unittest.mock.patch.object(InputChannelPruner, '_prune_layer', autospec=True,
+                                           side_effect=InputChannelPruner._prune_layer) as prune_layer:
+            comp_layer_db = input_channel_pruner.prune_model(orig_layer_db, layer_comp_ratio_list, CostMetric.mac,
+                                                             trainer=None)
+
+        self.assertEqual(collect.call_count, 1)
+        self.assertEqual(collect.call_args[0][-1], 10000)
+
+        # the cache collected once is handed to the pruning of the layers
+        self.assertEqual(prune_layer.call_count, 1)
+        self.assertIsInstance(prune_layer.call_args[1]['data_cache'], ReconstructionDataCache)
+        self.assertEqual(comp_layer_db.model.conv2.in_channels, 16)
+
     def test_prune_model_with_seq(self):
         """Test end to end prune model with resnet18"""
 
@@ -40,16 +40,22 @@ import unittest
 import unittest.mock
 from unittest.mock import create_autospec
 from decimal import Decimal
+import functools
 import math
 import os
 import signal
+import tempfile
+import threading
 
+import torch
 from torch import nn
 import torch.nn.functional as functional
 import libpymo as pymo
 from aimet_common.defs import CostMetric, LayerCompRatioPair
 from aimet_common.cost_calculator import SpatialSvdCostCalculator,WeightSvdCostCalculator
 from aimet_common import comp_ratio_select
+from aimet_common.eval_score_cache import EvalScoreCache
+from aimet_common.pruner import Pruner
 from aimet_torch.examples import mnist_torch_model
 from aimet_torch.layer_database import Layer, LayerDatabase
 from aimet_torch.svd.svd_pruner import SpatialSvdPruner
@@ -134,6 +140,280 @@ class TestTrainingExtensionsCompRatioSelect(unittest.TestCase):
 
         self.assertEqual(11, dict['conv2'][Decimal('0.9')])
 
+    def test_eval_scores_in_parallel(self):
+
+        class FakePruner(Pruner):
+            def prune_model(self, _layer_db, layer_comp_ratio_list, _cost_metric, trainer):
+                pruned_layer_db = unittest.mock.MagicMock()
+                pruned_layer_db.model = (layer_comp_ratio_list[0].layer.name, layer_comp_ratio_list[0].comp_ratio)
+                return pruned_layer_db
+
+            def _prune_layer(self, orig_layer_db, comp_layer_db, layer, comp_ratio, cost_metric):
+                pass
+
+        def eval_func(model, _iterations, use_cuda):
+            layer_name, comp_ratio = model
+            return float(comp_ratio) * 100 + (1 if layer_name == 'conv2' else 0)
+
+        pruner = FakePruner()
+
+        model = mnist_torch_model.Net().to('cpu')
+
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        layer1 = layer_db.find_layer_by_name('conv1')
+        layer2 = layer_db.find_layer_by_name('conv2')
+        layer_db.mark_picked_layers([layer1, layer2])
+
+        serial_algo = comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, pruner, SpatialSvdCostCalculator(),
+                                                                  eval_func, 20, CostMetric.mac, 0.5, 10, True, None,
+                                                                  None, False, bokeh_session=None)
+        serial_dict = serial_algo._compute_eval_scores_for_all_comp_ratio_candidates()
+
+        for use_processes in (False, True):
+            greedy_algo = comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, pruner, SpatialSvdCostCalculator(),
+                                                                      eval_func, 20, CostMetric.mac, 0.5, 10, True,
+                                                                      None, None, False, bokeh_session=None,
+                                                                      num_workers=4, use_processes=use_processes)
+            parallel_dict = greedy_algo._compute_eval_scores_for_all_comp_ratio_candidates()
+
+            # Same scores in the same order as the serial computation
+            self.assertEqual(list(serial_dict.keys()), list(parallel_dict.keys()))
+            for layer_name in serial_dict:
+                self.assertEqual(list(serial_dict[layer_name].items()), list(parallel_dict[layer_name].items()))
+
+            self.assertEqual(51, parallel_dict['conv2'][Decimal('0.5')])
+            self.assertEqual(10, parallel_dict['conv1'][Decimal('0.1')])
+
+        # A pruner that is not thread-safe is never called from several threads
+        pruner.IS_THREAD_SAFE = False
+        eval_thread_ids = set()
+
+        def eval_func_recording_thread(model, iterations, use_cuda):
+            eval_thread_ids.add(threading.get_ident())
+            return eval_func(model, iterations, use_cuda)
+
+        greedy_algo = comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, pruner, SpatialSvdCostCalculator(),
+                                                                  eval_func_recording_thread, 20, CostMetric.mac, 0.5,
+                                                                  10, True, None, None, False, bokeh_session=None,
+                                                                  num_workers=4)
+        self.assertEqual(serial_dict, greedy_algo._compute_eval_scores_for_all_comp_ratio_candidates())
+        self.assertEqual({threading.get_ident()}, eval_thread_ids)
+
+        with self.assertRaises(ValueError):
+            comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, pruner, SpatialSvdCostCalculator(), eval_func, 20,
+                                                        CostMetric.mac, 0.5, 10, True, None, None, False,
+                                                        bokeh_session=None, num_workers=0)
+
+    def test_eval_scores_cache(self):
+
+        pruner = unittest.mock.MagicMock()
+        model = mnist_torch_model.Net().to('cpu')
+
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        layer1 = layer_db.find_layer_by_name('conv1')
+        layer2 = layer_db.find_layer_by_name('conv2')
+        layer_db.mark_picked_layers([layer1, layer2])
+
+        scores = [90, 80, 70, 60, 50, 40, 30, 20, 10, 91, 81, 71, 61, 51, 41, 31, 21, 11]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_path = os.path.join(tmp_dir, 'cache', 'eval_scores.db')
+
+            def create_algo(eval_func, eval_iterations=20, num_workers=1):
+                return comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, pruner, SpatialSvdCostCalculator(),
+                                                                   eval_func, eval_iterations, CostMetric.mac, 0.5,
+                                                                   10, True, None, None, False, bokeh_session=None,
+                                                                   num_workers=num_workers,
+                                                                   eval_scores_cache_path=cache_path)
+
+            # Interrupt the run after 12 evals
+            eval_func = unittest.mock.MagicMock(side_effect=scores[:12] + [RuntimeError()])
+            with self.assertRaises(RuntimeError):
+                create_algo(eval_func)._compute_eval_scores_for_all_comp_ratio_candidates()
+
+            # Resumed run only evaluates the remaining candidates
+            eval_func = unittest.mock.MagicMock(side_effect=scores[12:])
+            eval_dict = create_algo(eval_func)._compute_eval_scores_for_all_comp_ratio_candidates()
+            self.assertEqual(6, eval_func.call_count)
+            self.assertEqual(50, eval_dict['conv1'][Decimal('0.5')])
+            self.assertEqual(61, eval_dict['conv2'][Decimal('0.4')])
+            self.assertEqual(11, eval_dict['conv2'][Decimal('0.9')])
+
+            # Fully cached, also when using workers
+            eval_func = unittest.mock.MagicMock()
+            self.assertEqual(eval_dict, create_algo(eval_func, num_workers=2).
+                             _compute_eval_scores_for_all_comp_ratio_candidates())
+            eval_func.assert_not_called()
+
+            # A different eval setup does not reuse the scores
+            eval_func = unittest.mock.MagicMock(side_effect=scores)
+            create_algo(eval_func, eval_iterations=10)._compute_eval_scores_for_all_comp_ratio_candidates()
+            self.assertEqual(18, eval_func.call_count)
+
+    def test_eval_scores_cache_context_key(self):
+
+        model = mnist_torch_model.Net().to('cpu')
+        model.register_buffer('running_scale', torch.ones(1))
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        pruner = SpatialSvdPruner()
+
+        def eval_func(model, iterations, use_cuda, scale=1.0):
+            return scale
+
+        def get_context_key(eval_func):
+            return EvalScoreCache._compute_context_key(layer_db, pruner, eval_func, 20, CostMetric.mac)
+
+        # Identical setups share the key
+        self.assertEqual(get_context_key(functools.partial(eval_func, scale=0.5)),
+                         get_context_key(functools.partial(eval_func, scale=0.5)))
+
+        # Partials with different arguments and lambdas with different closures do not collide
+        self.assertNotEqual(get_context_key(functools.partial(eval_func, scale=0.5)),
+                            get_context_key(functools.partial(eval_func, scale=2.0)))
+        eval_funcs = [lambda model, iterations, use_cuda, scale=scale: scale for scale in (0.5, 2.0)]
+        self.assertNotEqual(get_context_key(eval_funcs[0]), get_context_key(eval_funcs[1]))
+
+        # Changing the weights changes the key
+        context_key = get_context_key(eval_func)
+        model.conv1.weight.data.add_(1.0)
+        self.assertNotEqual(context_key, get_context_key(eval_func))
+
+        # So does changing a bias or a buffer
+        context_key = get_context_key(eval_func)
+        model.fc2.bias.data.add_(1.0)
+        self.assertNotEqual(context_key, get_context_key(eval_func))
+
+        context_key = get_context_key(eval_func)
+        model.running_scale.add_(1.0)
+        self.assertNotEqual(context_key, get_context_key(eval_func))
+
+    def test_eval_scores_adaptive_sampling(self):
+
+        class FakePruner(Pruner):
+            def prune_model(self, _layer_db, layer_comp_ratio_list, _cost_metric, trainer):
+                pruned_layer_db = unittest.mock.MagicMock()
+                pruned_layer_db.model = (layer_comp_ratio_list[0].layer.name, layer_comp_ratio_list[0].comp_ratio)
+                return pruned_layer_db
+
+            def _prune_layer(self, orig_layer_db, comp_layer_db, layer, comp_ratio, cost_metric):
+                pass
+
+        def eval_func(model, _iterations, use_cuda):
+            layer_name, comp_ratio = model
+            if layer_name == 'conv1':
+                # Linear
+                return float(comp_ratio) * 100
+            # Sharp knee at 0.3
+            return 90.0 if comp_ratio >= Decimal('0.3') else 10.0
+
+        model = mnist_torch_model.Net().to('cpu')
+
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        layer1 = layer_db.find_layer_by_name('conv1')
+        layer2 = layer_db.find_layer_by_name('conv2')
+        layer_db.mark_picked_layers([layer1, layer2])
+
+        for num_workers in (1, 2):
+            eval_func_mock = unittest.mock.MagicMock(side_effect=eval_func)
+            greedy_algo = comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, FakePruner(),
+                                                                      SpatialSvdCostCalculator(), eval_func_mock, 20,
+                                                                      CostMetric.mac, 0.5, 10, True, None, None,
+                                                                      False, bokeh_session=None,
+                                                                      num_workers=num_workers,
+                                                                      adaptive_sampling_tolerance=1.0)
+            eval_dict = greedy_algo._compute_eval_scores_for_all_comp_ratio_candidates()
+
+            # All candidates are present
+            self.assertEqual(greedy_algo._comp_ratio_candidates, list(eval_dict['conv1'].keys()))
+            self.assertEqual(greedy_algo._comp_ratio_candidates, list(eval_dict['conv2'].keys()))
+
+            # Linear curve is fully determined by the initial candidates
+            for comp_ratio, eval_score in eval_dict['conv1'].items():
+                self.assertAlmostEqual(float(comp_ratio) * 100, eval_score)
+
+            # The knee is located exactly
+            self.assertEqual(10.0, eval_dict['conv2'][Decimal('0.2')])
+            self.assertEqual(90.0, eval_dict['conv2'][Decimal('0.3')])
+
+            evaluated = [args[0] for args, _ in eval_func_mock.call_args_list]
+            self.assertEqual(3, len([name for name, _ in evaluated if name == 'conv1']))
+            self.assertLess(len(evaluated), 18)
+
+    def test_eval_scores_progressive_eval(self):
+
+        class FakePruner(Pruner):
+            def prune_model(self, _layer_db, layer_comp_ratio_list, _cost_metric, trainer):
+                pruned_layer_db = unittest.mock.MagicMock()
+                pruned_layer_db.model = layer_comp_ratio_list[0].comp_ratio
+                return pruned_layer_db
+
+            def _prune_layer(self, orig_layer_db, comp_layer_db, layer, comp_ratio, cost_metric):
+                pass
+
+        num_batches_evaluated = []
+
+        def progressive_eval_func(model, iterations, use_cuda):
+            # Per-batch scores alternate around a mean of 100 * comp_ratio
+            comp_ratio = float(model)
+            scores_sum = 0
+            for batch in range(iterations):
+                num_batches_evaluated.append(comp_ratio)
+                scores_sum += comp_ratio * 100 + (1 if batch % 2 else -1)
+                yield scores_sum / (batch + 1)
+
+        model = mnist_torch_model.Net().to('cpu')
+
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        layer1 = layer_db.find_layer_by_name('conv1')
+        layer_db.mark_picked_layers([layer1])
+
+        greedy_algo = comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, FakePruner(), SpatialSvdCostCalculator(),
+                                                                  progressive_eval_func, 20, CostMetric.mac, 0.5, 10,
+                                                                  True, None, None, False, bokeh_session=None,
+                                                                  num_workers=2, early_exit_score_threshold=50)
+        eval_dict = greedy_algo._compute_eval_scores_for_all_comp_ratio_candidates()
+
+        # Candidates well below the threshold exit after a few batches, the others run all iterations
+        self.assertEqual(3, num_batches_evaluated.count(0.1))
+        self.assertEqual(20, num_batches_evaluated.count(0.5))
+        self.assertEqual(20, num_batches_evaluated.count(0.9))
+        self.assertAlmostEqual(90, eval_dict['conv1'][Decimal('0.9')])
+        self.assertAlmostEqual(10, eval_dict['conv1'][Decimal('0.1')], delta=1)
+
+        # Proxy scores only evaluate the first batches
+        num_batches_evaluated.clear()
+        greedy_algo = comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, FakePruner(), SpatialSvdCostCalculator(),
+                                                                  progressive_eval_func, 20, CostMetric.mac, 0.5, 10,
+                                                                  True, None, None, False, bokeh_session=None)
+        proxy_eval_dict = greedy_algo.compute_proxy_eval_scores(num_batches=2)
+        self.assertEqual(18, len(num_batches_evaluated))
+        self.assertEqual(sorted(proxy_eval_dict['conv1'].keys()),
+                         sorted(proxy_eval_dict['conv1'], key=proxy_eval_dict['conv1'].get))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_path = os.path.join(tmp_dir, 'eval_scores.db')
+
+            def create_algo(early_exit_score_threshold):
+                return comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, FakePruner(), SpatialSvdCostCalculator(),
+                                                                   progressive_eval_func, 20, CostMetric.mac, 0.5,
+                                                                   10, True, None, None, False, bokeh_session=None,
+                                                                   eval_scores_cache_path=cache_path,
+                                                                   early_exit_score_threshold=
+                                                                   early_exit_score_threshold)
+
+            # Scores of evals that exited early are not cached
+            num_batches_evaluated.clear()
+            create_algo(50)._compute_eval_scores_for_all_comp_ratio_candidates()
+            self.assertEqual(3, num_batches_evaluated.count(0.1))
+
+            # A run without early exit evaluates those candidates fully and reuses the complete scores
+            num_batches_evaluated.clear()
+            eval_dict = create_algo(None)._compute_eval_scores_for_all_comp_ratio_candidates()
+            self.assertEqual(20, num_batches_evaluated.count(0.1))
+            self.assertEqual(0, num_batches_evaluated.count(0.9))
+            self.assertAlmostEqual(10, eval_dict['conv1'][Decimal('0.1')])
+            self.assertAlmostEqual(90, eval_dict['conv1'][Decimal('0.9')])
+
     def test_eval_scores_with_spatial_svd_pruner(self):
 
         pruner = SpatialSvdPruner()
@@ -209,6 +489,45 @@ class TestTrainingExtensionsCompRatioSelect(unittest.TestCase):
                                                                          layer2)
         self.assertEqual(None, comp_ratio)
 
+    def test_eval_score_table(self):
+
+        model = mnist_torch_model.Net()
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+
+        layer1 = layer_db.find_layer_by_name('conv1')
+        layer2 = layer_db.find_layer_by_name('conv2')
+        layer3 = layer_db.find_layer_by_name('fc1')
+        layer_db.mark_picked_layers([layer1, layer2, layer3])
+
+        # conv2 is non-monotonic and fc1 has fewer comp-ratios
+        eval_scores_dict = {'conv1': {Decimal('0.1'): 10, Decimal('0.3'): 30, Decimal('0.5'): 50, Decimal('0.9'): 90},
+                            'conv2': {Decimal('0.1'): 41, Decimal('0.3'): 20, Decimal('0.5'): 60, Decimal('0.9'): 61},
+                            'fc1': {Decimal('0.2'): 45, Decimal('0.8'): 55}}
+
+        greedy_algo = comp_ratio_select.GreedyCompRatioSelectAlgo(layer_db, unittest.mock.MagicMock(),
+                                                                  SpatialSvdCostCalculator(), None, 20, CostMetric.mac,
+                                                                  0.5, 10, True, None, None, False, bokeh_session=None)
+        original_model_cost = SpatialSvdCostCalculator().compute_model_cost(layer_db)
+
+        for cost_metric in (CostMetric.mac, CostMetric.memory):
+            greedy_algo._cost_metric = cost_metric
+            eval_score_table = comp_ratio_select.EvalScoreTable(layer_db, eval_scores_dict, SpatialSvdCostCalculator(),
+                                                                cost_metric)
+
+            eval_scores = [0, 10, 15, 20, 30, 41, 45, 47.5, 50, 55, 60, 60.5, 61, 90, 100]
+            model_comp_ratios = eval_score_table.calculate_model_comp_ratios(eval_scores)
+
+            for eval_score, model_comp_ratio in zip(eval_scores, model_comp_ratios):
+                expected_comp_ratio = greedy_algo._calculate_model_comp_ratio_for_given_eval_score(
+                    eval_score, eval_scores_dict, original_model_cost)
+                self.assertEqual(expected_comp_ratio, Decimal(model_comp_ratio))
+
+                layer_comp_ratio_pairs = eval_score_table.get_layer_comp_ratio_pairs(eval_score)
+                for pair in layer_comp_ratio_pairs:
+                    self.assertEqual(greedy_algo._find_layer_comp_ratio_given_eval_score(eval_scores_dict,
+                                                                                         eval_score, pair.layer),
+                                     pair.comp_ratio)
+
     def test_select_per_layer_comp_ratios(self):
 
         pruner = unittest.mock.MagicMock()
@@ -365,5 +684,48 @@ class TestTrainingExtensionsCompRatioSelect(unittest.TestCase):
             self.assertEqual(layer_comp_ratio_list[2].eval_score, 0.97)
             self.assertEqual(layer_comp_ratio_list[2].comp_ratio, 1.0)
 
+    def test_comp_ratio_select_tar_in_parallel(self):
 
+        class FakePruner(Pruner):
+            def prune_model(self, _layer_db, layer_comp_ratio_list, _cost_metric, trainer):
+                pruned_layer_db = unittest.mock.MagicMock()
+                pruned_layer_db.model = [(pair.layer.name, pair.comp_ratio) for pair in layer_comp_ratio_list]
+                return pruned_layer_db
 
+            def _prune_layer(self, orig_layer_db, comp_layer_db, layer, comp_ratio, cost_metric):
+                pass
+
+        def eval_func(model, _iterations, use_cuda):
+            return 0.5 + 0.5 * float(min(comp_ratio for _, comp_ratio in model)) ** 0.25
+
+        model = mnist_torch_model.Net().to('cpu')
+
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        layer_db.mark_picked_layers([layer_db.find_layer_by_name('conv2'), layer_db.find_layer_by_name('fc1')])
+
+        results = []
+        for num_workers in [1, 4]:
+            tar_algo = comp_ratio_select.TarRankSelectAlgo(layer_db=layer_db, pruner=FakePruner(),
+                                                           cost_calculator=WeightSvdCostCalculator(),
+                                                           eval_func=unittest.mock.MagicMock(side_effect=eval_func),
+                                                           eval_iterations=20, cost_metric=CostMetric.mac,
+                                                           num_rank_indices=10, use_cuda=False,
+                                                           num_workers=num_workers)
+
+            tar_algo._svd_lib_ref = create_autospec(pymo.Svd, instance=True)
+            tar_algo._svd_lib_ref.SetCandidateRanks.return_value = 10
+            tar_algo._svd_lib_ref.GetCandidateRanks.side_effect = lambda layer_name, rank_index: [3 * (rank_index + 1)]
+
+            layer_comp_ratio_list, _ = tar_algo.select_per_layer_comp_ratios()
+
+            # One eval per layer and one eval of the compressed model, for every rank index
+            self.assertEqual(10 * 3, tar_algo._eval_func.call_count)
+            results.append([(pair.layer.name, pair.comp_ratio, pair.eval_score) for pair in layer_comp_ratio_list])
+
+        self.assertEqual(results[0], results[1])
+
+        with self.assertRaises(ValueError):
+            comp_ratio_select.TarRankSelectAlgo(layer_db=layer_db, pruner=FakePruner(),
+                                                cost_calculator=WeightSvdCostCalculator(), eval_func=eval_func,
+                                                eval_iterations=20, cost_metric=CostMetric.mac, num_rank_indices=10,
+                                                use_cuda=False, num_workers=0)
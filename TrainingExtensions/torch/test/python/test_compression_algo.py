@@ -38,6 +38,8 @@
 
 import unittest
 import unittest.mock
+import threading
+import time
 from decimal import Decimal
 import torch
 import torch.nn as nn
@@ -47,10 +49,13 @@ from aimet_common.comp_ratio_select import GreedyCompRatioSelectAlgo
 from aimet_common.defs import CostMetric
 from aimet_common.cost_calculator import SpatialSvdCostCalculator
 from aimet_common.compression_algo import CompressionAlgo
+from aimet_common.comp_ratio_rounder import ChannelRounder
 
 from aimet_torch.examples import mnist_torch_model
 from aimet_torch.layer_database import LayerDatabase
 from aimet_torch.svd.svd_pruner import SpatialSvdPruner
+from aimet_torch.channel_pruning.channel_pruner import InputChannelPruner, ChannelPruningCostCalculator
+from aimet_torch.utils import create_fake_data_loader
 from aimet_torch.layer_selector import ConvNoDepthwiseLayerSelector
 
 
@@ -161,3 +166,116 @@ class TestTrainingExtensionsCompressionAlgo(unittest.TestCase):
         print(compressed_layer_db.model)
 
         print(stats)
+
+    def testSpatialSvdForTargets(self):
+
+        torch.manual_seed(1)
+
+        model = mnist_torch_model.Net()
+
+        rounding_algo = unittest.mock.MagicMock()
+        rounding_algo.round.side_effect = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9,
+                                           0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+
+        eval_scores = iter([10, 20, 30, 40, 50, 60, 70, 80, 90,
+                            10, 20, 30, 40, 50, 60, 70, 80, 90])
+        mock_eval = unittest.mock.MagicMock()
+        mock_eval.side_effect = lambda *_args, **_kwargs: next(eval_scores, 50)
+
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        pruner = SpatialSvdPruner()
+        comp_ratio_select_algo = GreedyCompRatioSelectAlgo(layer_db, pruner, SpatialSvdCostCalculator(),
+                                                           mock_eval, 20, CostMetric.mac, Decimal(0.5),
+                                                           10, True, None, rounding_algo, False, bokeh_session=None)
+
+        layer_selector = ConvNoDepthwiseLayerSelector()
+        spatial_svd_algo = CompressionAlgo(layer_db, comp_ratio_select_algo, pruner,
+                                           mock_eval,
+                                           layer_selector, modules_to_ignore=[],
+                                           cost_calculator=SpatialSvdCostCalculator(),
+                                           use_cuda=False)
+
+        target_comp_ratios = [Decimal('0.9'), Decimal('0.7'), Decimal('0.5')]
+        results = spatial_svd_algo.compress_model_for_targets(CostMetric.mac, target_comp_ratios,
+                                                              create_models=True, num_workers=2)
+
+        # Eval scores dictionary is only computed once, plus one eval for the baseline and each compressed model
+        self.assertEqual(18 + 1 + 3, mock_eval.call_count)
+        self.assertEqual(18, rounding_algo.round.call_count)
+
+        self.assertEqual(target_comp_ratios, [result.target_comp_ratio for result in results])
+        mac_comp_ratios = [result.mac_compression_ratio for result in results]
+        self.assertEqual(sorted(mac_comp_ratios, reverse=True), mac_comp_ratios)
+
+        for result in results:
+            self.assertAlmostEqual(float(result.target_comp_ratio), float(result.mac_compression_ratio), delta=0.1)
+            self.assertEqual(format(result.mac_compression_ratio, '.6f'),
+                             result.compression_stats.mac_compression_ratio)
+            self.assertEqual(2, len(result.layer_comp_ratio_list))
+
+        self.assertTrue(isinstance(results[-1].compressed_layer_db.model.conv2, torch.nn.Sequential))
+
+        # Original model is not modified
+        self.assertTrue(isinstance(model.conv2, torch.nn.Conv2d))
+
+    def testChannelPruningForTargets(self):
+
+        torch.manual_seed(1)
+
+        model = mnist_torch_model.Net()
+        model.eval()
+
+        eval_scores = iter([10, 20, 30, 40, 50, 60, 70, 80, 90])
+        mock_eval = unittest.mock.MagicMock()
+        mock_eval.side_effect = lambda *_args, **_kwargs: next(eval_scores, 50)
+
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        data_loader = create_fake_data_loader(dataset_size=40, batch_size=4, image_size=(1, 28, 28))
+        pruner = InputChannelPruner(data_loader=data_loader, input_shape=(1, 1, 28, 28),
+                                    num_reconstruction_samples=320, allow_custom_downsample_ops=True)
+        cost_calculator = ChannelPruningCostCalculator(pruner)
+
+        # Track the number of prune_model calls in flight
+        prune_model = pruner.prune_model
+        lock = threading.Lock()
+        num_concurrent_calls = [0]
+        max_num_concurrent_calls = [0]
+
+        def tracked_prune_model(*args, **kwargs):
+            with lock:
+                num_concurrent_calls[0] += 1
+                max_num_concurrent_calls[0] = max(max_num_concurrent_calls[0], num_concurrent_calls[0])
+            try:
+                time.sleep(0.1)
+                return prune_model(*args, **kwargs)
+            finally:
+                with lock:
+                    num_concurrent_calls[0] -= 1
+
+        comp_ratio_select_algo = GreedyCompRatioSelectAlgo(layer_db, pruner, cost_calculator,
+                                                           mock_eval, 20, CostMetric.mac, Decimal(0.5),
+                                                           10, True, None, ChannelRounder(1), False,
+                                                           bokeh_session=None)
+
+        layer_selector = ConvNoDepthwiseLayerSelector()
+        channel_pruning_algo = CompressionAlgo(layer_db, comp_ratio_select_algo, pruner,
+                                               mock_eval,
+                                               layer_selector, modules_to_ignore=[model.conv1],
+                                               cost_calculator=cost_calculator,
+                                               use_cuda=False)
+
+        target_comp_ratios = [Decimal('0.9'), Decimal('0.7'), Decimal('0.5')]
+        with unittest.mock.patch.object(pruner, 'prune_model', side_effect=tracked_prune_model):
+            results = channel_pruning_algo.compress_model_for_targets(CostMetric.mac, target_comp_ratios,
+                                                                      create_models=True, num_workers=2)
+
+        # Channel pruning is not thread-safe, the compressed models are created one at a time
+        self.assertEqual(1, max_num_concurrent_calls[0])
+
+        self.assertEqual(target_comp_ratios, [result.target_comp_ratio for result in results])
+        for result in results:
+            self.assertIsNotNone(result.compressed_layer_db)
+            self.assertIsNotNone(result.compression_stats)
+
+        # Original model is not modified
+        self.assertEqual(32, model.conv2.in_channels)
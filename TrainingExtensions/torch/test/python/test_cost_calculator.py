@@ -220,6 +220,41 @@ class TestTrainingExtensionsSpatialSvdCostCalculator(unittest.TestCase):
                          compressed_cost.mac)
 
 
+    def test_rank_cost_table(self):
+
+        model = mnist_model.Net().to("cpu")
+        layer_database = lad.LayerDatabase(model=model, input_shape=(1, 1, 28, 28))
+
+        for cost_calculator in [cc.SpatialSvdCostCalculator, cc.WeightSvdCostCalculator]:
+            for layer in layer_database:
+
+                table = cost_calculator.get_rank_cost_table(layer)
+                self.assertIs(table, cost_calculator.get_rank_cost_table(layer))
+                self.assertEqual(cost_calculator.calculate_max_rank(layer), table.max_rank)
+
+                original_cost = cc.CostCalculator.compute_layer_cost(layer)
+
+                for comp_ratio in [1.0, Decimal('0.8'), 0.5, Decimal('0.3'), 0.1, 0.001]:
+                    for cost_metric in [CostMetric.mac, CostMetric.memory]:
+
+                        # Linear search for the highest rank that meets the target cost
+                        target_cost = (original_cost.mac if cost_metric == CostMetric.mac else
+                                       original_cost.memory) * comp_ratio
+                        expected_rank = cost_calculator.calculate_max_rank(layer)
+                        while expected_rank > 0:
+                            cost = cost_calculator.calculate_cost_given_rank(layer, expected_rank)
+                            if (cost.mac if cost_metric == CostMetric.mac else cost.memory) <= target_cost:
+                                break
+                            expected_rank -= 1
+
+                        rank = cost_calculator.calculate_rank_given_comp_ratio(layer, comp_ratio, cost_metric)
+                        self.assertEqual(max(expected_rank, 1), rank)
+
+                        table_cost = table.get_cost(rank)
+                        cost = cost_calculator.calculate_cost_given_rank(layer, rank)
+                        self.assertEqual((cost.memory, cost.mac), (table_cost.memory, table_cost.mac))
+
+
 class TestTrainingExtensionsWeightSvdCostCalculator(unittest.TestCase):
 
     def test_calculate_weight_svd_cost(self):
@@ -230,6 +230,72 @@ class TestDataSubSampler(unittest.TestCase):
         # compare data of first batch only
         self.assertTrue(np.array_equal(fc1_input_data[0:10], fc1_input))
 
+    def test_sub_sampled_data_with_orig_layers_output_data_cache(self):
+        """
+        Test that sub sampled data of many layers, with original model output data collected in a single pass, is the
+        same as sub sampled data collected layer by layer
+        """
+        orig_model = TestNet()
+        orig_model.eval()
+        comp_model = copy.deepcopy(orig_model)
+
+        data_loader = create_fake_data_loader(dataset_size=40, batch_size=4, image_size=(1, 28, 28))
+        num_reconstruction_samples = 320
+
+        fc2_forward_pass_count = []
+        handle = orig_model.fc2.register_forward_hook(lambda *_: fc2_forward_pass_count.append(1))
+
+        # (32, 1, 28, 28) batches of 100352 bytes are spilled
+        np.random.seed(0)
+        data_cache = DataSubSampler.collect_orig_layers_output_data([orig_model.conv2, orig_model.fc1], orig_model,
+                                                                    data_loader, num_reconstruction_samples,
+                                                                    memory_budget=50000)
+        handle.remove()
+
+        # forward passes stop at fc1, and conv2 needs 8 batches while fc1 needs only 1
+        self.assertFalse(fc2_forward_pass_count)
+        self.assertEqual(8, len(data_cache.batches))
+        self.assertEqual(8, len(data_cache.layers_output_data[orig_model.conv2]))
+        self.assertEqual(1, len(data_cache.layers_output_data[orig_model.fc1]))
+
+        # only the sampled output pixels of conv2 are kept
+        sub_sampled_out_data, _ = data_cache.layers_output_data[orig_model.conv2][0]
+        self.assertEqual((40, 10), sub_sampled_out_data.shape)
+
+        for orig_layer, pruned_layer in [(orig_model.conv2, comp_model.conv2), (orig_model.fc1, comp_model.fc1)]:
+            # the output pixels of the uncached run are sampled in the same order as during the cache collection
+            np.random.seed(0)
+            inp_data, out_data = DataSubSampler.get_sub_sampled_data(orig_layer, pruned_layer, orig_model,
+                                                                     comp_model, data_loader,
+                                                                     num_reconstruction_samples)
+            cached_inp_data, cached_out_data = DataSubSampler.get_sub_sampled_data(orig_layer, pruned_layer,
+                                                                                   orig_model, comp_model,
+                                                                                   data_loader,
+                                                                                   num_reconstruction_samples,
+                                                                                   data_cache)
+            self.assertTrue(np.array_equal(inp_data, cached_inp_data))
+            self.assertTrue(np.array_equal(out_data, cached_out_data))
+
+    def test_collect_orig_layers_output_data_with_unreached_layer(self):
+        """
+        Test that collecting the output data of a layer not reached in the forward pass raises a descriptive error
+        """
+        orig_model = TestNet()
+        orig_model.eval()
+        unused_layer = nn.Conv2d(5, 10, kernel_size=5)
+        orig_model.add_module('unused', unused_layer)
+
+        data_loader = create_fake_data_loader(dataset_size=40, batch_size=4, image_size=(1, 28, 28))
+
+        with self.assertRaises(ValueError) as context:
+            DataSubSampler.collect_orig_layers_output_data([orig_model.conv2, unused_layer], orig_model, data_loader,
+                                                           320)
+        self.assertIn('unused', str(context.exception))
+
+        # hooks are removed
+        self.assertFalse(unused_layer._forward_hooks)
+        self.assertFalse(orig_model.conv2._forward_hooks)
+
     def test_forward_pass_with_single_input(self):
         """
         test _forward_pass of DataSubsampler with single input
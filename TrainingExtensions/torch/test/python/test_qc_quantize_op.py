@@ -36,12 +36,17 @@
 #  @@-COPYRIGHT-END-@@
 # =============================================================================
 
+import pickle
 import unittest
 
 import torch
 from torch import nn
 
 from aimet_torch.qc_quantize_op import QcPostTrainingWrapper, QcQuantizeOpMode
+from aimet_torch.tensor_quantizer import PerChannelPostTrainingTensorQuantizer
+from aimet_torch.winnow.winnow_utils import zero_out_input_channels
+
+import libpymo
 
 
 class TestQcQuantizeOp(unittest.TestCase):
@@ -88,3 +93,288 @@ class TestQcQuantizeOp(unittest.TestCase):
 
         quantize.set_mode(QcQuantizeOpMode.ACTIVE)
         output = quantize.forward(input_var)
+
+    def test_quantize_dequantize_out_of_place(self):
+
+        torch.manual_seed(0)
+        quantize = QcPostTrainingWrapper(torch.nn.Conv2d(4, 4, 1), weight_bw=8, activation_bw=8,
+                                         round_mode='nearest', quant_scheme='tf')
+        quantizer = quantize.output_quantizer
+        input_var = torch.randn(4, 4, 8, 8)
+        quantizer.update_encoding_stats(input_var)
+        quantizer.compute_encoding()
+        round_mode = libpymo.RoundingMode.ROUND_NEAREST
+
+        # The input is left untouched, and strided inputs give the same result as contiguous ones
+        input_before = input_var.clone()
+        output = quantizer.quantize_dequantize(input_var, round_mode)
+        self.assertTrue(torch.equal(input_before, input_var))
+        self.assertFalse(torch.equal(input_var, output))
+        transposed_output = quantizer.quantize_dequantize(input_var.transpose(1, 3), round_mode)
+        self.assertTrue(torch.equal(output.transpose(1, 3), transposed_output))
+
+        # Results can be written to a preallocated buffer, or in place
+        out = torch.empty_like(input_var)
+        self.assertIs(out, quantizer.quantize_dequantize(input_var, round_mode, out=out))
+        self.assertTrue(torch.equal(output, out))
+        quantizer.quantize_dequantize(input_var, round_mode, out=input_var)
+        self.assertTrue(torch.equal(output, input_var))
+
+        # Gradients pass straight through
+        input_var = input_before.clone().requires_grad_()
+        quantizer.quantize_dequantize(input_var, round_mode).sum().backward()
+        self.assertTrue(torch.equal(torch.ones_like(input_var), input_var.grad))
+
+    def test_cached_quantized_params_in_inference_mode(self):
+
+        torch.manual_seed(0)
+        conv1 = torch.nn.Conv2d(4, 4, 3)
+        quantize = QcPostTrainingWrapper(conv1, weight_bw=8, activation_bw=8, round_mode='nearest',
+                                         quant_scheme='tf_enhanced')
+        quantize.eval()
+        input_var = torch.randn(4, 4, 8, 8)
+
+        quantize.set_mode(QcQuantizeOpMode.ANALYSIS)
+        with torch.no_grad():
+            quantize(input_var)
+        quantize.compute_encoding()
+        quantize.set_mode(QcQuantizeOpMode.ACTIVE)
+
+        # Output computed via shadow-params path, with gradients enabled
+        expected_output = quantize(input_var)
+        weight_before = conv1.weight.detach().clone()
+
+        # Output computed via cached quantized params
+        with torch.no_grad():
+            output = quantize(input_var)
+        self.assertTrue(torch.allclose(expected_output, output))
+        self.assertTrue(torch.equal(weight_before, conv1.weight))
+        weight_quantizer = quantize.param_quantizers['weight']
+        self.assertIsNotNone(weight_quantizer._quantized_param)
+
+        # Cache gets reused while the weights do not change
+        cached_weight = weight_quantizer._quantized_param
+        with torch.no_grad():
+            quantize(input_var)
+        self.assertIs(cached_weight, weight_quantizer._quantized_param)
+
+        # Changing the weights in-place invalidates the cache
+        with torch.no_grad():
+            conv1.weight.mul_(0.5)
+            quantize(input_var)
+        self.assertIsNot(cached_weight, weight_quantizer._quantized_param)
+
+        # Zeroing out input channels invalidates the cache
+        cached_weight = weight_quantizer._quantized_param
+        zero_out_input_channels(conv1, [0, 1])
+        with torch.no_grad():
+            quantize(input_var)
+        self.assertIsNot(cached_weight, weight_quantizer._quantized_param)
+        self.assertTrue(torch.equal(weight_quantizer._quantized_param[:, :2], torch.zeros(4, 2, 3, 3)))
+
+        # Assigning new weights invalidates the cache
+        cached_weight = weight_quantizer._quantized_param
+        conv1.weight.data = conv1.weight.detach() * 2
+        with torch.no_grad():
+            quantize(input_var)
+        self.assertIsNot(cached_weight, weight_quantizer._quantized_param)
+
+        # Changing the encoding invalidates the cache
+        cached_weight = weight_quantizer._quantized_param
+        weight_quantizer.encoding = None
+        with torch.no_grad():
+            quantize(input_var)
+        self.assertIsNot(cached_weight, weight_quantizer._quantized_param)
+
+    def test_shadow_params_restored_without_copy(self):
+
+        torch.manual_seed(0)
+        bn = torch.nn.BatchNorm2d(4)
+        bn.weight.data.uniform_(0.5, 1.5)
+        quantize = QcPostTrainingWrapper(bn, weight_bw=4, activation_bw=8, round_mode='nearest',
+                                         quant_scheme='tf_enhanced')
+        quantize.eval()
+        input_var = torch.randn(4, 4, 8, 8)
+        weight_before = bn.weight.detach().clone()
+        weight_storage = bn.weight.data_ptr()
+
+        output = quantize(input_var)
+        self.assertTrue(torch.equal(weight_before, bn.weight))
+        self.assertEqual(weight_storage, bn.weight.data_ptr())
+
+        # Quantized weight was used in the forward pass, and is reused in the next pass
+        quantized_weight = quantize.param_quantizers['weight']._quantized_param
+        self.assertFalse(torch.equal(weight_before, quantized_weight))
+        self.assertTrue(torch.equal(output, quantize(input_var)))
+        self.assertIs(quantized_weight, quantize.param_quantizers['weight']._quantized_param)
+
+    def test_hooks_of_wrapped_module_run_in_inference_mode(self):
+
+        torch.manual_seed(0)
+        conv1 = torch.nn.Conv2d(4, 4, 3)
+        hook_calls = []
+        conv1.register_forward_pre_hook(lambda *_: hook_calls.append('forward_pre'))
+        conv1.register_forward_hook(lambda *_: hook_calls.append('forward'))
+        quantize = QcPostTrainingWrapper(conv1, weight_bw=8, activation_bw=8, round_mode='nearest',
+                                         quant_scheme='tf_enhanced')
+        quantize.eval()
+
+        with torch.no_grad():
+            quantize(torch.randn(4, 4, 8, 8))
+        self.assertEqual(['forward_pre', 'forward'], hook_calls)
+
+    def test_weight_norm_module_in_inference_mode(self):
+
+        torch.manual_seed(0)
+        conv1 = torch.nn.utils.weight_norm(torch.nn.Conv2d(4, 4, 3))
+        quantize = QcPostTrainingWrapper(conv1, weight_bw=8, activation_bw=8, round_mode='nearest',
+                                         quant_scheme='tf_enhanced')
+        quantize.eval()
+        input_var = torch.randn(4, 4, 8, 8)
+
+        quantize.set_mode(QcQuantizeOpMode.ANALYSIS)
+        with torch.no_grad():
+            quantize(input_var)
+        quantize.compute_encoding()
+        quantize.set_mode(QcQuantizeOpMode.ACTIVE)
+
+        # Output in inference mode matches the output with gradients enabled
+        expected_output = quantize(input_var)
+        with torch.no_grad():
+            output = quantize(input_var)
+        self.assertTrue(torch.allclose(expected_output, output))
+
+    def test_per_channel_weight_quantization(self):
+
+        torch.manual_seed(0)
+        conv1 = torch.nn.Conv2d(3, 4, 3)
+        channel_scales = torch.tensor([0.01, 0.1, 1.0, 10.0])
+        conv1.weight.data *= channel_scales.view(-1, 1, 1, 1)
+        quantize = QcPostTrainingWrapper(conv1, weight_bw=8, activation_bw=8, round_mode='nearest',
+                                         quant_scheme='tf', per_channel_quantization=True)
+        quantize.eval()
+        input_var = torch.randn(2, 3, 8, 8)
+
+        weight_quantizer = quantize.param_quantizers['weight']
+        self.assertIsInstance(weight_quantizer, PerChannelPostTrainingTensorQuantizer)
+        self.assertNotIsInstance(quantize.param_quantizers['bias'], PerChannelPostTrainingTensorQuantizer)
+
+        quantize.set_mode(QcQuantizeOpMode.ANALYSIS)
+        with torch.no_grad():
+            quantize(input_var)
+        quantize.compute_encoding()
+        quantize.set_mode(QcQuantizeOpMode.ACTIVE)
+
+        # One encoding per output channel, each covering the range of its channel up to the zero-point adjustment
+        self.assertEqual(4, len(weight_quantizer.encoding))
+        for channel, encoding in enumerate(weight_quantizer.encoding):
+            channel_weight = conv1.weight[channel]
+            self.assertLessEqual(encoding.min, channel_weight.min().item() + encoding.delta)
+            self.assertGreaterEqual(encoding.max, channel_weight.max().item() - encoding.delta)
+            self.assertLess(encoding.delta, channel_scales[channel].item())
+
+        # Every channel is quantized to its own grid, so small channels keep their precision
+        quantized_weight = weight_quantizer.quantize_dequantize_param(conv1.weight, weight_quantizer.round_mode,
+                                                                      use_cache=False)
+        for channel, encoding in enumerate(weight_quantizer.encoding):
+            error = (quantized_weight[channel] - conv1.weight[channel]).abs().max().item()
+            self.assertLessEqual(error, encoding.delta / 2 + 1e-6)
+
+        # Quantized weights are used in the forward pass, and the original weights are left untouched
+        weight_before = conv1.weight.detach().clone()
+        with torch.no_grad():
+            output = quantize(input_var)
+            expected_output = torch.nn.functional.conv2d(input_var, quantized_weight, conv1.bias)
+            expected_output = quantize.output_quantizer.quantize_dequantize(expected_output,
+                                                                            weight_quantizer.round_mode)
+        self.assertTrue(torch.allclose(expected_output, output))
+        self.assertTrue(torch.equal(weight_before, conv1.weight))
+
+        # Encodings survive pickling
+        unpickled_quantizer = pickle.loads(pickle.dumps(weight_quantizer))
+        self.assertEqual([(encoding.min, encoding.max) for encoding in weight_quantizer.encoding],
+                         [(encoding.min, encoding.max) for encoding in unpickled_quantizer.encoding])
+
+    def test_per_channel_quantize_dequantize_round_mode(self):
+
+        torch.manual_seed(0)
+        quantizer = PerChannelPostTrainingTensorQuantizer(bitwidth=4, round_mode='nearest',
+                                                          quant_scheme=libpymo.QuantizationMode.QUANTIZATION_TF,
+                                                          use_symmetric_encodings=False, enabled_by_default=True,
+                                                          channel_axis=0)
+        weight = torch.randn(4, 3, 3, 3) * torch.tensor([0.1, 1.0, 2.0, 4.0]).view(-1, 1, 1, 1)
+        quantizer.update_encoding_stats(weight)
+        quantizer.compute_encoding()
+        deltas = torch.tensor([encoding.delta for encoding in quantizer.encoding]).view(-1, 1, 1, 1)
+
+        nearest = quantizer.quantize_dequantize(weight, libpymo.RoundingMode.ROUND_NEAREST)
+        self.assertTrue(torch.all((nearest - weight).abs() <= deltas / 2 + 1e-6))
+
+        # Stochastic rounding picks one of the two neighbouring grid points, and differs from nearest rounding
+        stochastic = quantizer.quantize_dequantize(weight, libpymo.RoundingMode.ROUND_STOCHASTIC)
+        self.assertTrue(torch.all((stochastic - weight).abs() <= deltas + 1e-6))
+        self.assertTrue(torch.allclose(stochastic / deltas, torch.round(stochastic / deltas), atol=1e-4))
+        self.assertFalse(torch.equal(nearest, stochastic))
+
+        with self.assertRaises(ValueError):
+            quantizer.quantize_dequantize(weight, 'unknown')
+
+        # Gradients pass straight through
+        weight.requires_grad_()
+        quantizer.quantize_dequantize(weight, libpymo.RoundingMode.ROUND_NEAREST).sum().backward()
+        self.assertTrue(torch.equal(torch.ones_like(weight), weight.grad))
+
+    def test_per_channel_encoding_stats(self):
+
+        def create_quantizer():
+            return PerChannelPostTrainingTensorQuantizer(bitwidth=8, round_mode='nearest',
+                                                         quant_scheme=libpymo.QuantizationMode.QUANTIZATION_TF,
+                                                         use_symmetric_encodings=False, enabled_by_default=True,
+                                                         channel_axis=0)
+
+        def get_encodings(quantizer):
+            quantizer.compute_encoding()
+            return [(encoding.min, encoding.max) for encoding in quantizer.encoding]
+
+        torch.manual_seed(0)
+        shards = [torch.randn(4, 3, 3, 3) * scale for scale in (0.5, 2.0)]
+
+        expected_quantizer = create_quantizer()
+        for shard in shards:
+            expected_quantizer.update_encoding_stats(shard)
+
+        # Stats of the shards collected separately are saved, restored and merged per channel
+        shard_stats = []
+        for shard in shards:
+            shard_quantizer = create_quantizer()
+            self.assertEqual([], shard_quantizer.get_stats())
+            shard_quantizer.update_encoding_stats(shard)
+            shard_stats.append(shard_quantizer.get_stats())
+
+        merged_quantizer = create_quantizer()
+        merged_quantizer.set_stats(shard_stats[0])
+        merged_quantizer.merge_stats(shard_stats[1])
+        self.assertEqual(get_encodings(expected_quantizer), get_encodings(merged_quantizer))
+
+        merged_quantizer = create_quantizer()
+        for stats in shard_stats:
+            merged_quantizer.merge_stats(stats)
+        self.assertEqual(get_encodings(expected_quantizer), get_encodings(merged_quantizer))
+
+        # Stats of a tensor with a different number of channels are rejected
+        other_quantizer = create_quantizer()
+        other_quantizer.update_encoding_stats(torch.randn(5, 3, 3, 3))
+        with self.assertRaises(ValueError):
+            merged_quantizer.merge_stats(other_quantizer.get_stats())
+
+    def test_per_channel_weight_quantization_transposed_conv(self):
+
+        conv1 = torch.nn.ConvTranspose2d(3, 5, 3)
+        quantize = QcPostTrainingWrapper(conv1, weight_bw=8, activation_bw=8, round_mode='nearest',
+                                         quant_scheme='tf_enhanced', per_channel_quantization=True)
+        quantize.set_mode(QcQuantizeOpMode.ANALYSIS)
+        with torch.no_grad():
+            quantize(torch.randn(2, 3, 8, 8))
+
+        # Output channels of transposed convolutions are laid out along axis 1 of the weight
+        self.assertEqual(5, len(quantize.param_quantizers['weight'].encoding))
@@ -36,7 +36,10 @@
 #  @@-COPYRIGHT-END-@@
 # =============================================================================
 
+import os
+import tempfile
 import unittest
+import unittest.mock
 import numpy as np
 import torch
 import torch.nn as nn
@@ -44,10 +47,13 @@ import torch.nn.functional as F
 import json as json
 from aimet_common.defs import QuantScheme
 
-from aimet_torch.quantsim import QuantizationSimModel
+from aimet_torch.quantsim import QuantizationSimModel, save_calibration_stats, load_calibration_stats, \
+    save_checkpoint, load_checkpoint
 from aimet_torch.defs import PassThroughOp
 from aimet_torch.qc_quantize_op import QcQuantizeWrapper, QcQuantizeStandalone, MAP_ROUND_MODE_TO_PYMO, \
-    MAP_QUANT_SCHEME_TO_PYMO, QcPostTrainingWrapper
+    MAP_QUANT_SCHEME_TO_PYMO, QcPostTrainingWrapper, QcQuantizeOpMode
+from aimet_torch.tensor_quantizer import PerChannelPostTrainingTensorQuantizer
+from aimet_torch.utils import create_fake_data_loader
 from aimet_common.utils import AimetLogger
 
 import libpymo
@@ -944,6 +950,197 @@ class TestQuantizationSim(unittest.TestCase):
         self.assertEqual(16, sim.model.conv1.output_quantizer.bitwidth)
         self.assertEqual(8, sim.model.conv2.output_quantizer.bitwidth)
 
+    # -------------------------------------------
+    def test_compute_encodings_with_stats_threads(self):
+        """ Encodings computed with background stats threads match those computed synchronously """
+        torch.manual_seed(0)
+        model = SmallMnistNoDropout()
+        inputs = [torch.randn((8, 1, 28, 28)) for _ in range(3)]
+
+        def forward_pass(model, _):
+            for inp in inputs:
+                model(inp)
+
+        sim = QuantizationSimModel(model, quant_scheme='tf')
+        sim.compute_encodings(forward_pass, None)
+
+        threaded_sim = QuantizationSimModel(model, quant_scheme='tf')
+        threaded_sim.compute_encodings(forward_pass, None, num_stats_threads=4)
+
+        for name, layer in sim.model.named_modules():
+            if isinstance(layer, QcQuantizeWrapper):
+                threaded_layer = dict(threaded_sim.model.named_modules())[name]
+                self.assertIsNone(threaded_layer._stats_collector)
+                self.assertEqual(layer.output_quantizer.encoding.min, threaded_layer.output_quantizer.encoding.min)
+                self.assertEqual(layer.output_quantizer.encoding.max, threaded_layer.output_quantizer.encoding.max)
+
+    # -------------------------------------------
+    def test_incremental_calibration_across_shards(self):
+        """ Calibrating on shards of the data and merging the stats matches calibrating on all the data at once """
+        torch.manual_seed(0)
+        model = SmallMnistNoDropout()
+        inputs = [torch.randn((8, 1, 28, 28)) for _ in range(4)]
+
+        def forward_pass(model, _):
+            for inp in inputs:
+                model(inp)
+
+        sim = QuantizationSimModel(model, quant_scheme='tf')
+        sim.compute_encodings(forward_pass, None)
+
+        with self.assertRaises(RuntimeError):
+            QuantizationSimModel(model, quant_scheme='tf').feed(inputs[0])
+
+        # Calibrate two shards separately, and save the stats of one of them
+        shard_stats = []
+        for shard in (inputs[:2], inputs[2:]):
+            shard_sim = QuantizationSimModel(model, quant_scheme='tf')
+            shard_sim.begin_calibration()
+            for inp in shard:
+                shard_sim.feed(inp)
+            shard_stats.append(shard_sim.get_calibration_stats())
+
+        save_calibration_stats(shard_stats[1], './data/calibration_stats.json')
+
+        # Resume from the first shard, and merge in the second one
+        merged_sim = QuantizationSimModel(model, quant_scheme='tf')
+        merged_sim.begin_calibration(shard_stats[0])
+        merged_sim.merge_calibration_stats(load_calibration_stats('./data/calibration_stats.json'))
+        merged_sim.finalize_calibration()
+
+        for name, layer in sim.model.named_modules():
+            if isinstance(layer, QcQuantizeWrapper):
+                merged_layer = dict(merged_sim.model.named_modules())[name]
+                self.assertEqual(layer.output_quantizer.encoding.min, merged_layer.output_quantizer.encoding.min)
+                self.assertEqual(layer.output_quantizer.encoding.max, merged_layer.output_quantizer.encoding.max)
+
+        # try one forward pass
+        dummy_forward_pass(merged_sim.model, None)
+
+    # -------------------------------------------
+    def test_compute_encodings_distributed(self):
+        """ Encodings computed in worker processes match those computed in a single process """
+        torch.manual_seed(0)
+        model = SmallMnistNoDropout()
+        data_loader = create_fake_data_loader(dataset_size=64, batch_size=16)
+
+        def forward_pass(model, _):
+            for images, _ in data_loader:
+                model(images)
+
+        sim = QuantizationSimModel(model, quant_scheme='tf')
+        sim.compute_encodings(forward_pass, None)
+
+        distributed_sim = QuantizationSimModel(model, quant_scheme='tf')
+        distributed_sim.compute_encodings_distributed(data_loader, num_workers=2)
+
+        for name, layer in sim.model.named_modules():
+            if isinstance(layer, QcQuantizeWrapper):
+                distributed_layer = dict(distributed_sim.model.named_modules())[name]
+                self.assertEqual(QcQuantizeOpMode.ACTIVE, distributed_layer._mode)
+                self.assertAlmostEqual(layer.output_quantizer.encoding.min,
+                                       distributed_layer.output_quantizer.encoding.min, places=5)
+                self.assertAlmostEqual(layer.output_quantizer.encoding.max,
+                                       distributed_layer.output_quantizer.encoding.max, places=5)
+
+    def test_compute_encodings_distributed_with_dead_worker(self):
+        """ An error is raised instead of waiting forever when a worker process dies """
+        sim = QuantizationSimModel(SmallMnistNoDropout(), quant_scheme='tf')
+        data_loader = create_fake_data_loader(dataset_size=64, batch_size=16)
+
+        def dying_worker(*_):
+            os._exit(1)
+
+        with unittest.mock.patch('aimet_torch.quantsim._run_calibration_worker', dying_worker), \
+                unittest.mock.patch('aimet_torch.quantsim.WORKER_POLL_INTERVAL_SECS', 0.1):
+            with self.assertRaises(RuntimeError):
+                sim.compute_encodings_distributed(data_loader, num_workers=1)
+
+    def test_per_channel_weight_quantization(self):
+        """ Weights of conv and linear layers get per-channel encodings, which are exported as lists """
+        torch.manual_seed(0)
+        sim = QuantizationSimModel(SmallMnistNoDropout(), quant_scheme='tf', per_channel_quantization=True)
+        sim.compute_encodings(dummy_forward_pass, None)
+
+        for layer, num_channels in ((sim.model.conv1, 10), (sim.model.conv2, 20), (sim.model.fc1, 50)):
+            weight_quantizer = layer.param_quantizers['weight']
+            self.assertIsInstance(weight_quantizer, PerChannelPostTrainingTensorQuantizer)
+            self.assertEqual(num_channels, len(weight_quantizer.encoding))
+
+        dummy_forward_pass(sim.model, None)
+
+        activation_encodings = {}
+        param_encodings = {}
+        QuantizationSimModel._update_encoding_dicts_for_layer(sim.model.conv1, 'conv1', activation_encodings,
+                                                              param_encodings)
+        self.assertEqual(10, len(param_encodings['conv1.weight']))
+        self.assertEqual(sim.model.conv1.param_quantizers['weight'].encoding[3].max,
+                         param_encodings['conv1.weight'][3]['max'])
+        self.assertNotIn('conv1.bias', param_encodings)
+        self.assertIsInstance(activation_encodings['conv1']['output'], dict)
+
+    def test_profiling(self):
+        """ Wrappers and tensor quantizers record to the profiler only while profiling is enabled """
+        torch.manual_seed(0)
+        sim = QuantizationSimModel(SmallMnistNoDropout())
+        sim.compute_encodings(dummy_forward_pass, None)
+
+        profiler = sim.enable_profiling()
+        dummy_forward_pass(sim.model, None)
+        dummy_forward_pass(sim.model, None)
+        summary = profiler.get_summary()
+
+        self.assertEqual(2, summary[('conv1', 'forward')]['calls'])
+        self.assertEqual(2, summary[('conv1', 'wrapped_forward')]['calls'])
+        self.assertEqual(2, summary[('fc2.output_quantizer', 'quantize_dequantize')]['calls'])
+        conv1_input_bytes = 32 * 1 * 28 * 28 * 4
+        conv1_output_bytes = 32 * 10 * 24 * 24 * 4
+        self.assertEqual(2 * conv1_output_bytes, summary[('conv1.output_quantizer', 'quantize_dequantize')]['bytes'])
+        self.assertEqual(2 * (conv1_input_bytes + conv1_output_bytes), summary[('conv1', 'forward')]['bytes'])
+        self.assertGreater(summary[('conv1', 'forward')]['total_time'],
+                           summary[('conv1', 'wrapped_forward')]['total_time'])
+        self.assertIn('conv1.output_quantizer', profiler.get_table())
+        self.assertEqual(3, len(profiler.get_table(sort_by='calls', limit=2).splitlines()))
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            trace_path = os.path.join(output_dir, 'trace.json')
+            profiler.export_chrome_trace(trace_path)
+            with open(trace_path) as trace_fp:
+                trace = json.load(trace_fp)
+        self.assertEqual(sum(event['calls'] for event in summary.values()), len(trace['traceEvents']))
+
+        # The profiler is not saved in checkpoints
+        with tempfile.TemporaryDirectory() as output_dir:
+            checkpoint_path = os.path.join(output_dir, 'checkpoint')
+            save_checkpoint(sim, checkpoint_path)
+            self.assertIsNone(load_checkpoint(checkpoint_path).model.conv1._profiler)
+
+        sim.disable_profiling()
+        dummy_forward_pass(sim.model, None)
+        self.assertEqual(summary, profiler.get_summary())
+
+    def test_load_checkpoint_without_profiling_attributes(self):
+        """ Checkpoints saved before profiling and async stats collection were added can be loaded and used """
+        torch.manual_seed(0)
+        sim = QuantizationSimModel(ModelWithStandaloneOps())
+        sim.compute_encodings(dummy_forward_pass, None)
+        dummy_input = torch.randn((32, 1, 28, 28))
+        output_before_save = sim.model(dummy_input)
+
+        # Mimic ops of an old checkpoint
+        for module in sim.model.modules():
+            if isinstance(module, (QcQuantizeWrapper, QcQuantizeStandalone)):
+                for name in ('_profiler', '_profiling_name', '_stats_collector'):
+                    module.__dict__.pop(name, None)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            checkpoint_path = os.path.join(output_dir, 'checkpoint')
+            save_checkpoint(sim, checkpoint_path)
+            loaded_sim = load_checkpoint(checkpoint_path)
+
+        self.assertIsNone(loaded_sim.model.conv1._stats_collector)
+        self.assertTrue(torch.equal(output_before_save, loaded_sim.model(dummy_input)))
+
     # -------------------------------------------
     def test_with_standalone_ops(self):
 
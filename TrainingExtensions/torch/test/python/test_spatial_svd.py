@@ -38,6 +38,7 @@
 
 import numpy as np
 import unittest
+import unittest.mock
 import copy
 from decimal import Decimal
 
@@ -51,6 +52,7 @@ from aimet_torch.svd.svd_splitter import SpatialSvdModuleSplitter
 from aimet_torch.svd.svd_pruner import SpatialSvdPruner
 from aimet_torch.layer_database import Layer, LayerDatabase
 from aimet_common.defs import CostMetric, LayerCompRatioPair
+from aimet_common.svd_pruner import SvdFactorizationCache
 
 
 def get_data_loader(data_set_size, batch_size=1):
@@ -163,6 +165,29 @@ class TestSpatialSvdLayerSplit(unittest.TestCase):
 
         assert np.allclose(new_output.detach(), output_data, atol=1e-5)
 
+    def test_split_layer_with_svd_cache(self):
+        model = _TestNet()
+        layer = model.conv2
+        svd_cache = SvdFactorizationCache()
+
+        with unittest.mock.patch('numpy.linalg.svd', wraps=np.linalg.svd) as svd:
+            for rank in [100, 60, 20]:
+                first_layer, second_layer = SpatialSvdModuleSplitter.split_module(module=layer, rank=rank)
+                cached_first_layer, cached_second_layer = SpatialSvdModuleSplitter.split_module(module=layer,
+                                                                                                rank=rank,
+                                                                                                svd_cache=svd_cache)
+
+                self.assertTrue(torch.equal(first_layer.weight, cached_first_layer.weight))
+                self.assertTrue(torch.equal(second_layer.weight, cached_second_layer.weight))
+
+            # One SVD for each uncached split, and a single SVD shared by all the cached splits
+            self.assertEqual(3 + 1, svd.call_count)
+
+            # A layer with modified weights is factorized again
+            layer.weight.data[:, 0] = 0
+            SpatialSvdModuleSplitter.split_module(module=layer, rank=20, svd_cache=svd_cache)
+            self.assertEqual(3 + 2, svd.call_count)
+
 
 class TestSpatialSvdPruning(unittest.TestCase):
 
@@ -255,3 +280,81 @@ class TestSpatialSvdPruning(unittest.TestCase):
             print("   Module: " + str(layer.module))
 
         print(layer_db.model)
+
+    def test_prune_model_reuses_svd_factorizations(self):
+
+        model = mnist_torch_model.Net()
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        conv2 = layer_db.find_layer_by_name('conv2')
+        pruner = SpatialSvdPruner()
+
+        with unittest.mock.patch('numpy.linalg.svd', wraps=np.linalg.svd) as svd:
+            for comp_ratio in [Decimal('0.8'), Decimal('0.5'), Decimal('0.2')]:
+                with pruner.patch_model(layer_db, conv2, comp_ratio, CostMetric.mac):
+                    pass
+
+            pruned_layer_db = pruner.prune_model(layer_db, [LayerCompRatioPair(conv2, Decimal('0.5'))],
+                                                 CostMetric.mac, trainer=None)
+
+        # Candidates and the final (copied) model share the factorization of conv2
+        self.assertEqual(1, svd.call_count)
+        self.assertTrue(isinstance(pruned_layer_db.model.conv2, torch.nn.Sequential))
+
+    def test_patch_model(self):
+
+        model = mnist_torch_model.Net().eval()
+
+        # Create a layer database
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        conv2 = layer_db.find_layer_by_name('conv2')
+        pruner = SpatialSvdPruner()
+
+        pruned_layer_db = pruner.prune_model(layer_db, [LayerCompRatioPair(conv2, Decimal(0.5))], CostMetric.mac,
+                                             trainer=None)
+
+        inp = torch.rand(1, 1, 28, 28)
+        orig_output = model(inp)
+
+        with pruner.patch_model(layer_db, conv2, Decimal(0.5), CostMetric.mac) as pruned_model:
+            # The shared model is patched, not copied
+            self.assertIs(model, pruned_model)
+            self.assertTrue(isinstance(model.conv2, torch.nn.Sequential))
+            self.assertEqual(53, model.conv2[0].out_channels)
+            self.assertTrue(torch.allclose(pruned_layer_db.model(inp), pruned_model(inp), atol=1e-6))
+
+        # Original module is restored
+        self.assertIs(conv2.module, model.conv2)
+        self.assertEqual(list(layer_db), list(layer_db.get_compressible_layers().values()))
+        self.assertTrue(torch.equal(orig_output, model(inp)))
+
+        # Module is restored even if the evaluation raises
+        with self.assertRaises(RuntimeError):
+            with pruner.patch_model(layer_db, conv2, Decimal(0.5), CostMetric.mac):
+                raise RuntimeError
+        self.assertIs(conv2.module, model.conv2)
+
+    def test_patch_model_restores_model_state(self):
+
+        model = torch.nn.Sequential(torch.nn.Conv2d(1, 10, kernel_size=3), torch.nn.BatchNorm2d(10),
+                                    torch.nn.ReLU(), torch.nn.Conv2d(10, 20, kernel_size=3)).eval()
+
+        # Create a layer database
+        layer_db = LayerDatabase(model, input_shape=(1, 1, 28, 28))
+        conv = layer_db.find_layer_by_name('3')
+        pruner = SpatialSvdPruner()
+
+        inp = torch.rand(2, 1, 28, 28)
+        orig_output = model(inp)
+        orig_bias = model[3].bias.detach().clone()
+
+        with pruner.patch_model(layer_db, conv, Decimal(0.5), CostMetric.mac) as pruned_model:
+            # An eval function changing the mode, the BatchNorm statistics, the hooks and the bias of the split layer
+            pruned_model.train()
+            pruned_model[0].register_forward_hook(lambda *_: None)
+            pruned_model(inp)
+            pruned_model[3][1].bias.data.add_(1.0)
+
+        self.assertFalse(any(module.training for module in model.modules()))
+        self.assertFalse(model[0]._forward_hooks)
+        self.assertTrue(torch.equal(orig_bias, model[3].bias))
+        self.assertTrue(torch.equal(orig_output, model(inp)))
@@ -36,12 +36,13 @@
 #  @@-COPYRIGHT-END-@@
 # =============================================================================
 
+import threading
 import unittest.mock
 
 import torch
 import torchvision
 
-from aimet_common.utils import round_up_to_multiplicity, round_down_to_multiplicity
+from aimet_common.utils import round_up_to_multiplicity, round_down_to_multiplicity, ordered_parallel_map
 from aimet_torch.utils import replace_modules_of_type1_with_type2, replace_modules_with_instances_of_new_type, \
     get_ordered_list_of_modules, get_ordered_list_of_conv_modules, get_reused_modules, change_tensor_device_placement
 from aimet_torch.defs import PassThroughOp
@@ -99,6 +100,19 @@ class TestTrainingExtensionsUtils(unittest.TestCase):
             x = torch.rand(1, 3, 224, 224)
             output = model(x)
 
+    def test_ordered_parallel_map(self):
+        def grad_mode_and_thread(item):
+            return item, torch.is_grad_enabled(), threading.get_ident()
+
+        # A single worker maps the items in the calling thread, keeping its grad mode
+        with torch.no_grad():
+            results = list(ordered_parallel_map(grad_mode_and_thread, range(4), num_workers=1))
+        self.assertEqual([(item, False, threading.get_ident()) for item in range(4)], results)
+
+        # Several workers yield results in the order of the items
+        results = list(ordered_parallel_map(lambda item: item * 2, range(10), num_workers=3))
+        self.assertEqual([item * 2 for item in range(10)], results)
+
     def test_get_ordered_ops(self):
         model = torchvision.models.resnet18(pretrained=False)
         model.eval()
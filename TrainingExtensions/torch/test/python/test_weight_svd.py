@@ -37,10 +37,12 @@
 # =============================================================================
 
 import unittest
+import unittest.mock
 from unittest.mock import create_autospec
 import logging
 from decimal import Decimal
 
+import torch
 import torch.nn as nn
 import torch.nn.functional as functional
 import numpy as np
@@ -59,7 +61,9 @@ from aimet_torch.svd import svd_pruner_deprecated
 from aimet_torch.svd import rank_selector as rank_select
 from aimet_common import cost_calculator as cc
 from aimet_common.defs import LayerCompRatioPair
+from aimet_common import svd_pruner as svd_pruner_common
 from aimet_torch.svd.svd_pruner import WeightSvdPruner
+from aimet_torch.svd.svd_splitter import WeightSvdModuleSplitter
 
 logger = AimetLogger.get_area_logger(AimetLogger.LogAreas.Test)
 
@@ -516,6 +520,53 @@ class TestTrainingExtensionsSvd(unittest.TestCase):
                                                    use_cuda=False, metric=aimet_torch.svd.svd_intf_defs_deprecated.CostMetric.memory, error_margin=1,
                                                    baseline_perf=0.5, num_rank_indices=20, database=layer_database)
 
+    def test_choose_best_ranks_in_parallel(self):
+
+        model = MnistModel().to("cpu")
+        layer_database = LayerDatabase(model=model, input_shape=(1, 1, 28, 28))
+        layer_database.mark_picked_layers([layer_database.find_layer_by_module(model.conv2),
+                                           layer_database.find_layer_by_module(model.fc1)])
+
+        svd_lib_ref = create_autospec(pymo.Svd, instance=True)
+        svd_lib_ref.GetCandidateRanks.side_effect = lambda layer_name, rank_index: [rank_index + 1]
+
+        # Stand-in compressed model is the rank index. Performance drops out of the error margin at rank index 5
+        evaluated_rank_indices = []
+
+        def run_model(rank_index, _iterations, _use_cuda):
+            evaluated_rank_indices.append(rank_index)
+            return 0.9 if rank_index < 5 else 0.1
+
+        def create_compressed_model(svd_rank_pair_dict, **_kw_args):
+            return svd_rank_pair_dict['conv2'][0] - 1, None, []
+
+        results = []
+        for num_workers in [1, 3]:
+            evaluated_rank_indices.clear()
+            with unittest.mock.patch('aimet_torch.svd.model_stats_calculator.ModelStats.compute_compression_ratio') \
+                    as compute_compression_ratio:
+                with unittest.mock.patch('aimet_torch.svd.svd_pruner_deprecated.ModelPruner.create_compressed_model') \
+                        as mock_create_compressed_model:
+                    svd_lib_ref.SetCandidateRanks.return_value = 20
+                    compute_compression_ratio.return_value = 0.5
+                    mock_create_compressed_model.side_effect = create_compressed_model
+                    rank_selector = rank_select.RankSelector(svd_lib_ref=svd_lib_ref)
+                    best_index, svd_rank_pair_dict, rank_stats_list = \
+                        rank_selector.choose_best_rank(model=model, run_model=run_model, run_model_iterations=1,
+                                                       use_cuda=False,
+                                                       metric=aimet_torch.svd.svd_intf_defs_deprecated.CostMetric.memory,
+                                                       error_margin=10, baseline_perf=0.9, num_rank_indices=20,
+                                                       database=layer_database, num_workers=num_workers)
+
+            # Rank indices past the one that fell out of the error margin are not all evaluated
+            self.assertTrue(set(range(6)).issubset(evaluated_rank_indices))
+            self.assertTrue(len(evaluated_rank_indices) <= 6 + num_workers)
+            results.append((best_index, svd_rank_pair_dict, [data.rank_index for data in rank_stats_list]))
+
+        self.assertEqual(4, results[0][0])
+        self.assertEqual({'conv2': (5, 0), 'fc1': (5, 0)}, results[0][1])
+        self.assertEqual(results[0], results[1])
+
     def test_validate_params(self):
 
         si = svd_intf
@@ -691,6 +742,26 @@ class TestTrainingExtensionsSvd(unittest.TestCase):
         self.assertEqual('conv2', stats.per_rank_index[0].per_selected_layer[0].layer_name)
         self.assertEqual('fc2', stats.per_rank_index[0].per_selected_layer[1].layer_name)
 
+    def test_compress_model_with_workers(self):
+
+        model = MnistModel().to("cpu")
+
+        choose_best_rank = rank_select.RankSelector.choose_best_rank
+        with unittest.mock.patch.object(rank_select.RankSelector, 'choose_best_rank', autospec=True,
+                                        side_effect=choose_best_rank) as choose:
+            c_model, _ = svd_intf.Svd.compress_model(model=model, run_model=mnist_model.evaluate,
+                                                     run_model_iterations=1,
+                                                     input_shape=(1, 1, 28, 28),
+                                                     compression_type=aimet_torch.svd.svd_intf_defs_deprecated.CompressionTechnique.svd,
+                                                     cost_metric=aimet_torch.svd.svd_intf_defs_deprecated.CostMetric.mac,
+                                                     layer_selection_scheme=aimet_torch.svd.svd_intf_defs_deprecated.LayerSelectionScheme.manual,
+                                                     rank_selection_scheme=aimet_torch.svd.svd_intf_defs_deprecated.RankSelectionScheme.auto,
+                                                     layers_to_compress=[model.conv2, model.fc2], num_rank_indices=20,
+                                                     error_margin=100, num_workers=2)
+
+        self.assertEqual(2, choose.call_args[1]['num_workers'])
+        self.assertTrue(isinstance(c_model.conv2, nn.Sequential))
+
     def test_compress_model_no_bias(self):
 
         AimetLogger.set_level_for_all_areas(logging.DEBUG)
@@ -871,3 +942,27 @@ class TestWeightSvdPruning(unittest.TestCase):
             print("   Module: " + str(layer.module))
 
         print(layer_db.model)
+
+    def test_split_module_using_svd_cache(self):
+
+        torch.manual_seed(0)
+        model = mnist_model.Net()
+        svd_cache = svd_pruner_common.SvdFactorizationCache()
+
+        for module, input_shape, max_rank in [(model.conv2, (2, 32, 14, 14), 32), (model.fc1, (2, 3136), 1024)]:
+            inp = torch.randn(*input_shape)
+
+            # Splitting with the full rank reproduces the original module
+            module_a, module_b = WeightSvdModuleSplitter.split_module_using_svd_cache(module, max_rank, svd_cache)
+            self.assertTrue(np.allclose(module(inp).detach(), module_b(module_a(inp)).detach(), atol=1e-4))
+            self.assertTrue(np.array_equal(np.zeros(max_rank), module_a.bias.detach()))
+            self.assertTrue(torch.equal(module.bias, module_b.bias))
+
+        with unittest.mock.patch('numpy.linalg.svd', wraps=np.linalg.svd) as svd:
+            for rank in [2, 10, 30]:
+                module_a, module_b = WeightSvdModuleSplitter.split_module_using_svd_cache(model.conv2, rank, svd_cache)
+                self.assertEqual((rank, 32, 1, 1), tuple(module_a.weight.shape))
+                self.assertEqual((64, rank, 5, 5), tuple(module_b.weight.shape))
+
+        # Factorization of conv2 was cached when splitting it with the full rank
+        self.assertEqual(0, svd.call_count)